@@ -0,0 +1,220 @@
+"""
+Flat CSV / NDJSON exports of the admin order and transaction lists.
+
+Rows are read with values() projections and queryset.iterator(), and written
+out one at a time, so memory stays flat whatever the size of the export.
+Small exports stream straight from the web worker; exports above
+EXPORT_STREAM_MAX_ROWS are written to a gzipped file by a Celery job. Export
+files are private: the job status hands out a short-lived download URL to
+the admin who started the job, and purge_export_files() removes them once
+the job has expired.
+"""
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Column name -> values() lookup
+ORDER_COLUMNS = {
+    'id': 'id',
+    'order_sn': 'order_sn',
+    'status': 'status',
+    'created_at': 'created_at',
+    'total_price': 'total_price',
+    'shipping_fee': 'shipping_fee',
+    'buyer_email': 'buyer__email',
+    'buyer_first_name': 'buyer__first_name',
+    'buyer_last_name': 'buyer__last_name',
+    'buyer_contact': 'buyer__contact',
+    'store_name': 'store__name',
+    'delivery_location': 'delivery_location',
+    'delivery_code': 'delivery_code',
+    'tracking_id': 'tracking_id',
+    'tracking_status': 'tracking_status',
+}
+
+TRANSACTION_COLUMNS = {
+    'id': 'id',
+    'reference': 'reference',
+    'status': 'status',
+    'purpose': 'purpose',
+    'created_at': 'created_at',
+    'amount': 'total_price',
+    'user_email': 'user__email',
+    'user_first_name': 'user__first_name',
+    'user_last_name': 'user__last_name',
+    'order_id': 'order_id',
+    'invoice_no': 'order__order_sn',
+    'store_name': 'store__name',
+    'payment_method': 'data__channel',
+    'currency': 'data__currency',
+}
+
+EXPORT_JOB_TIMEOUT = 60 * 60 * 24
+EXPORT_DIR = 'exports'
+
+
+def _export_views():
+    # Imported lazily: views import this module
+    from .views import AdminOrderViewSet, AdminTransactionViewSet
+
+    return {
+        'orders': (AdminOrderViewSet, ORDER_COLUMNS),
+        'transactions': (AdminTransactionViewSet, TRANSACTION_COLUMNS),
+    }
+
+
+def export_rows(view, columns):
+    """Filtered values() queryset for a viewset, using its filter backends"""
+    queryset = view.filter_queryset(view.get_export_queryset())
+    return queryset.values_list(*columns.values())
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(list(columns))
+    for row in rows.iterator(chunk_size=_chunk_size()):
+        yield writer.writerow(row)
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """Falls back to str() for column types json can't encode (PhoneNumber)"""
+
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+def iter_ndjson(rows, columns):
+    names = list(columns)
+    for row in rows.iterator(chunk_size=_chunk_size()):
+        yield json.dumps(dict(zip(names, row)), cls=ExportJSONEncoder) + "\n"
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def export_filename(kind, file_format):
+    return f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+
+
+def _job_key(job_id):
+    return f"export:job:{job_id}"
+
+
+def get_export_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+def export_file_url(name):
+    """Download URL for a finished export, signed and short-lived on Cloudinary"""
+    return storages['exports'].url(name)
+
+
+def _set_export_job(job_id, **state):
+    state = {**(get_export_job(job_id) or {}), **state}
+    cache.set(_job_key(job_id), state, EXPORT_JOB_TIMEOUT)
+
+
+def start_export_job(kind, params, file_format, requested_by=None):
+    """Queue a background export of `kind` filtered by the given query params"""
+    from .tasks import export_admin_rows
+
+    if hasattr(params, 'getlist'):
+        params = {key: params.getlist(key) for key in params}
+    job_id = uuid4().hex
+    _set_export_job(job_id, status='queued', kind=kind, format=file_format, requested_by=requested_by)
+    export_admin_rows.delay(job_id, kind, params, file_format)
+    return job_id
+
+
+def _request_for(params):
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    query = QueryDict(mutable=True)
+    for key, values in params.items():
+        query.setlist(key, values if isinstance(values, list) else [values])
+    http_request.GET = query
+    return Request(http_request)
+
+
+def write_export_file(job_id, kind, params, file_format):
+    """Write a gzipped export to the exports storage and return its name"""
+    viewset, columns = _export_views()[kind]
+    view = viewset(request=_request_for(params), format_kwarg=None, action='export', kwargs={})
+    rows = export_rows(view, columns)
+
+    _set_export_job(job_id, status='running')
+    # One flat directory, so purge_export_files() lists it in one call
+    name = f"{EXPORT_DIR}/{job_id}-{export_filename(kind, file_format)}.gz"
+    storage = storages['exports']
+
+    with tempfile.NamedTemporaryFile(suffix='.gz', delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as out:
+            for line in EXPORT_WRITERS[file_format](rows, columns):
+                out.write(line)
+        with open(tmp_path, 'rb') as fh:
+            saved_name = storage.save(name, File(fh, name=os.path.basename(name)))
+    finally:
+        os.unlink(tmp_path)
+
+    _set_export_job(job_id, status='completed', file=saved_name)
+    return saved_name
+
+
+def mark_export_failed(job_id, error):
+    _set_export_job(job_id, status='failed', error=str(error))
+
+
+def purge_export_files(max_age=EXPORT_JOB_TIMEOUT):
+    """Delete export files older than `max_age` seconds, returns the number removed"""
+    storage = storages['exports']
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    try:
+        _, files = storage.listdir(EXPORT_DIR)
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for filename in files:
+        name = f"{EXPORT_DIR}/{filename}"
+        # Written once, so modified is when the export finished
+        if storage.get_modified_time(name) < cutoff:
+            storage.delete(name)
+            removed += 1
+    return removed
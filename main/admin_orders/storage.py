@@ -0,0 +1,100 @@
+import os
+import time
+
+import cloudinary.api
+import cloudinary.uploader
+import cloudinary.utils
+import requests
+from cloudinary_storage.storage import RawMediaCloudinaryStorage
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.dateparse import parse_datetime
+
+
+class PrivateRawCloudinaryStorage(RawMediaCloudinaryStorage):
+    """
+    Raw files uploaded as private Cloudinary resources.
+
+    A private resource has no public delivery URL; url() returns a signed
+    download URL that expires after `url_ttl` seconds (EXPORT_URL_TTL unless
+    set in the STORAGES options).
+    """
+    DELIVERY_TYPE = 'private'
+
+    def __init__(self, tag=None, resource_type=None, url_ttl=None):
+        super().__init__(tag=tag, resource_type=resource_type)
+        self.url_ttl = url_ttl
+
+    def _open(self, name, mode='rb'):
+        # The parent fetches the public URL, which private resources don't have
+        response = requests.get(self.url(name), timeout=30)
+        if response.status_code == 404:
+            raise FileNotFoundError(name)
+        response.raise_for_status()
+        file = ContentFile(response.content)
+        file.name = name
+        file.mode = mode
+        return file
+
+    def _upload(self, name, content):
+        options = {
+            'use_filename': True,
+            'resource_type': self._get_resource_type(name),
+            'type': self.DELIVERY_TYPE,
+            'tags': self.TAG,
+        }
+        folder = os.path.dirname(name)
+        if folder:
+            options['folder'] = folder
+        return cloudinary.uploader.upload(content, **options)
+
+    def url(self, name):
+        # Raw public ids keep their extension, so no separate format
+        return cloudinary.utils.private_download_url(
+            self._prepend_prefix(name), '',
+            resource_type=self._get_resource_type(name),
+            type=self.DELIVERY_TYPE,
+            expires_at=int(time.time()) + (self.url_ttl or settings.EXPORT_URL_TTL),
+            attachment=True,
+        )
+
+    def delete(self, name):
+        response = cloudinary.uploader.destroy(
+            name, invalidate=True, resource_type=self._get_resource_type(name), type=self.DELIVERY_TYPE
+        )
+        return response['result'] == 'ok'
+
+    def exists(self, name):
+        try:
+            self._resource(name)
+        except cloudinary.api.NotFound:
+            return False
+        return True
+
+    def listdir(self, path):
+        path = self._normalize_path(self._prepend_prefix(path))
+        directories, files = set(), []
+        options = {'type': self.DELIVERY_TYPE, 'resource_type': self.RESOURCE_TYPE, 'prefix': path, 'max_results': 500}
+        while True:
+            response = cloudinary.api.resources(**options)
+            for resource in response['resources']:
+                tail = resource['public_id'][len(path):]
+                if '/' in tail:
+                    directories.add(tail.split('/', 1)[0])
+                else:
+                    files.append(tail)
+            if not response.get('next_cursor'):
+                return list(directories), files
+            options['next_cursor'] = response['next_cursor']
+
+    def get_created_time(self, name):
+        return parse_datetime(self._resource(name)['created_at'])
+
+    def get_modified_time(self, name):
+        # Uploads are never overwritten
+        return self.get_created_time(name)
+
+    def _resource(self, name):
+        return cloudinary.api.resource(
+            self._prepend_prefix(name), resource_type=self._get_resource_type(name), type=self.DELIVERY_TYPE
+        )
@@ -0,0 +1,32 @@
+from celery import shared_task
+import logging
+
+from mall.db_routing import replica_reads
+from .exports import write_export_file, mark_export_failed, purge_export_files as purge_expired_exports
+
+logger = logging.getLogger(__name__)
+
+
+# Large exports can take longer than the worker's default time limit
+@shared_task(bind=True, time_limit=30 * 60, soft_time_limit=25 * 60)
+def export_admin_rows(self, job_id, kind, params, file_format):
+    """Write a filtered admin export to a gzipped file in the exports storage"""
+    try:
+        # Exports only read, and a few seconds of replication lag is fine
+        with replica_reads():
+            name = write_export_file(job_id, kind, params, file_format)
+        logger.info(f"Export {job_id} ({kind}, {file_format}) written to {name}")
+        return name
+    except Exception as e:
+        logger.error(f"Export {job_id} ({kind}) failed: {str(e)}")
+        mark_export_failed(job_id, e)
+        raise
+
+
+@shared_task(bind=True)
+def purge_export_files(self):
+    """Remove export files whose job has expired"""
+    removed = purge_expired_exports()
+    if removed:
+        logger.info(f"Purged {removed} expired export files")
+    return removed
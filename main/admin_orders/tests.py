@@ -1,3 +1,73 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.test import SimpleTestCase, override_settings
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mall.models import CustomUser
+from .exports import EXPORT_DIR, _set_export_job, iter_ndjson, purge_export_files
+from .views import ExportJobView
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'admin-exports'}}
+
+
+class FakeRows(list):
+    def iterator(self, chunk_size=None):
+        return iter(self)
+
+
+class ExportWriterTests(SimpleTestCase):
+    def test_ndjson_writes_phone_numbers_as_text(self):
+        rows = FakeRows([('1', PhoneNumber.from_string('+2348012345678'))])
+        lines = list(iter_ndjson(rows, {'id': 'id', 'buyer_contact': 'buyer__contact'}))
+        self.assertEqual(json.loads(lines[0]), {'id': '1', 'buyer_contact': '+2348012345678'})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExportJobViewTests(SimpleTestCase):
+    def setUp(self):
+        self.owner = CustomUser(id='admin-1', email='owner@example.com', is_staff=True)
+        self.other = CustomUser(id='admin-2', email='other@example.com', is_staff=True)
+        _set_export_job('job1', status='completed', kind='orders', format='csv',
+                        requested_by=self.owner.pk, file='exports/job1-orders.csv.gz')
+
+    def get(self, user):
+        request = APIRequestFactory().get('/api/admin/orders/exports/job1/')
+        force_authenticate(request, user=user)
+        return ExportJobView.as_view()(request, job_id='job1')
+
+    def test_owner_gets_a_download_url(self):
+        with mock.patch('admin_orders.views.export_file_url', return_value='https://signed') as url:
+            response = self.get(self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['url'], 'https://signed')
+        url.assert_called_once_with('exports/job1-orders.csv.gz')
+
+    def test_other_admins_cannot_see_the_job(self):
+        self.assertEqual(self.get(self.other).status_code, 404)
+
+
+class PurgeExportFilesTests(SimpleTestCase):
+    def test_removes_only_expired_files(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STORAGES={
+            'exports': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': root}},
+        }):
+            storage = storages['exports']
+            old = storage.save(f'{EXPORT_DIR}/old.csv.gz', ContentFile(b'old'))
+            new = storage.save(f'{EXPORT_DIR}/new.csv.gz', ContentFile(b'new'))
+            os.utime(storage.path(old), (0, 0))
+
+            self.assertEqual(purge_export_files(max_age=3600), 1)
+            self.assertFalse(storage.exists(old))
+            self.assertTrue(storage.exists(new))
+
+    def test_no_exports_yet(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STORAGES={
+            'exports': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': root}},
+        }):
+            self.assertEqual(purge_export_files(), 0)
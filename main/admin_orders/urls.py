@@ -1,11 +1,16 @@
 from django.urls import path, re_path
-from .views import AdminOrderViewSet, AdminTransactionViewSet
+from .views import AdminOrderViewSet, AdminTransactionViewSet, ExportJobView
 
 urlpatterns = [
 
     # Orders list (GET /)
     path('', AdminOrderViewSet.as_view({'get': 'list'})),
     path('transactions/', AdminTransactionViewSet.as_view({'get': 'list'})),
+
+    # Streaming exports (GET /export/?export_format=csv|ndjson) and background export status
+    path('export/', AdminOrderViewSet.as_view({'get': 'export'})),
+    path('transactions/export/', AdminTransactionViewSet.as_view({'get': 'export'})),
+    path('exports/<str:job_id>/', ExportJobView.as_view()),
     
     # Individual order retrieval (GET /<identifier>/)
     path('<str:identifier>/', AdminOrderViewSet.as_view({'get': 'retrieve'})),
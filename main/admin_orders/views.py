@@ -1,13 +1,85 @@
-from django.http import Http404
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from rest_framework import viewsets, status, filters
+from rest_framework.decorators import action
+from rest_framework.views import APIView
 from order.models import StoreOrder, OrderItems, PaystackWebhook
+from order.search import normalize_search_text
+from mall.identifiers import get_by_identifier
 from .serializers import AdminOrderSerializer, AdminTransactionSerializer
-from order.pagination import CustomPagination
+from mall.pagination import CappedCountPagination
 from django.db.models import Prefetch
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
+from .exports import (
+    EXPORT_FORMATS, EXPORT_WRITERS, ORDER_COLUMNS, TRANSACTION_COLUMNS,
+    export_rows, export_filename, start_export_job, get_export_job, export_file_url
+)
+
+
+class ExportMixin:
+    """
+    Adds an `export` list action that streams the filtered rows as CSV or NDJSON.
+
+    Uses the viewset's own filter backends over `get_export_queryset()`, by
+    default the list queryset; override it with a plain queryset without
+    prefetches. Exports larger than EXPORT_STREAM_MAX_ROWS (or
+    requested with background=true) are handed to a Celery job instead.
+    """
+    export_kind = None
+    export_columns = None
+
+    def get_export_queryset(self):
+        # export_rows() applies the filter backends
+        return self.get_queryset()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # Not `format`: DRF reserves it for renderer negotiation
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = export_rows(self, self.export_columns)
+
+        max_rows = getattr(settings, 'EXPORT_STREAM_MAX_ROWS', 50000)
+        background = request.query_params.get('background', '').lower() in ('1', 'true')
+        if background or rows.order_by()[:max_rows + 1].count() > max_rows:
+            job_id = start_export_job(
+                self.export_kind, request.query_params, file_format, requested_by=str(request.user.pk)
+            )
+            return Response(
+                {"job_id": job_id, "status": "queued"},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        response = StreamingHttpResponse(
+            EXPORT_WRITERS[file_format](rows, self.export_columns),
+            content_type=EXPORT_FORMATS[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(self.export_kind, file_format)}"'
+        return response
+
+
+class ExportJobView(APIView):
+    """Status (and download URL once finished) of a background export, for the admin who started it"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, job_id):
+        job = get_export_job(job_id)
+        if job is None or job.get('requested_by') != str(request.user.pk):
+            return Response({"error": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        data = {"job_id": job_id, **job}
+        if job.get('file'):
+            # Signed per request, the link expires after EXPORT_URL_TTL
+            data['url'] = export_file_url(job['file'])
+        return Response(data)
 
 
 class OrderFilter(django_filters.FilterSet):
@@ -24,30 +96,33 @@ class OrderFilter(django_filters.FilterSet):
             'tracking_id': ['exact'],
         }
 
-class AdminOrderViewSet(viewsets.ModelViewSet):
+class OrderSearchFilter(filters.SearchFilter):
+    """
+    Matches each search term against StoreOrder.search_document, which
+    already holds the order, buyer and product text, so no joins or DISTINCT.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            queryset = queryset.filter(search_document__contains=normalize_search_text(term))
+        return queryset
+
+class AdminOrderViewSet(ExportMixin, viewsets.ModelViewSet):
     serializer_class = AdminOrderSerializer
     permission_classes = [IsAdminUser]
-    pagination_class = CustomPagination
+    pagination_class = CappedCountPagination
+    query_budget = 6  # Queries per request, enforced in mall/tests/test_query_budgets.py
     http_method_names = ['get']
     lookup_field = 'identifier'
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderSearchFilter, filters.OrderingFilter]
     filterset_class = OrderFilter
-    search_fields = [
-        'id',  # Matches order_id
-        'order_sn',  # Matches invoice_no
-        'status',
-        'total_price',  # Matches total
-        'delivery_location',
-        'tracking_id',
-        'delivery_code',
-        'buyer__first_name',  # For buyer_name
-        'buyer__last_name',  # For buyer_name
-        'buyer__contact',  # For buyer_contact
-        'items__product__name',  # For product_name in items
-        'items__product__sku',  # For product_sku in items
-    ]
+    # Order id, invoice no, status, total, delivery location, tracking id, delivery code,
+    # buyer name and contact, product names and SKUs; see order.search
+    search_fields = ['search_document']
     ordering_fields = ['created_at', 'total_price']
+    export_kind = 'orders'
+    export_columns = ORDER_COLUMNS
 
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
@@ -86,23 +161,20 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    def get_export_queryset(self):
+        return StoreOrder.objects.order_by("-created_at")
+
     def get_object(self):
-        # Get the identifier from URL
-        identifier = self.kwargs.get('identifier')
-        
-        try:
-            # Try to find by UUID (primary key)
-            return self.get_queryset().get(id=identifier)
-        except (StoreOrder.DoesNotExist, ValueError):
-            try:
-                # Try to find by invoice number (order_sn)
-                return self.get_queryset().get(order_sn=identifier)
-            except StoreOrder.DoesNotExist:
-                # Try to find by delivery code
-                try:
-                    return self.get_queryset().get(delivery_code=identifier)
-                except StoreOrder.DoesNotExist:
-                    raise Http404("No order found with the provided identifier")
+        # Order id (UUID), invoice number (order_sn) or delivery code, in that order
+        order = get_by_identifier(
+            self.get_queryset(),
+            self.kwargs.get('identifier'),
+            {'order_sn': 'order_sn', 'delivery_code': 'delivery_code'}
+        )
+        if order is None:
+            raise Http404("No order found with the provided identifier")
+        self.check_object_permissions(self.request, order)
+        return order
 
     def retrieve(self, request, *args, **kwargs):
         try:
@@ -133,10 +205,11 @@ class TransactionFilter(django_filters.FilterSet):
             'reference': ['exact'],
         }
 
-class AdminTransactionViewSet(viewsets.ModelViewSet):
+class AdminTransactionViewSet(ExportMixin, viewsets.ModelViewSet):
     serializer_class = AdminTransactionSerializer
     permission_classes = [IsAdminUser]
-    pagination_class = CustomPagination
+    pagination_class = CappedCountPagination
+    query_budget = 3
     http_method_names = ['get']
     lookup_field = 'id'
     lookup_url_kwarg = 'id'
@@ -154,6 +227,8 @@ class AdminTransactionViewSet(viewsets.ModelViewSet):
         'order__id',
     ]
     ordering_fields = ['created_at', 'total_price']
+    export_kind = 'transactions'
+    export_columns = TRANSACTION_COLUMNS
 
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
@@ -186,4 +261,7 @@ class AdminTransactionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(purpose=purpose)
             
         return queryset
-    
\ No newline at end of file
+    
+
+    def get_export_queryset(self):
+        return PaystackWebhook.objects.order_by("-created_at")
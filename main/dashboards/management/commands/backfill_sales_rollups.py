@@ -0,0 +1,39 @@
+# dashboards/management/commands/backfill_sales_rollups.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboards.rollups import rollup_daily_sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily store and product sales rollups for a date range.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Number of days back from today (default 365)')
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD), overrides --days')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+            start = date.fromisoformat(options['start']) if options['start'] else end - timedelta(days=options['days'] - 1)
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        self.stdout.write(self.style.NOTICE(f'Rebuilding sales rollups from {start} to {end}...'))
+
+        total = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=options['chunk_days'] - 1), end)
+            written = rollup_daily_sales(chunk_start, chunk_end)
+            total += written
+            self.stdout.write(f'  {chunk_start} - {chunk_end}: {written} rows')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {total} rollup rows'))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('mall', '0059_storestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('profit', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='mall.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_product_sales_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='daily_product_sales_product_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStoreSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('profit', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='mall.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_store_sales_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('store', 'date'), name='daily_store_sales_store_date_uniq')],
+            },
+        ),
+    ]
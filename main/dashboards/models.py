@@ -1,3 +1,45 @@
 from django.db import models
 
-# Create your models here.
+
+class DailyStoreSales(models.Model):
+    """Sales of one store on one day, rebuilt by dashboards.rollups"""
+    store = models.ForeignKey('mall.Store', on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'date'], name='daily_store_sales_store_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_store_sales_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} {self.date}"
+
+
+class DailyProductSales(models.Model):
+    """Sales of one product (across all stores) on one day, rebuilt by dashboards.rollups"""
+    product = models.ForeignKey('mall.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='daily_product_sales_product_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_product_sales_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.date}"
@@ -0,0 +1,166 @@
+"""
+Daily sales rollups for the dashboard charts.
+
+Each run recomputes whole days from the orders placed on them and replaces
+the rollup rows for those days, so running it again (or over overlapping
+ranges) always converges to the same result.
+
+Recent days are rebuilt hourly. A status or amount change on an older order
+schedules a rebuild of the day the order was placed (schedule_day_rebuild),
+and a nightly run re-rolls SALES_ROLLUP_REBUILD_DAYS to catch changes that
+bypass the signals, such as queryset updates.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from mall.models import StoreProductPricing
+from order.models import StoreOrder, OrderItems
+from .models import DailyStoreSales, DailyProductSales
+
+logger = logging.getLogger(__name__)
+
+SALES_STATUSES = StoreOrder.SALES_STATUSES
+
+ZERO = Decimal('0.00')
+
+# First key of the per-day advisory locks taken by rollup_daily_sales
+ROLLUP_LOCK_NAMESPACE = 7301
+
+
+def _day_bounds(start_date, end_date):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _local_date(value):
+    return timezone.localtime(value).date()
+
+
+def _empty_totals():
+    return {'orders': 0, 'units': 0, 'revenue': ZERO, 'profit': ZERO}
+
+
+def compute_daily_sales(start_date, end_date):
+    """Aggregate sales per (store, day) and (product, day) for the inclusive date range"""
+    start, end = _day_bounds(start_date, end_date)
+
+    store_days = defaultdict(_empty_totals)
+    orders = StoreOrder.objects.filter(
+        created_at__gte=start, created_at__lt=end, status__in=SALES_STATUSES, store__isnull=False
+    ).values_list('store_id', 'created_at', 'total_price')
+    for store_id, created_at, total_price in orders.iterator(chunk_size=2000):
+        totals = store_days[(store_id, _local_date(created_at))]
+        totals['orders'] += 1
+        totals['revenue'] += total_price or ZERO
+
+    # Items that predate OrderItems.unit_price fall back to the current pricing
+    current_price = StoreProductPricing.objects.filter(
+        store_id=OuterRef('userorder__store_id'), product_id=OuterRef('product_id')
+    ).order_by('-id').values('retail_price')[:1]
+    items = OrderItems.objects.filter(
+        userorder__created_at__gte=start,
+        userorder__created_at__lt=end,
+        userorder__status__in=SALES_STATUSES,
+        product__isnull=False,
+    ).annotate(
+        retail_price=Coalesce('unit_price', Subquery(current_price)),
+        wholesale_price=F('product_variant__wholesale_price'),
+    ).values_list(
+        'userorder_id', 'userorder__store_id', 'userorder__created_at',
+        'product_id', 'quantity', 'retail_price', 'wholesale_price'
+    )
+
+    product_days = defaultdict(_empty_totals)
+    product_orders = defaultdict(set)
+    for order_id, store_id, created_at, product_id, quantity, retail, wholesale in items.iterator(chunk_size=2000):
+        day = _local_date(created_at)
+        retail = retail or ZERO
+        revenue = retail * quantity
+        profit = (retail - (wholesale or ZERO)) * quantity
+
+        if store_id:
+            store_totals = store_days[(store_id, day)]
+            store_totals['units'] += quantity
+            store_totals['profit'] += profit
+
+        product_totals = product_days[(product_id, day)]
+        product_totals['units'] += quantity
+        product_totals['revenue'] += revenue
+        product_totals['profit'] += profit
+        product_orders[(product_id, day)].add(order_id)
+
+    for key, order_ids in product_orders.items():
+        product_days[key]['orders'] = len(order_ids)
+
+    return store_days, product_days
+
+
+def _days_between(start_date, end_date):
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def _lock_days(start_date, end_date):
+    """
+    Hold a transaction-level lock on each day of the range, so runs over the
+    same or overlapping days (hourly, per-day and nightly rebuilds) replace
+    the rows one after another instead of colliding on the unique
+    constraints. Days are locked in order, so overlapping runs cannot
+    deadlock.
+    """
+    if connection.vendor != 'postgresql':
+        # SQLite serialises writers already
+        return
+    days = [day.toordinal() for day in _days_between(start_date, end_date)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, day) FROM unnest(%s::int[]) AS day ORDER BY day",
+            [ROLLUP_LOCK_NAMESPACE, days]
+        )
+
+
+def rollup_daily_sales(start_date, end_date):
+    """Replace the rollup rows for the inclusive date range, returns the rows written"""
+    with transaction.atomic():
+        _lock_days(start_date, end_date)
+        # Counted under the lock, so a run that waited sees the orders the
+        # previous one saw and never writes older totals over newer ones
+        store_days, product_days = compute_daily_sales(start_date, end_date)
+
+        DailyStoreSales.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        DailyProductSales.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        DailyStoreSales.objects.bulk_create([
+            DailyStoreSales(store_id=store_id, date=day, **totals)
+            for (store_id, day), totals in store_days.items()
+        ], batch_size=1000)
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(product_id=product_id, date=day, **totals)
+            for (product_id, day), totals in product_days.items()
+        ], batch_size=1000)
+
+    written = len(store_days) + len(product_days)
+    logger.info(f"Rolled up daily sales {start_date} - {end_date}: {written} rows")
+    return written
+
+
+def schedule_day_rebuild(day):
+    """Rebuild the rollups of `day` shortly after the current transaction commits"""
+    def schedule():
+        from .tasks import rebuild_sales_day
+
+        delay = getattr(settings, 'SALES_ROLLUP_DELAY', 60)
+        # One rebuild per day however many of its orders change meanwhile
+        if cache.add(f"rollups:scheduled:{day.isoformat()}", 1, delay + 60):
+            rebuild_sales_day.apply_async(args=[day.isoformat()], countdown=delay)
+
+    transaction.on_commit(schedule)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db.models import Count, Sum, Value, DecimalField, IntegerField, Q
+from django.db.models.functions import Coalesce
+
+from mall.cache_utils import get_stale_while_revalidate, set_stale_while_revalidate
+from mall.models import CustomUser
+from order.models import StoreOrder, PaystackWebhook, Product
+
+ADMIN_STATS_CACHE_KEY = "dashboard:admin_stats"
+
+
+def compute_admin_dashboard_stats():
+    """Headline numbers for the admin dashboard (whole-table aggregates)"""
+    completed_orders_filter = Q(status='Completed')
+
+    total_transactions_agg = PaystackWebhook.objects.filter(
+        purpose='order',
+        status='Success'
+    ).aggregate(
+        total_amount=Coalesce(Sum('total_price'), Value(0), output_field=DecimalField()),
+        total_count=Coalesce(Count('id'), Value(0), output_field=IntegerField())
+    )
+
+    return {
+        'total_transactions': total_transactions_agg,
+        'total_orders': StoreOrder.objects.filter(completed_orders_filter).count(),
+        'total_products': Product.objects.count(),
+        'total_dropshippers': CustomUser.objects.filter(
+            is_store_owner=True
+        ).count()
+    }
+
+
+def _timeouts():
+    timeouts = getattr(settings, 'CACHE_TIMEOUTS', {})
+    return timeouts.get('admin_stats', 60), timeouts.get('admin_stats_stale', 60 * 30)
+
+
+def refresh_admin_dashboard_stats():
+    soft_timeout, hard_timeout = _timeouts()
+    stats = compute_admin_dashboard_stats()
+    set_stale_while_revalidate(ADMIN_STATS_CACHE_KEY, stats, soft_timeout, hard_timeout)
+    return stats
+
+
+def get_admin_dashboard_stats():
+    """Cached headline stats; stale entries are refreshed by a Celery task"""
+    from .tasks import refresh_admin_dashboard_stats_task
+
+    soft_timeout, hard_timeout = _timeouts()
+    return get_stale_while_revalidate(
+        ADMIN_STATS_CACHE_KEY,
+        compute_admin_dashboard_stats,
+        soft_timeout,
+        hard_timeout,
+        refresh=refresh_admin_dashboard_stats_task.delay,
+    )
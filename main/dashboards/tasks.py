@@ -0,0 +1,41 @@
+from celery import shared_task
+from datetime import date, timedelta
+import logging
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .rollups import rollup_daily_sales
+from .stats import refresh_admin_dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def build_daily_sales_rollups(self, days=2):
+    """Rebuild the daily sales rollups for the last `days` days (today included)"""
+    today = timezone.localdate()
+    try:
+        return rollup_daily_sales(today - timedelta(days=days - 1), today)
+    except Exception as e:
+        logger.error(f"Error building daily sales rollups: {e}")
+        self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def rebuild_sales_day(self, day):
+    """Rebuild one day after its orders changed, see rollups.schedule_day_rebuild"""
+    # Changes from here on schedule another rebuild
+    cache.delete(f"rollups:scheduled:{day}")
+    try:
+        day = date.fromisoformat(day)
+        return rollup_daily_sales(day, day)
+    except Exception as e:
+        logger.error(f"Error rebuilding sales rollups for {day}: {e}")
+        self.retry(exc=e)
+
+
+@shared_task(bind=True)
+def refresh_admin_dashboard_stats_task(self):
+    """Recompute the cached admin dashboard headline stats"""
+    refresh_admin_dashboard_stats()
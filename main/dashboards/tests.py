@@ -1,3 +1,68 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from dashboards.rollups import ROLLUP_LOCK_NAMESPACE, rollup_daily_sales, schedule_day_rebuild
+from dashboards.views import MetricsView
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dashboards'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SALES_ROLLUP_DELAY=30)
+class ScheduleDayRebuildTests(SimpleTestCase):
+    def test_changes_to_one_day_schedule_one_rebuild(self):
+        with mock.patch('dashboards.rollups.transaction.on_commit', side_effect=lambda func: func()), \
+                mock.patch('dashboards.tasks.rebuild_sales_day.apply_async') as apply_async:
+            schedule_day_rebuild(date(2026, 1, 5))
+            schedule_day_rebuild(date(2026, 1, 5))
+            schedule_day_rebuild(date(2026, 1, 6))
+
+        self.assertEqual(apply_async.call_args_list, [
+            mock.call(args=['2026-01-05'], countdown=30),
+            mock.call(args=['2026-01-06'], countdown=30),
+        ])
+
+
+class RollupDailySalesLockTests(SimpleTestCase):
+    def test_days_are_locked_before_they_are_counted(self):
+        calls = mock.Mock()
+        calls.compute.return_value = ({}, {})
+        postgres = mock.MagicMock(vendor='postgresql')
+        cursor = postgres.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = lambda *args: calls.lock(*args)
+
+        with mock.patch('dashboards.rollups.connection', postgres), \
+                mock.patch('dashboards.rollups.transaction.atomic'), \
+                mock.patch('dashboards.rollups.compute_daily_sales', calls.compute), \
+                mock.patch('dashboards.rollups.DailyStoreSales.objects'), \
+                mock.patch('dashboards.rollups.DailyProductSales.objects'):
+            rollup_daily_sales(date(2026, 1, 30), date(2026, 2, 1))
+
+        self.assertEqual([call[0] for call in calls.mock_calls], ['lock', 'compute'])
+        sql, params = calls.lock.call_args.args
+        self.assertIn('pg_advisory_xact_lock', sql)
+        self.assertEqual(params, [ROLLUP_LOCK_NAMESPACE, [
+            date(2026, 1, 30).toordinal(), date(2026, 1, 31).toordinal(), date(2026, 2, 1).toordinal(),
+        ]])
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsViewTests(SimpleTestCase):
+    def scrape(self, authorization):
+        request = APIRequestFactory().get('/api/admin/metrics/', HTTP_AUTHORIZATION=authorization)
+        with mock.patch('dashboards.views.queue_snapshot', return_value={}), \
+                mock.patch('dashboards.views.snapshot_gauges', return_value=[]), \
+                mock.patch('dashboards.views.outbox_length', return_value=3), \
+                mock.patch('setup.metrics.get_redis') as get_redis:
+            get_redis.return_value.hgetall.return_value = {}
+            return MetricsView.as_view()(request)
+
+    def test_scraper_with_the_metrics_token(self):
+        response = self.scrape('Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'email_outbox_depth 3', response.content)
+
+    def test_wrong_token_is_rejected(self):
+        self.assertIn(self.scrape('Bearer wrong').status_code, (401, 403))
@@ -1,10 +1,14 @@
 from django.urls import path, include
 from .views import (
     AdminDashboardView,
-    DropshipperAnalyticsView
+    DropshipperAnalyticsView,
+    SalesSeriesView,
+    MetricsView
 )
 
 urlpatterns = [
     path('dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
     path('dropshipper-analytic/', DropshipperAnalyticsView.as_view(), name='admin-dashboard'),
+    path('sales-series/', SalesSeriesView.as_view(), name='admin-sales-series'),
+    path('metrics/', MetricsView.as_view(), name='admin-metrics'),
 ]
\ No newline at end of file
@@ -1,41 +1,40 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAdminUser
+from rest_framework.permissions import IsAdminUser, BasePermission
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import status as drf_status
 from django.db.models import (
-    Count, Sum, Value, DecimalField, IntegerField, Q, F,
+    Sum, Value, DecimalField, Q, F,
     When, Case, CharField
 )
 from django.db.models.functions import Coalesce
-from order.pagination import CustomPagination
-from order.models import StoreOrder, PaystackWebhook, Product
+from mall.pagination import CappedCountPagination
+from order.models import PaystackWebhook
 from mall.models import CustomUser
 from admin_orders.serializers import AdminTransactionSerializer
 from django.utils import timezone
+from datetime import date, timedelta
+from .models import DailyStoreSales, DailyProductSales
+from .stats import get_admin_dashboard_stats
+import hmac
+import redis
+from django.conf import settings
+from django.http import HttpResponse
+from django.contrib.auth.models import AnonymousUser
+from setup.celery import app as celery_app
+from setup.metrics import render_prometheus
+from setup.task_metrics import queue_snapshot, snapshot_gauges
+from setup.worker_topology import routed_queues
+from setup.emails import outbox_length
 
 class AdminDashboardView(APIView):
     permission_classes = [IsAdminUser]
-    pagination_class = CustomPagination
+    pagination_class = CappedCountPagination
 
     def get(self, request):
-        completed_orders_filter = Q(status='Completed')
-
-        total_transactions_agg = PaystackWebhook.objects.filter(
-            purpose='order',
-            status='Success'
-        ).aggregate(
-            total_amount=Coalesce(Sum('total_price'), Value(0), output_field=DecimalField()),
-            total_count=Coalesce(Count('id'), Value(0), output_field=IntegerField())
-        )
-
-        stats = {
-            'total_transactions': total_transactions_agg,
-            'total_orders': StoreOrder.objects.filter(completed_orders_filter).count(),
-            'total_products': Product.objects.count(),
-            'total_dropshippers': CustomUser.objects.filter(
-                is_store_owner=True
-            ).count()
-        }
+        # Headline stats are cached; the transactions list below stays live
+        stats = get_admin_dashboard_stats()
 
         # Get paginated transactions instead of orders
         transactions_queryset = PaystackWebhook.objects.select_related(
@@ -83,66 +82,77 @@ class AdminDashboardView(APIView):
     
 class DropshipperAnalyticsView(APIView):
     permission_classes = [IsAdminUser]
-    pagination_class = CustomPagination
+    pagination_class = CappedCountPagination
+
+    # Keyset pagination can't order across relations, so it uses the annotation
+    cursor_ordering = '-store_created_at'
+    ACTIVE_WINDOW = timezone.timedelta(days=30)
 
     def get(self, request):
+        active_since = timezone.now() - self.ACTIVE_WINDOW
+        active = Q(last_login__gte=active_since)
+        inactive = Q(last_login__lt=active_since) | Q(last_login__isnull=True)
+
         # Get all dropshippers with optimized annotations
         dropshippers = CustomUser.objects.filter(
             is_store_owner=True
         ).select_related('owners').annotate(
             company_name=F('owners__name'),
-            # Use the new related_name 'pricings'
-            total_products=Count(
-                'owners__pricings',
-                distinct=True,
-                filter=Q(owners__pricings__product__is_available=True)
-            ),
-            # Use the existing related_name 'store_orders' from StoreOrder model
+            # Metrics come from the store's StoreStats row
+            total_products=Coalesce(F('owners__stats__products_available'), 0),
             total_revenue=Coalesce(
-                Sum(
-                    'owners__store_orders__total_price',
-                    filter=Q(owners__store_orders__status='Completed'),
-                    output_field=DecimalField()
-                ),
-                Value(0.00),
+                F('owners__stats__revenue'),
+                Value(0),
                 output_field=DecimalField()
             ),
             active_status=Case(
-                When(last_login__gte=timezone.now() - timezone.timedelta(days=30), 
-                then=Value('Active')),
+                When(active, then=Value('Active')),
                 default=Value('Inactive'),
                 output_field=CharField()
             ),
-            last_seen=F('last_login')
-        ).order_by('-owners__created_at')
+            last_seen=F('last_login'),
+            store_created_at=F('owners__created_at')
+        ).order_by('-store_created_at')
+
+        # Filters below only touch base or StoreStats columns, never the
+        # annotations, so Postgres can use indexes before paginating
 
         # Apply search parameter
         search_term = request.query_params.get('search', '').strip()
         if search_term:
-            dropshippers = dropshippers.filter(
+            search = (
                 Q(first_name__icontains=search_term) |
                 Q(last_name__icontains=search_term) |
                 Q(email__icontains=search_term) |
-                Q(owners__name__icontains=search_term) |
-                Q(active_status__icontains=search_term)
+                Q(owners__name__icontains=search_term)
             )
+            # Searching for (part of) a status matches on the last_login window
+            if search_term.lower() in 'active':
+                search |= active
+            if search_term.lower() in 'inactive':
+                search |= inactive
+            dropshippers = dropshippers.filter(search)
 
         # Apply filters
         status = request.query_params.get('status')
-        if status:
-            dropshippers = dropshippers.filter(active_status=status)
+        if status == 'Active':
+            dropshippers = dropshippers.filter(active)
+        elif status == 'Inactive':
+            dropshippers = dropshippers.filter(inactive)
+        elif status:
+            dropshippers = dropshippers.none()
             
         min_products = request.query_params.get('min_products')
         if min_products:
-            dropshippers = dropshippers.filter(total_products__gte=min_products)
+            dropshippers = dropshippers.filter(owners__stats__products_available__gte=min_products)
             
         min_revenue = request.query_params.get('min_revenue')
         if min_revenue:
-            dropshippers = dropshippers.filter(total_revenue__gte=min_revenue)
+            dropshippers = dropshippers.filter(owners__stats__revenue__gte=min_revenue)
 
         # Paginate results
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(dropshippers, request)
+        page = paginator.paginate_queryset(dropshippers, request, view=self)
 
         # Build response data
         response_data = [{
@@ -155,4 +165,111 @@ class DropshipperAnalyticsView(APIView):
             'last_seen': user.last_seen.isoformat() if user.last_seen else None
         } for user in page]
 
-        return paginator.get_paginated_response(response_data)
\ No newline at end of file
+        return paginator.get_paginated_response(response_data)
+
+
+class SalesSeriesView(APIView):
+    """Daily sales series for charts, read from the pre-aggregated rollup tables"""
+    permission_classes = [IsAdminUser]
+    MAX_DAYS = 366
+    METRICS = ('orders', 'units', 'revenue', 'profit')
+
+    def get(self, request):
+        try:
+            end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else timezone.localdate()
+            start = date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'Dates must be in YYYY-MM-DD format'}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=drf_status.HTTP_400_BAD_REQUEST)
+        if (end - start).days + 1 > self.MAX_DAYS:
+            return Response({'error': f'Date range cannot exceed {self.MAX_DAYS} days'}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        store_id = request.query_params.get('store')
+        product_id = request.query_params.get('product')
+        if store_id and product_id:
+            return Response({'error': 'Filter by store or product, not both'}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        if product_id:
+            rows = DailyProductSales.objects.filter(product_id=product_id)
+        elif store_id:
+            rows = DailyStoreSales.objects.filter(store_id=store_id)
+        else:
+            # Platform-wide series: one summed row per day
+            rows = DailyStoreSales.objects.all()
+        rows = rows.filter(date__gte=start, date__lte=end).values('date').annotate(
+            **{metric: Sum(metric) for metric in self.METRICS}
+        ).order_by('date')
+
+        by_date = {row['date']: row for row in rows}
+        series = []
+        totals = {metric: 0 for metric in self.METRICS}
+        day = start
+        while day <= end:
+            row = by_date.get(day, {})
+            point = {'date': day.isoformat()}
+            for metric in self.METRICS:
+                value = row.get(metric) or 0
+                totals[metric] += value
+                point[metric] = str(value) if metric in ('revenue', 'profit') else value
+            series.append(point)
+            day += timedelta(days=1)
+
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'store': store_id,
+            'product': product_id,
+            'totals': {metric: str(value) if metric in ('revenue', 'profit') else value for metric, value in totals.items()},
+            'series': series,
+        }, status=drf_status.HTTP_200_OK)
+
+
+
+def has_metrics_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    Accepts the Bearer METRICS_TOKEN before JWTAuthentication sees it, which
+    would reject it as an invalid JWT. The request stays anonymous.
+    """
+
+    def authenticate(self, request):
+        if has_metrics_token(request):
+            return (AnonymousUser(), 'metrics')
+        return None
+
+
+class HasMetricsToken(BasePermission):
+    """Bearer METRICS_TOKEN, for scrapers that can't log in"""
+
+    def has_permission(self, request, view):
+        return request.auth == 'metrics' and has_metrics_token(request)
+
+
+class MetricsView(APIView):
+    """
+    Celery broker and task metrics in the Prometheus text format: per-queue
+    depth and oldest-message age, task runtime and queue-wait histograms,
+    retry/failure counters and worker heartbeat ages.
+    """
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication, SessionAuthentication]
+    permission_classes = [HasMetricsToken | IsAdminUser]
+    # Scrapers poll every few seconds, well past the anon rate
+    throttle_classes = []
+
+    def get(self, request):
+        queues = sorted(routed_queues(celery_app))
+        try:
+            snapshot = queue_snapshot(queues)
+            gauges = snapshot_gauges(snapshot)
+            gauges.append(('email_outbox_depth', {}, outbox_length()))
+            body = render_prometheus(gauges)
+        except redis.RedisError as e:
+            return Response({'error': f'Metrics store unavailable: {e}'}, status=drf_status.HTTP_503_SERVICE_UNAVAILABLE)
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,4 +1,6 @@
 from django_filters import rest_framework as filters
+from django.db.models import Q
+from django.utils import timezone
 from mall.models import CustomUser
 
 class DropshipperFilter(filters.FilterSet):
@@ -21,17 +23,23 @@ class DropshipperFilter(filters.FilterSet):
             'owners__name': ['exact', 'contains'],
         }
 
+    # Metric filters read the StoreStats columns and activity uses last_login
+    # directly, so they can be applied before the annotations are computed
+
     def filter_total_products(self, queryset, name, value):
-        return queryset.filter(total_products=value)
+        return queryset.filter(owners__stats__products_added=value)
 
     def filter_total_products_available(self, queryset, name, value):
-        return queryset.filter(total_products_available=value)
+        return queryset.filter(owners__stats__products_available=value)
 
     def filter_total_products_sold(self, queryset, name, value):
-        return queryset.filter(total_products_sold=value)
+        return queryset.filter(owners__stats__units_sold=value)
 
     def filter_total_revenue(self, queryset, name, value):
-        return queryset.filter(total_revenue=value)
+        return queryset.filter(owners__stats__revenue=value)
 
     def filter_is_active_user(self, queryset, name, value):
-        return queryset.filter(is_active_user=value)
\ No newline at end of file
+        active_since = timezone.now() - timezone.timedelta(days=30)
+        if value:
+            return queryset.filter(last_login__gte=active_since)
+        return queryset.filter(Q(last_login__lt=active_since) | Q(last_login__isnull=True))
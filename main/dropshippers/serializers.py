@@ -1,12 +1,12 @@
 from rest_framework import serializers
 from mall.serializers import StoreOwnerSerializer
 from order.models import Store
-from django.db.models import Sum
 from mall.models import CustomUser, Store
 from django.utils import timezone
 from django.utils.timezone import now
 from django.db import transaction, IntegrityError
 from setup.utils import sendEmail
+from mall.store_stats import get_store_stats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -62,35 +62,27 @@ class DropshipperDetailSerializer(serializers.ModelSerializer):
             return obj.owners.name
         return None
     
+    def _stats(self, obj):
+        if not hasattr(obj, '_store_stats'):
+            has_store = hasattr(obj, 'owners') and obj.owners
+            obj._store_stats = get_store_stats(obj.owners) if has_store else None
+        return obj._store_stats
+
     def get_total_products(self, obj):
-        if hasattr(obj, 'owners') and obj.owners:
-            return obj.owners.pricings.count()
-        return 0
+        stats = self._stats(obj)
+        return stats.products_added if stats else 0
     
     def get_total_products_available(self, obj):
-        if hasattr(obj, 'owners') and obj.owners:
-            return obj.owners.pricings.filter(
-                product__is_available=True
-            ).count()
-        return 0
+        stats = self._stats(obj)
+        return stats.products_available if stats else 0
     
     def get_total_products_sold(self, obj):
-        if hasattr(obj, 'owners') and obj.owners:
-            return obj.owners.store_orders.filter(
-                status='Completed'
-            ).aggregate(
-                total=Sum('items__quantity')
-            )['total'] or 0
-        return 0
+        stats = self._stats(obj)
+        return stats.units_sold if stats else 0
     
     def get_total_revenue(self, obj):
-        if hasattr(obj, 'owners') and obj.owners:
-            return obj.owners.store_orders.filter(
-                status='Completed'
-            ).aggregate(
-                total=Sum('total_price')
-            )['total'] or 0.0
-        return 0.0
+        stats = self._stats(obj)
+        return stats.revenue if stats else 0.0
     
     def get_last_active(self, obj):
         return obj.last_login.isoformat() if obj.last_login else None
@@ -8,12 +8,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from .serializers import DropshipperAdminSerializer, DropshipperListSerializer, DropshipperDetailSerializer
 
-from django.db.models import Count, Sum, Q, Case, When, BooleanField, DecimalField, IntegerField, CharField, Value
+from django.db.models import F, Case, When, BooleanField, DecimalField, Value
 from django.db.models.functions import Coalesce
 from mall.models import Product 
 
 from django.utils import timezone
-from order.pagination import CustomPagination
+from mall.pagination import CappedCountPagination
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
@@ -39,7 +39,8 @@ class DropshipperAdminViewSet(viewsets.ModelViewSet):
    queryset = CustomUser.objects.filter(is_store_owner=True)
    permission_classes = [IsAdminUser]
    lookup_field = 'id'
-   pagination_class = CustomPagination
+   pagination_class = CappedCountPagination
+   cursor_ordering = '-date_joined'
 
    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
    filterset_class = DropshipperFilter
@@ -99,41 +100,15 @@ class DropshipperAdminViewSet(viewsets.ModelViewSet):
       now = timezone.now()
       thirty_days_ago = now - timezone.timedelta(days=30)
       
-      return super().get_queryset().select_related('owners').prefetch_related(
-         'owners__store_orders'
-      ).annotate(
-         # Store metrics
-         total_products=Coalesce(
-            Count('owners__pricings', distinct=True),
-            0,
-            output_field=IntegerField()
-         ),
-         total_products_available=Coalesce(
-            Count(
-               'owners__pricings',
-               filter=Q(owners__pricings__product__is_available=True),
-               distinct=True
-            ),
-            0,
-            output_field=IntegerField()
-         ),
-         total_products_sold=Coalesce(
-            Sum(
-               'owners__store_orders__items__quantity',
-               filter=Q(owners__store_orders__status='Completed'),
-               output_field=IntegerField()
-            ), 
-            0, 
-            output_field=IntegerField()
-         ),
+      return super().get_queryset().select_related('owners', 'owners__stats').annotate(
+         # Store metrics, read from the store's StoreStats row
+         total_products=Coalesce(F('owners__stats__products_added'), 0),
+         total_products_available=Coalesce(F('owners__stats__products_available'), 0),
+         total_products_sold=Coalesce(F('owners__stats__units_sold'), 0),
          total_revenue=Coalesce(
-            Sum(
-               'owners__store_orders__total_price',
-               filter=Q(owners__store_orders__status='Completed'),
-               output_field=DecimalField(max_digits=12, decimal_places=2)
-            ), 
-            0.0,
-            output_field=DecimalField(max_digits=12, decimal_places=2)
+            F('owners__stats__revenue'),
+            Value(0),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
          ),
          
          # Activity status
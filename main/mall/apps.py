@@ -11,3 +11,6 @@ class MallConfig(AppConfig):
             import mall.signals
         except ImportError:
             pass
+
+        from .instrumentation import install_http_instrumentation
+        install_http_instrumentation()
@@ -0,0 +1,277 @@
+"""
+Timings of the hot endpoints, kept for regression comparison.
+
+Each scenario sends its request through the full middleware stack with
+Django's test client, so there is no network hop and the numbers are server
+time against the configured database and cache: normally a local Postgres
+and Redis loaded by `manage.py seed_scale`. A scenario records latency
+percentiles and the median query and cache counts from the request
+instrumentation (mall/instrumentation.py). Results are written as JSON
+files, and compare_results() checks a run against an earlier one.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import statistics
+import subprocess
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from order.models import PaystackWebhook, StoreOrder
+from .models import CustomUser, MarketPlace, Product, Store
+from .scale_seed import CHECKOUT_REFERENCE_PREFIX, SEED_EMAIL_DOMAIN
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = {}
+
+# Table sizes saved with each run; timings are only comparable at similar volumes
+VOLUME_MODELS = (Store, Product, MarketPlace, StoreOrder, PaystackWebhook)
+
+
+class ScenarioSkipped(Exception):
+    pass
+
+
+def scenario(name):
+    """Register `func(client, context)`, which sends one request and returns the response"""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class BenchmarkContext:
+    """The rows the scenarios request, preferring the newest seeded ones"""
+
+    def __init__(self):
+        seeded_stores = Store.objects.filter(owner__email__endswith=SEED_EMAIL_DOMAIN)
+        self.store = (seeded_stores.order_by('-created_at').first()
+                      or Store.objects.order_by('-created_at').first())
+        self.admin = (CustomUser.objects.filter(is_staff=True, email__endswith=SEED_EMAIL_DOMAIN).order_by('-date_joined').first()
+                      or CustomUser.objects.filter(is_staff=True).first())
+        self.order_sn = StoreOrder.objects.filter(order_sn__isnull=False).values_list('order_sn', flat=True).first()
+        self._tokens = {}
+        self._checkouts = None
+
+    def auth(self, user):
+        if user is None:
+            raise ScenarioSkipped("no user to authenticate as")
+        if user.pk not in self._tokens:
+            self._tokens[user.pk] = {'HTTP_AUTHORIZATION': f"Bearer {AccessToken.for_user(user)}"}
+        return self._tokens[user.pk]
+
+    def require_store(self):
+        if self.store is None:
+            raise ScenarioSkipped("no stores, run seed_scale first")
+        return self.store
+
+    def next_checkout(self):
+        """A pending seeded checkout; the webhook consumes it"""
+        if self._checkouts is None:
+            self._checkouts = iter(PaystackWebhook.objects.filter(
+                reference__startswith=CHECKOUT_REFERENCE_PREFIX, status='Pending', user__user_cart__items__isnull=False
+            ).select_related('user').distinct().order_by('created_at'))
+        checkout = next(self._checkouts, None)
+        if checkout is None:
+            raise ScenarioSkipped("no pending seeded checkouts left, run seed_scale with --carts")
+        return checkout
+
+
+@scenario('marketplace')
+def marketplace(client, context):
+    return client.get('/rocktea/marketplace/', {'mall': context.require_store().id})
+
+
+@scenario('products')
+def products(client, context):
+    return client.get('/rocktea/products/')
+
+
+@scenario('checkout_webhook')
+def checkout_webhook(client, context):
+    checkout = context.next_checkout()
+    body = json.dumps({
+        'event': 'charge.success',
+        'data': {
+            'reference': checkout.reference,
+            'amount': int(checkout.total_price * 100),
+            'email': checkout.user.email,
+            'metadata': {'purpose': 'order', 'user_id': checkout.user_id},
+        },
+    }).encode('utf-8')
+    signature = hmac.new(settings.TEST_SECRET_KEY.encode('utf-8'), body, digestmod=hashlib.sha512).hexdigest()
+    return client.post('/mall/webhook/paystack/', body, content_type='application/json',
+                       HTTP_X_PAYSTACK_SIGNATURE=signature)
+
+
+@scenario('admin_orders')
+def admin_orders(client, context):
+    return client.get('/api/admin/orders/', **context.auth(context.admin))
+
+
+@scenario('admin_orders_search')
+def admin_orders_search(client, context):
+    if not context.order_sn:
+        raise ScenarioSkipped("no orders to search for")
+    return client.get('/api/admin/orders/', {'search': context.order_sn}, **context.auth(context.admin))
+
+
+@scenario('admin_transactions')
+def admin_transactions(client, context):
+    return client.get('/api/admin/orders/transactions/', **context.auth(context.admin))
+
+
+@scenario('admin_dashboard')
+def admin_dashboard(client, context):
+    return client.get('/api/admin/dashboard/', **context.auth(context.admin))
+
+
+@scenario('dropshipper_analytics')
+def dropshipper_analytics(client, context):
+    return client.get('/api/admin/dropshipper-analytic/', **context.auth(context.admin))
+
+
+@scenario('sales_series')
+def sales_series(client, context):
+    return client.get('/api/admin/sales-series/', **context.auth(context.admin))
+
+
+@scenario('store_dashboard')
+def store_dashboard(client, context):
+    store = context.require_store()
+    return client.get('/mall/count/', {'mall': store.id}, **context.auth(store.owner))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def clear_throttle_history():
+    # Repeated runs would otherwise hit the anon and user rate limits
+    if hasattr(cache, 'delete_pattern'):
+        cache.delete_pattern('throttle_*')
+
+
+def run_scenario(func, client, context, iterations, warmup):
+    durations, queries, cache_calls = [], [], []
+    statuses = Counter()
+    clear_throttle_history()
+    for i in range(warmup + iterations):
+        start = time.perf_counter()
+        response = func(client, context)
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        durations.append(elapsed * 1000)
+        statuses[str(response.status_code)] += 1
+        stats = getattr(response.wsgi_request, 'instrumentation', None)
+        if stats is not None:
+            queries.append(stats.db_queries)
+            cache_calls.append(stats.cache_calls)
+
+    return {
+        'iterations': len(durations),
+        'p50_ms': round(percentile(durations, 0.5), 2),
+        'p95_ms': round(percentile(durations, 0.95), 2),
+        'mean_ms': round(statistics.fmean(durations), 2),
+        'min_ms': round(min(durations), 2),
+        'max_ms': round(max(durations), 2),
+        'queries': statistics.median(queries) if queries else None,
+        'cache_calls': statistics.median(cache_calls) if cache_calls else None,
+        'statuses': dict(statuses),
+    }
+
+
+def run_benchmarks(names=None, iterations=20, warmup=3, host='localhost', log=None):
+    """Run the named scenarios (all by default), returns the results document"""
+    log = log or logger.info
+    client = Client(HTTP_HOST=host, raise_request_exception=False)
+    context = BenchmarkContext()
+
+    scenarios = {}
+    for name in names or SCENARIOS:
+        try:
+            scenarios[name] = run_scenario(SCENARIOS[name], client, context, iterations, warmup)
+        except ScenarioSkipped as e:
+            scenarios[name] = {'skipped': str(e)}
+        log(f"{name}: {scenarios[name]}")
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'git_commit': git_commit(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'iterations': iterations,
+        'warmup': warmup,
+        'volumes': {model._meta.label: model.objects.count() for model in VOLUME_MODELS},
+        'scenarios': scenarios,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results, directory):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{timezone.now().strftime('%Y%m%dT%H%M%S')}.json"
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def latest_results(directory, exclude=None):
+    """Path of the newest results file in `directory`, or None"""
+    paths = sorted(path for path in Path(directory).glob('*.json') if path != exclude)
+    return paths[-1] if paths else None
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """
+    Per-scenario changes against a baseline run. A scenario regressed when its
+    p50 grew by more than `threshold` (a fraction), it runs more queries, or
+    it returned a 4xx/5xx status the baseline didn't (a fast error page is
+    not an improvement).
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if 'skipped' in result or not before or 'skipped' in before:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0.0
+        more_queries = (result['queries'] or 0) > (before.get('queries') or 0)
+        new_errors = sorted(
+            code for code in result.get('statuses', {})
+            if int(code) >= 400 and code not in before.get('statuses', {})
+        )
+        rows.append({
+            'scenario': name,
+            'baseline_p50_ms': before['p50_ms'],
+            'p50_ms': result['p50_ms'],
+            'change': change,
+            'baseline_queries': before.get('queries'),
+            'queries': result['queries'],
+            'baseline_statuses': before.get('statuses'),
+            'statuses': result.get('statuses'),
+            'new_errors': new_errors,
+            'regressed': change > threshold or more_queries or bool(new_errors),
+        })
+    return rows
@@ -2,6 +2,10 @@ from django.core.cache import cache
 from django.conf import settings
 import hashlib
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 def get_cache_key(prefix, *args, **kwargs):
     """Generate a consistent cache key"""
@@ -31,6 +35,39 @@ def invalidate_cache_pattern(pattern):
         # Fallback for cache backends that don't support delete_pattern
         pass
 
+def get_stale_while_revalidate(key, build, soft_timeout, hard_timeout, refresh=None, lock_timeout=60):
+    """
+    Return a cached value, refreshing it in the background once it is stale.
+
+    Entries are fresh for `soft_timeout` seconds and kept for `hard_timeout`.
+    After going stale, the first caller to take the refresh lock calls
+    `refresh` (e.g. a Celery task's delay) which must store the new value with
+    set_stale_while_revalidate; every other caller keeps getting the cached
+    value meanwhile. Without `refresh` the lock holder rebuilds inline.
+    Only a cold or expired key makes the caller wait for `build`.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        value = build()
+        set_stale_while_revalidate(key, value, soft_timeout, hard_timeout)
+        return value
+
+    if time.time() >= entry['fresh_until'] and cache.add(f"{key}:refresh-lock", True, lock_timeout):
+        try:
+            if refresh is not None:
+                refresh()
+            else:
+                set_stale_while_revalidate(key, build(), soft_timeout, hard_timeout)
+        except Exception as e:
+            # Serve the stale value; the lock expires and a later caller retries
+            logger.error(f"Background refresh of {key} failed to start: {e}")
+    return entry['value']
+
+def set_stale_while_revalidate(key, value, soft_timeout, hard_timeout):
+    """Store a value for get_stale_while_revalidate and release its refresh lock"""
+    cache.set(key, {'value': value, 'fresh_until': time.time() + soft_timeout}, hard_timeout)
+    cache.delete(f"{key}:refresh-lock")
+
 class CacheManager:
     """Centralized cache management"""
     
@@ -0,0 +1,142 @@
+"""
+Read replica routing with read-your-writes stickiness.
+
+ReplicaRoutingMiddleware lets the reads of GET/HEAD/OPTIONS requests go to
+one of settings.DATABASE_REPLICAS (one replica per request, so a response
+never mixes two replicas). Everything else stays on the primary:
+
+- requests with other methods, and reads inside transaction.atomic();
+- the rest of a request once it has written;
+- for REPLICA_STICKY_SECONDS after a write, requests from the same client,
+  recognised by a cookie or, for token clients that drop cookies, by a cache
+  marker keyed on a hash of the Authorization header.
+
+Code outside requests (Celery tasks, commands) reads from the primary unless
+it opts in with `replica_reads()`, which suits exports and analytics that
+tolerate a little replication lag.
+"""
+import contextvars
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'rt_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Where the reads of the current request or block go"""
+
+    def __init__(self, use_replica):
+        aliases = replicas()
+        self.replica = random.choice(aliases) if use_replica and aliases else None
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads in the block to a replica"""
+    token = _state.set(RoutingState(use_replica=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Keep the reads in the block on the primary, e.g. right after a write elsewhere"""
+    token = _state.set(RoutingState(use_replica=False))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        # Reads in a transaction must see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary
+        if db in replicas():
+            return False
+        return None
+
+
+def sticky_marker_key(request):
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    return f"db:primary:{hashlib.sha256(authorization.encode()).hexdigest()[:32]}"
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use a replica (see module docstring)"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        state = RoutingState(use_replica=safe and bool(replicas()) and not self.is_sticky(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if replicas() and (state.wrote or not safe):
+            self.stick(request, response)
+        return response
+
+    def is_sticky(self, request):
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        key = sticky_marker_key(request)
+        return bool(key and cache.get(key))
+
+    def stick(self, request, response):
+        window = sticky_seconds()
+        response.set_cookie(
+            STICKY_COOKIE, str(int(time.time() + window)), max_age=window,
+            httponly=True, samesite='Lax', secure=request.is_secure()
+        )
+        key = sticky_marker_key(request)
+        if key:
+            cache.set(key, 1, window)
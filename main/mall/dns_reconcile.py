@@ -0,0 +1,119 @@
+"""
+Reconcile store CNAMEs in Route53 with the Store table.
+
+The hosted zone is read once with the list_resource_record_sets paginator
+and compared in memory with every store: completed stores without their
+record get an UPSERT, store records without a store get a DELETE, and all of
+it goes out as one DNSChangeQueue flush. Store records are the CNAMEs
+`<slug>.<target_domain>` pointing at `<target_domain>` itself, with a single
+slug label that is not one of DNS_RESERVED_LABELS. Orphans are only deleted
+when asked to (delete_orphans); otherwise they are reported.
+
+Passing retired domains (an old target domain after an environment rename)
+reports the store records under them as orphans as well, so with
+delete_orphans they are deleted in the same change set that upserts the
+records under the current domain.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Store
+from .utils import determine_environment_config
+from workshop.route53 import DNSChangeQueue, list_cname_records
+
+logger = logging.getLogger(__name__)
+
+SLUG_LABEL = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+
+
+def store_record_name(slug, domain_name, target_domain):
+    """The CNAME a store should have under `target_domain`"""
+    match = re.search(r'https?://([^/?]+)', domain_name or '')
+    host = match.group(1).lower() if match else ''
+    if host.endswith(f".{target_domain}"):
+        return host
+    return f"{slug}.{target_domain}".lower()
+
+
+def expected_store_records(target_domain):
+    """{record name: store id} for completed stores and stores marked as provisioned"""
+    stores = Store.objects.filter(
+        Q(completed=True) | Q(dns_record_created=True)
+    ).exclude(slug='').values_list('id', 'slug', 'domain_name')
+    return {
+        store_record_name(slug, domain_name, target_domain): store_id
+        for store_id, slug, domain_name in stores.iterator(chunk_size=2000)
+    }
+
+
+def is_store_record(name, value, domains):
+    """Whether a CNAME looks like a store record: `<slug>.<domain>` pointing at the domain"""
+    if value not in domains or not name.endswith(f".{value}"):
+        return False
+    label = name[:-len(value) - 1]
+    return bool(SLUG_LABEL.match(label)) and label not in getattr(settings, 'DNS_RESERVED_LABELS', ())
+
+
+def reconcile_store_dns(env_config=None, retired_domains=(), dry_run=False, delete_orphans=False, client=None):
+    """
+    Bring the zone and Store.dns_record_created in line with the store table.
+    Returns a summary dict; with dry_run nothing is changed, and orphaned
+    records are only deleted with delete_orphans.
+    """
+    env_config = env_config or determine_environment_config()
+    if env_config.get('is_local', False):
+        logger.info("Local environment - skipping DNS reconciliation")
+        return {'skipped': True}
+
+    target_domain = env_config['target_domain'].lower()
+    zone_id = env_config['hosted_zone_id']
+    retired_domains = [domain.lower() for domain in retired_domains]
+
+    records = list_cname_records(zone_id, [target_domain, *retired_domains], client=client)
+    expected = expected_store_records(target_domain)
+
+    missing = [name for name in expected if records.get(name) != target_domain]
+    orphaned = {
+        name: value for name, value in records.items()
+        if name not in expected and is_store_record(name, value, (target_domain, *retired_domains))
+    }
+    present = {store_id for name, store_id in expected.items() if records.get(name) == target_domain}
+
+    summary = {
+        'zone_records': len(records),
+        'stores': len(expected),
+        'missing': sorted(missing),
+        'orphaned': sorted(orphaned),
+        'deleted': [],
+        'flagged': 0,
+        'failed': {},
+    }
+    if dry_run:
+        return summary
+
+    queue = DNSChangeQueue(zone_id, client=client)
+    for name in missing:
+        queue.upsert(name, target_domain, key=name)
+    if delete_orphans:
+        for name, value in orphaned.items():
+            queue.delete(name, value, key=name)
+    result = queue.flush()
+    summary['failed'] = result.failed
+    summary['deleted'] = sorted(name for name in orphaned if delete_orphans and name not in result.failed)
+
+    present.update(expected[name] for name in missing if name not in result.failed)
+    summary['flagged'] = Store.objects.filter(
+        id__in=present, dns_record_created=False).update(dns_record_created=True)
+    # A store whose upsert failed has no working record
+    summary['unflagged'] = Store.objects.filter(
+        id__in=[expected[name] for name in missing if name in result.failed], dns_record_created=True
+    ).update(dns_record_created=False)
+
+    logger.info(
+        f"DNS reconciliation: {len(missing)} upserted, {len(summary['deleted'])} of {len(orphaned)} orphans deleted, "
+        f"{len(result.failed)} failed, {summary['flagged']} stores flagged"
+    )
+    return summary
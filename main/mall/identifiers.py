@@ -0,0 +1,217 @@
+"""
+Collision-free allocation of short public identifiers.
+
+Every identifier kind (SKU, order number, delivery code, ...) draws integers
+from its own database sequence and encodes them into the same short alphabet
+the random codes used. Numbers are leased from the sequence in blocks, so most
+allocations never touch the database, and because every number is handed out
+once the encoded codes are unique without retries or existence queries.
+
+New codes are one character longer than the legacy random codes of the same
+kind, so the two ranges can never overlap. The encoding is a fixed
+permutation of the code space: the formats below must not change once
+identifiers have been issued.
+
+The same formats let detail endpoints tell which field a public identifier
+can belong to, see resolve_identifier().
+"""
+import logging
+import os
+import re
+import string
+import threading
+from math import gcd
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+DIGITS = string.digits
+UPPER_DIGITS = string.ascii_uppercase + string.digits
+ALPHANUMERIC = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+
+class IdentifierFormat:
+    """Maps sequence numbers onto fixed-alphabet codes of at least `length` characters"""
+
+    def __init__(self, alphabet, length, max_length):
+        self.alphabet = alphabet
+        self.length = length
+        self.max_length = max_length
+
+    def _space(self, length):
+        return len(self.alphabet) ** length
+
+    def _multiplier(self, space):
+        # Any multiplier coprime with the space gives a bijection; start near
+        # the golden ratio so consecutive numbers land far apart
+        multiplier = int(space * 0.6180339887) | 1
+        while gcd(multiplier, space) != 1:
+            multiplier += 2
+        return multiplier
+
+    def matches(self, value):
+        """Whether `value` could be a code of this kind (new or legacy)"""
+        return 0 < len(value) <= self.max_length and all(char in self.alphabet for char in value)
+
+    def encode(self, number):
+        length = self.length
+        while number >= self._space(length):
+            number -= self._space(length)
+            length += 1
+        if length > self.max_length:
+            raise OverflowError(f"Identifier space exhausted for {length}-character codes")
+
+        space = self._space(length)
+        value = (number * self._multiplier(space) + space // 3) % space
+
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(length):
+            value, index = divmod(value, base)
+            chars.append(self.alphabet[index])
+        return "".join(reversed(chars))
+
+
+IDENTIFIER_FORMATS = {
+    'sku': IdentifierFormat(UPPER_DIGITS, 9, max_length=12),
+    'order_sn': IdentifierFormat(DIGITS, 6, max_length=12),
+    'delivery_code': IdentifierFormat(UPPER_DIGITS, 6, max_length=12),
+    'support_code': IdentifierFormat(UPPER_DIGITS, 11, max_length=12),
+    'promo_code': IdentifierFormat(UPPER_DIGITS, 6, max_length=10),
+    'username': IdentifierFormat(ALPHANUMERIC, 8, max_length=50),
+}
+
+
+def sequence_name(kind):
+    return f"mall_identifier_{kind}_seq"
+
+
+class IdentifierAllocator:
+    """Hands out sequence numbers from blocks leased per process"""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'IDENTIFIER_BLOCK_SIZE', 20)
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def _lease_block(self, kind):
+        """Reserve the next block number for `kind`"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT nextval(%s)", [sequence_name(kind)])
+                return cursor.fetchone()[0]
+
+        # Fallback for databases without sequences (local SQLite)
+        from .models import IdentifierSequence
+
+        with transaction.atomic():
+            sequence, _ = IdentifierSequence.objects.select_for_update().get_or_create(name=kind)
+            sequence.last_value += 1
+            sequence.save(update_fields=['last_value'])
+            return sequence.last_value
+
+    def next_number(self, kind):
+        with self._lock:
+            pid = os.getpid()
+            block = self._blocks.get(kind)
+            # Blocks inherited across a fork would be handed out twice
+            if block is None or block['pid'] != pid or block['next'] >= block['end']:
+                start = self._lease_block(kind) * self.block_size
+                block = {'pid': pid, 'next': start, 'end': start + self.block_size}
+                self._blocks[kind] = block
+            number = block['next']
+            block['next'] += 1
+            return number
+
+    def allocate(self, kind):
+        return IDENTIFIER_FORMATS[kind].encode(self.next_number(kind))
+
+
+allocator = IdentifierAllocator()
+
+
+def allocate_identifier(kind):
+    """Return a new unique identifier of the given kind, e.g. 'sku' or 'order_sn'"""
+    return allocator.allocate(kind)
+
+
+UUID_PATTERN = re.compile(r'^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$')
+
+IDENTIFIER_CACHE_TIMEOUT = 60 * 60
+
+
+def _identifier_cache_key(model, identifier):
+    return f"identifier:{model._meta.label_lower}:{identifier}"
+
+
+def _find_identifier(model, identifier, fields):
+    """
+    One OR'd lookup over the pk and the fields the identifier's format allows,
+    then an exact match on the other fields if that finds nothing: codes
+    entered by hand before the formats (lowercase, hyphens) fail the gate.
+    """
+    lookups = ['pk'] if UUID_PATTERN.match(identifier) else []
+    lookups += [field for field, kind in fields.items() if IDENTIFIER_FORMATS[kind].matches(identifier)]
+    pk = _lookup(model, identifier, lookups) if lookups else None
+    if pk is None:
+        others = [field for field in fields if field not in lookups]
+        if others:
+            pk = _lookup(model, identifier, others)
+    return pk
+
+
+def _lookup(model, identifier, lookups):
+    query = Q()
+    for field in lookups:
+        query |= Q(**{field: identifier})
+    rows = list(model.objects.filter(query).values('pk', *[field for field in lookups if field != 'pk'])[:len(lookups)])
+
+    # The same value can sit in several fields; the field order decides, like
+    # the sequential lookups this replaces
+    for field in lookups:
+        for row in rows:
+            if str(row[field]) == identifier:
+                return row['pk']
+    return None
+
+
+def resolve_identifier(model, identifier, fields):
+    """
+    Return the pk of the `model` row a public identifier refers to, or None.
+
+    `fields` maps identifier fields to their kind in IDENTIFIER_FORMATS, in
+    order of precedence, e.g. {'order_sn': 'order_sn', 'delivery_code': 'delivery_code'}.
+    Only the fields whose format fits are queried, and found mappings are cached.
+    """
+    key = _identifier_cache_key(model, identifier)
+    pk = cache.get(key)
+    if pk is None:
+        pk = _find_identifier(model, identifier, fields)
+        if pk is not None:
+            cache.set(key, pk, IDENTIFIER_CACHE_TIMEOUT)
+    return pk
+
+
+def get_by_identifier(queryset, identifier, fields):
+    """
+    Fetch the object for a public identifier from `queryset`, running its
+    select/prefetch_related only once the pk is known. Returns None if not found.
+    """
+    identifier = str(identifier).strip()
+    model = queryset.model
+    for _ in range(2):
+        pk = resolve_identifier(model, identifier, fields)
+        if pk is None:
+            return None
+        obj = queryset.filter(pk=pk).first()
+        # Cached mappings go stale if a code is edited or the row deleted
+        if obj is not None and (str(obj.pk) == identifier or any(
+            str(getattr(obj, field)) == identifier for field in fields
+        )):
+            return obj
+        cache.delete(_identifier_cache_key(model, identifier))
+    return None
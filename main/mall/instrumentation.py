@@ -0,0 +1,137 @@
+"""
+Per-request counters for database, cache and outbound HTTP work.
+
+`collect()` puts a RequestStats in a context variable and installs an
+execute_wrapper on every database connection of the current thread, so the
+totals belong to one request even with threaded workers. Cache calls are
+counted by InstrumentedRedisCache (the configured cache backend) and
+outbound HTTP calls by a hook on urllib3, which requests, boto3 and the
+Cloudinary SDK all go through. Outside collect() the hooks only cost a
+context variable lookup.
+"""
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django_redis.cache import RedisCache
+
+_current = contextvars.ContextVar('request_stats', default=None)
+_in_http_call = contextvars.ContextVar('in_http_call', default=False)
+_MISSING = object()
+
+
+class RequestStats:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.http_calls = 0
+        self.http_time = 0.0
+        self.view = None
+        self.query_budget = None
+
+
+def current_stats():
+    return _current.get()
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - start
+
+
+@contextmanager
+def collect(stats=None):
+    """Count the database, cache and HTTP work done inside the block"""
+    stats = stats or RequestStats()
+    token = _current.set(stats)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_count_query))
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+def _record_cache(start, hits=0, misses=0):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_calls += 1
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+        stats.cache_time += time.perf_counter() - start
+
+
+class InstrumentedCacheMixin:
+    """Counts calls into the current RequestStats; mix into a cache backend class"""
+
+    def get(self, key, default=None, *args, **kwargs):
+        start = time.perf_counter()
+        value = super().get(key, _MISSING, *args, **kwargs)
+        hit = value is not _MISSING
+        _record_cache(start, hits=int(hit), misses=int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        start = time.perf_counter()
+        values = super().get_many(keys, *args, **kwargs)
+        _record_cache(start, hits=len(values), misses=len(keys) - len(values))
+        return values
+
+
+def _counted(name):
+    def method(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(super(InstrumentedCacheMixin, self), name)(*args, **kwargs)
+        finally:
+            _record_cache(start)
+    method.__name__ = name
+    return method
+
+
+for _name in ('set', 'add', 'set_many', 'delete', 'delete_many', 'incr', 'decr',
+              'has_key', 'touch', 'keys', 'delete_pattern', 'ttl', 'expire'):
+    setattr(InstrumentedCacheMixin, _name, _counted(_name))
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
+
+
+def install_http_instrumentation():
+    """Count urllib3 requests made during collect(); safe to call more than once"""
+    from urllib3.connectionpool import HTTPConnectionPool
+
+    if getattr(HTTPConnectionPool.urlopen, 'instrumented', False):
+        return
+    original = HTTPConnectionPool.urlopen
+
+    def urlopen(self, *args, **kwargs):
+        stats = _current.get()
+        # urlopen calls itself for retries and redirects; count the outer call only
+        if stats is None or _in_http_call.get():
+            return original(self, *args, **kwargs)
+        token = _in_http_call.set(True)
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _in_http_call.reset(token)
+            stats.http_calls += 1
+            stats.http_time += time.perf_counter() - start
+
+    urlopen.instrumented = True
+    HTTPConnectionPool.urlopen = urlopen
@@ -0,0 +1,71 @@
+# mall/management/commands/benchmark_endpoints.py
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mall.benchmarks import SCENARIOS, compare_results, latest_results, run_benchmarks, write_results
+
+
+class Command(BaseCommand):
+    help = 'Times the hot endpoints against the local database and cache and compares with an earlier run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), dest='scenarios',
+                            help='Scenario to run (repeatable, default all)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument('--host', default='localhost', help='Host header sent with each request')
+        parser.add_argument('--output-dir', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'results'))
+        parser.add_argument('--compare', help='Results file to compare with (default the newest in --output-dir)')
+        parser.add_argument('--threshold', type=float, default=20.0, help='p50 increase in percent that counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a scenario regressed')
+        parser.add_argument('--no-save', action='store_true', help='Do not write a results file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmarks run against PostgreSQL and Redis; unset CI and point PG*/REDIS* at local servers')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+
+        output_dir = Path(options['output_dir'])
+        baseline_path = Path(options['compare']) if options['compare'] else latest_results(output_dir) if output_dir.exists() else None
+
+        results = run_benchmarks(options['scenarios'], options['iterations'], options['warmup'], options['host'])
+
+        self.stdout.write(f"{'scenario':24} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}  statuses")
+        for name, result in results['scenarios'].items():
+            if 'skipped' in result:
+                self.stdout.write(self.style.WARNING(f"{name:24} skipped: {result['skipped']}"))
+                continue
+            self.stdout.write(
+                f"{name:24} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} {str(result['queries']):>8}  {result['statuses']}")
+
+        if not options['no_save']:
+            path = write_results(results, output_dir)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {path}'))
+
+        if baseline_path is None:
+            return
+        try:
+            baseline = json.loads(baseline_path.read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {baseline_path}: {e}')
+
+        self.stdout.write(f"\nCompared with {baseline_path.name} ({baseline.get('git_commit') or 'unknown commit'}, volumes {baseline.get('volumes')})")
+        regressions = []
+        for row in compare_results(results, baseline, options['threshold'] / 100):
+            line = (f"{row['scenario']:24} {row['baseline_p50_ms']:9.1f} -> {row['p50_ms']:9.1f} ms "
+                    f"({row['change']:+.0%}), queries {row['baseline_queries']} -> {row['queries']}")
+            if row['new_errors']:
+                line += f", statuses {row['baseline_statuses']} -> {row['statuses']}"
+            if row['regressed']:
+                regressions.append(row['scenario'])
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressed: {', '.join(regressions)}")
@@ -0,0 +1,49 @@
+# mall/management/commands/celery_health.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from setup.celery import app
+from setup.emails import outbox_length
+from setup.task_metrics import queue_snapshot
+from setup.worker_topology import routed_queues
+
+
+class Command(BaseCommand):
+    help = 'Reports Celery queue depth, oldest-message age and worker heartbeats; fails when thresholds are exceeded.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-depth', type=int, default=500, help='Pending messages allowed per queue')
+        parser.add_argument('--max-age', type=float, default=300, help='Seconds the oldest message may wait')
+        parser.add_argument('--max-heartbeat-age', type=float, default=120, help='Seconds since a worker heartbeat')
+        parser.add_argument('--json', action='store_true', help='Print the snapshot as JSON')
+
+    def handle(self, *args, **options):
+        snapshot = queue_snapshot(sorted(routed_queues(app)))
+        snapshot['email_outbox'] = outbox_length()
+
+        if options['json']:
+            self.stdout.write(json.dumps(snapshot, indent=2))
+        else:
+            for queue, info in snapshot['queues'].items():
+                age = info['oldest_age_seconds']
+                self.stdout.write(f"  {queue:12} depth={info['depth']:<6} oldest={'?' if age is None else f'{age:.0f}s'}")
+            self.stdout.write(f"  {'outbox':12} depth={snapshot['email_outbox']}")
+            for hostname, info in snapshot['workers'].items():
+                self.stdout.write(f"  {hostname:30} heartbeat {info['heartbeat_age_seconds']}s ago")
+
+        problems = []
+        for queue, info in snapshot['queues'].items():
+            if info['depth'] > options['max_depth']:
+                problems.append(f"{queue} has {info['depth']} pending messages")
+            if info['oldest_age_seconds'] and info['oldest_age_seconds'] > options['max_age']:
+                problems.append(f"{queue} oldest message has waited {info['oldest_age_seconds']:.0f}s")
+        if not snapshot['workers']:
+            problems.append('No worker heartbeats recorded')
+        for hostname, info in snapshot['workers'].items():
+            if info['heartbeat_age_seconds'] > options['max_heartbeat_age']:
+                problems.append(f"{hostname} last heartbeat {info['heartbeat_age_seconds']}s ago")
+
+        if problems:
+            raise CommandError('Celery health check failed:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Celery queues and workers healthy'))
@@ -0,0 +1,42 @@
+# mall/management/commands/reconcile_store_dns.py
+from django.core.management.base import BaseCommand, CommandError
+
+from mall.dns_reconcile import reconcile_store_dns
+
+
+class Command(BaseCommand):
+    help = ('Syncs store CNAMEs in Route53 with the Store table in one batched change set. '
+            'Only reports the differences unless --apply is passed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Make the changes instead of only reporting them')
+        parser.add_argument('--delete-orphans', action='store_true',
+                            help='With --apply, also delete store records that have no store')
+        parser.add_argument('--retire', action='append', default=[], metavar='DOMAIN',
+                            help='Delete store records under a previous target domain (repeatable)')
+
+    def handle(self, *args, **options):
+        dry_run = not options['apply']
+        summary = reconcile_store_dns(
+            retired_domains=options['retire'], dry_run=dry_run, delete_orphans=options['delete_orphans']
+        )
+        if summary.get('skipped'):
+            self.stdout.write('Local environment - nothing to reconcile')
+            return
+
+        self.stdout.write(f"Zone records: {summary['zone_records']}, stores expecting a record: {summary['stores']}")
+        for name in summary['missing']:
+            self.stdout.write(f"  + {name}")
+        for name in summary['orphaned']:
+            self.stdout.write(f"  - {name}")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('Dry run - no changes made, pass --apply to make them'))
+            return
+        if summary['failed']:
+            raise CommandError('Failed changes:\n  ' + '\n  '.join(
+                f"{name}: {error}" for name, error in summary['failed'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Upserted {len(summary['missing'])}, deleted {len(summary['deleted'])}, flagged {summary['flagged']} stores"))
+        if summary['orphaned'] and not options['delete_orphans']:
+            self.stdout.write(self.style.WARNING('Orphaned records kept, pass --delete-orphans to delete them'))
@@ -0,0 +1,79 @@
+# mall/management/commands/run_workers.py
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from setup.celery import app
+from setup.worker_topology import get_topology, validate_topology, worker_argv, worker_env
+
+
+class Command(BaseCommand):
+    help = 'Starts one Celery worker per WORKER_TOPOLOGY group after checking every routed queue has a consumer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', help='Only start this worker group (repeatable)')
+        parser.add_argument('--check', action='store_true', help='Validate the topology and exit')
+        parser.add_argument('--dry-run', action='store_true', help='Print the worker commands without starting them')
+        parser.add_argument('--loglevel', default='info', help='Celery log level (default info)')
+
+    def handle(self, *args, **options):
+        topology = get_topology()
+        problems = validate_topology(app, topology)
+        if problems:
+            raise CommandError('Invalid worker topology:\n  ' + '\n  '.join(problems))
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f'Worker topology OK: {len(topology)} groups'))
+            return
+
+        groups = options['group'] or list(topology)
+        unknown = [name for name in groups if name not in topology]
+        if unknown:
+            raise CommandError(f"Unknown worker group(s): {', '.join(unknown)}")
+
+        commands = {name: worker_argv(name, topology[name], options['loglevel']) for name in groups}
+        for name, argv in commands.items():
+            self.stdout.write(f"  {name}: {' '.join(argv)}")
+        if options['dry_run']:
+            return
+
+        self.run(commands, {name: worker_env(topology[name]) for name in groups})
+
+    def run(self, commands, environments):
+        processes = {
+            name: subprocess.Popen([sys.executable, '-m'] + argv, env={**os.environ, **environments[name]})
+            for name, argv in commands.items()
+        }
+
+        def stop(signum, frame):
+            for process in processes.values():
+                if process.poll() is None:
+                    process.send_signal(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        # A worker that dies takes the others down so the supervisor restarts
+        # the whole set instead of running with a queue left unconsumed
+        exit_code = 0
+        try:
+            while processes:
+                for name, process in list(processes.items()):
+                    code = process.poll()
+                    if code is None:
+                        continue
+                    del processes[name]
+                    if code != 0 and not exit_code:
+                        self.stderr.write(f'Worker group {name} exited with code {code}, stopping the others')
+                        exit_code = code
+                        stop(signal.SIGTERM, None)
+                time.sleep(1)
+        finally:
+            stop(signal.SIGTERM, None)
+
+        if exit_code:
+            sys.exit(exit_code)
@@ -0,0 +1,49 @@
+# mall/management/commands/seed_scale.py
+from dataclasses import fields
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mall.scale_seed import SEED_PASSWORD, ScaleConfig, ScaleSeeder
+
+
+class Command(BaseCommand):
+    help = 'Bulk-inserts production-scale synthetic stores, products, orders, carts and webhooks for load testing.'
+
+    def add_arguments(self, parser):
+        defaults = ScaleConfig()
+        parser.add_argument('--stores', type=int, default=defaults.stores, help='Stores, each with an owner and wallet')
+        parser.add_argument('--products', type=int, default=defaults.products, help='Catalogue products')
+        parser.add_argument('--variants-per-product', type=int, default=defaults.variants_per_product)
+        parser.add_argument('--listed-per-store', type=int, default=defaults.listed_per_store,
+                            help='Products each store prices and lists in its marketplace')
+        parser.add_argument('--buyers', type=int, default=defaults.buyers)
+        parser.add_argument('--orders', type=int, default=defaults.orders)
+        parser.add_argument('--items-per-order', type=int, default=defaults.items_per_order, help='Most items in one order')
+        parser.add_argument('--carts', type=int, default=defaults.carts,
+                            help='Buyers with an open cart and a pending checkout (at most --buyers)')
+        parser.add_argument('--webhooks', type=int, default=defaults.webhooks,
+                            help='Orders that get a settled Paystack webhook')
+        parser.add_argument('--days', type=int, default=defaults.days, help='Orders are spread over this many days')
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for repeatable volumes and prices')
+        parser.add_argument('--force', action='store_true', help='Allow seeding with DEBUG off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to seed synthetic data with DEBUG off; pass --force if this database is disposable')
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_scale needs PostgreSQL (variant colours are array columns)')
+
+        config = ScaleConfig(**{field.name: options[field.name] for field in fields(ScaleConfig)})
+        if min(config.stores, config.products, config.batch_size, config.days) < 1:
+            raise CommandError('--stores, --products, --batch-size and --days must be positive')
+
+        seeder = ScaleSeeder(config, log=lambda message: self.stdout.write(self.style.NOTICE(message)))
+        counts = seeder.seed()
+
+        for label, count in counts.items():
+            self.stdout.write(f'  {label:32} {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seed run {seeder.run} complete; accounts sign in with password {SEED_PASSWORD!r}'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+IDENTIFIER_KINDS = ('sku', 'order_sn', 'delivery_code', 'support_code', 'promo_code', 'username')
+
+
+def create_identifier_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for kind in IDENTIFIER_KINDS:
+        schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS mall_identifier_{kind}_seq")
+
+
+def drop_identifier_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for kind in IDENTIFIER_KINDS:
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS mall_identifier_{kind}_seq")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0057_alter_customuser_is_logistics_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=12, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='reportuser',
+            name='support_code',
+            field=models.CharField(default='', max_length=12),
+        ),
+        migrations.RunPython(create_identifier_sequences, drop_identifier_sequences),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def backfill_store_stats(apps, schema_editor):
+    Store = apps.get_model('mall', 'Store')
+    StoreStats = apps.get_model('mall', 'StoreStats')
+    StoreProductPricing = apps.get_model('mall', 'StoreProductPricing')
+    MarketPlace = apps.get_model('mall', 'MarketPlace')
+    CustomUser = apps.get_model('mall', 'CustomUser')
+    StoreOrder = apps.get_model('order', 'StoreOrder')
+    OrderItems = apps.get_model('order', 'OrderItems')
+
+    def grouped(queryset, key, **aggregates):
+        return {row[key]: row for row in queryset.order_by().values(key).annotate(**aggregates)}
+
+    pricings = grouped(
+        StoreProductPricing.objects.all(), 'store_id',
+        added=Count('id'), available=Count('id', filter=Q(product__is_available=True)))
+    listed = grouped(MarketPlace.objects.filter(list_product=True), 'store_id', total=Count('id'))
+    customers = grouped(CustomUser.objects.exclude(associated_domain=None), 'associated_domain_id', total=Count('id'))
+    orders = grouped(
+        StoreOrder.objects.all(), 'store_id',
+        total=Count('id'), revenue=Sum('total_price', filter=Q(status='Completed')))
+    units = grouped(
+        OrderItems.objects.filter(userorder__status='Completed'), 'userorder__store_id', total=Sum('quantity'))
+
+    now = timezone.now()
+    StoreStats.objects.bulk_create([
+        StoreStats(
+            store_id=store_id,
+            listed_products=listed.get(store_id, {}).get('total') or 0,
+            orders=orders.get(store_id, {}).get('total') or 0,
+            customers=customers.get(store_id, {}).get('total') or 0,
+            products_added=pricings.get(store_id, {}).get('added') or 0,
+            products_available=pricings.get(store_id, {}).get('available') or 0,
+            units_sold=units.get(store_id, {}).get('total') or 0,
+            revenue=orders.get(store_id, {}).get('revenue') or 0,
+            reconciled_at=now,
+        )
+        for store_id in Store.objects.values_list('id', flat=True)
+    ], batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0058_identifiersequence_alter_product_sku_and_more'),
+        ('order', '0023_alter_orderdeliveryconfirmation_code_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreStats',
+            fields=[
+                ('store', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='mall.store')),
+                ('listed_products', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('customers', models.IntegerField(default=0)),
+                ('products_added', models.IntegerField(default=0)),
+                ('products_available', models.IntegerField(default=0)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_store_stats, migrations.RunPython.noop),
+    ]
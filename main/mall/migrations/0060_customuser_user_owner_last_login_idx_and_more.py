@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('mall', '0059_storestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['is_store_owner', 'last_login'], name='user_owner_last_login_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(fields=['created_at'], name='store_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storestats',
+            index=models.Index(fields=['products_available'], name='storestats_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storestats',
+            index=models.Index(fields=['revenue'], name='storestats_revenue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storestats',
+            index=models.Index(fields=['units_sold'], name='storestats_units_sold_idx'),
+        ),
+    ]
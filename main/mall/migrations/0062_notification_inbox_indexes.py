@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0061_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['store', 'read', 'created_at'], name='notif_store_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read', 'created_at'], name='notif_recipient_inbox_idx'),
+        ),
+    ]
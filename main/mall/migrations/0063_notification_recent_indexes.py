@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0062_notification_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['store', 'created_at'], name='notif_store_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at'], name='notif_recipient_recent_idx'),
+        ),
+    ]
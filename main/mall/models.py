@@ -11,7 +11,10 @@ from django.contrib.postgres.fields import ArrayField
 from cloudinary.models import CloudinaryField
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
+from django.utils import timezone
 from django.core.validators import MinLengthValidator
+from .taxonomy import get_taxonomy_graph
+from .identifiers import allocate_identifier
 # from .file_validation import validate_file_size, validate_image_file
 
 # Conditionally import Cloudinary storage
@@ -94,6 +97,7 @@ class CustomUser(AbstractUser):
             models.Index(fields=['is_store_owner'], name='user_store_owner_idx'),
             models.Index(fields=['is_verified'], name='user_verified_idx'),
             models.Index(fields=['verification_token'], name='user_token_idx'),
+            models.Index(fields=['is_store_owner', 'last_login'], name='user_owner_last_login_idx'),
         ]
 
     def save(self, *args, **kwargs):
@@ -103,7 +107,7 @@ class CustomUser(AbstractUser):
 
 
     def _generate_unique_username(self):
-        return "".join(random.choices(string.ascii_uppercase + string.ascii_lowercase + string.digits, k=7))
+        return allocate_identifier('username')
 
     def __str__(self):
         return self.first_name
@@ -193,6 +197,7 @@ class Store(models.Model):
             models.Index(fields=['owner'], name='store_owner_ownerx'),
             models.Index(fields=['name'], name='store_name_namex'),
             models.Index(fields=['slug'], name='store_slug_idx'),
+            models.Index(fields=['created_at'], name='store_created_at_idx'),
         ]
 
     def __str__(self):
@@ -215,6 +220,30 @@ class Store(models.Model):
             self.completed = True
         super().save(*args, **kwargs)
 
+class StoreStats(models.Model):
+    """Per-store counters kept current by mall.store_stats and rebuilt nightly"""
+    store = models.OneToOneField(
+        Store, related_name="stats", on_delete=models.CASCADE, primary_key=True)
+    listed_products = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    customers = models.IntegerField(default=0)
+    products_added = models.IntegerField(default=0)
+    products_available = models.IntegerField(default=0)
+    # Units sold and revenue only count StoreOrder.SALES_STATUSES orders
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['products_available'], name='storestats_available_idx'),
+            models.Index(fields=['revenue'], name='storestats_revenue_idx'),
+            models.Index(fields=['units_sold'], name='storestats_units_sold_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.store_id}"
+
 class Product(models.Model):
     UPLOAD_STATUS = (
         ("Approved", "Approved"),
@@ -224,7 +253,7 @@ class Product(models.Model):
 
     id = models.CharField(max_length=36, default=uuid4,
                           unique=True, primary_key=True)
-    sku = models.CharField(max_length=8, unique=True, blank=True)
+    sku = models.CharField(max_length=12, unique=True, blank=True)
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(null=True)
     quantity = models.IntegerField()
@@ -264,46 +293,48 @@ class Product(models.Model):
         # Format the created_at field as "YMD, Timestamp"
         return self.created_at.strftime("%Y-%m-%d, %H:%M%p")
 
+    TAXONOMY_FIELDS = ('category_id', 'subcategory_id', 'producttype_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_taxonomy = instance._taxonomy_state()
+        instance._loaded_is_available = instance.__dict__.get('is_available')
+        return instance
+
+    def _taxonomy_state(self):
+        # Read from __dict__ so deferred fields are not fetched
+        return tuple(self.__dict__.get(field) for field in self.TAXONOMY_FIELDS)
+
+    def _taxonomy_changed(self):
+        return getattr(self, '_loaded_taxonomy', None) != self._taxonomy_state()
+
     def save(self, *args, **kwargs):
         # if not self.serial_number:
         #    self.serial_number = generate_unique_code()
         if not self.sku:
             self.sku = self._generate_sku()
 
-        try:
-            self.full_clean()  # Run model validation
-        except ValidationError as e:
-            # Combine all errors into a single message
-            error_message = " ".join(e.messages)
-            raise ValidationError(error_message)
-        return super().save(*args, **kwargs)
+        # Full validation only when the product is new or its taxonomy moved
+        if self._state.adding or self._taxonomy_changed():
+            try:
+                self.full_clean()  # Run model validation
+            except ValidationError as e:
+                # Combine all errors into a single message
+                error_message = " ".join(e.messages)
+                raise ValidationError(error_message)
+        result = super().save(*args, **kwargs)
+        self._loaded_taxonomy = self._taxonomy_state()
+        return result
 
     def _generate_sku(self):
-        while True:
-            sku = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            if not Product.objects.filter(sku=sku).exists():
-                return sku
+        return allocate_identifier('sku')
             
     def clean(self):
         """Validate that category, subcategory, and producttype are related"""
-        
-        errors = []
-        
-        # Check category-subcategory relationship
-        if self.subcategory and self.category:
-            if self.subcategory.category != self.category:
-                errors.append("Selected subcategory does not belong to the selected category.")
-        
-        # Check subcategory-producttype relationship
-        if self.producttype and self.subcategory:
-            if self.producttype.subcategory != self.subcategory:
-                errors.append("Selected product type does not belong to the selected subcategory.")
-        
-        # Check category-producttype relationship
-        if self.producttype and self.category:
-            if self.producttype.subcategory.category != self.category:
-                errors.append("Selected product type does not belong to the selected category.")
-        
+        errors = get_taxonomy_graph().validate(
+            self.category_id, self.subcategory_id, self.producttype_id)
+
         if errors:
             # Combine all errors into a single message
             raise ValidationError(" ".join(errors))
@@ -514,7 +545,7 @@ class ReportUser(models.Model):
     title = models.CharField(max_length=31, choices=OFFENSE, null=True)
     other = models.CharField(max_length=30, null=True)
     details = models.TextField()
-    support_code = models.CharField(max_length=10, default='')
+    support_code = models.CharField(max_length=12, default='')
     status = models.CharField(choices=STATUS, max_length=11, default='Pending')
 
     def __str__(self):
@@ -522,8 +553,7 @@ class ReportUser(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.support_code:
-            self.support_code = "".join(random.choices(
-                string.ascii_uppercase + string.digits, k=10))
+            self.support_code = allocate_identifier('support_code')
         return super().save(*args, **kwargs)
 
 class Notification(models.Model):
@@ -534,6 +564,16 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        # Unread counts and read/unread inbox pages per store or recipient,
+        # then the unfiltered inbox, newest first
+        indexes = [
+            models.Index(fields=['store', 'read', 'created_at'], name='notif_store_inbox_idx'),
+            models.Index(fields=['recipient', 'read', 'created_at'], name='notif_recipient_inbox_idx'),
+            models.Index(fields=['store', 'created_at'], name='notif_store_recent_idx'),
+            models.Index(fields=['recipient', 'created_at'], name='notif_recipient_recent_idx'),
+        ]
+
 class PromoPlans(models.Model):
     purpose = models.CharField(max_length=200)
     store = models.ForeignKey(Store, on_delete=models.CASCADE, null=True)
@@ -546,9 +586,7 @@ class PromoPlans(models.Model):
 
     def save(self, *args, **kwargs):
         if self.purpose:
-            promo_code = "".join(random.choices(
-                string.ascii_uppercase + string.digits, k=5))
-            self.code = promo_code
+            self.code = allocate_identifier('promo_code')
         super(PromoPlans, self).save(*args, **kwargs)
 
 class BuyerBehaviour(models.Model):
@@ -653,3 +691,41 @@ class ShippingData(models.Model):
 
     def __str__(self):
         return self.address
+
+class IdentifierSequence(models.Model):
+    """Block counter for mall.identifiers on databases without sequences"""
+    name = models.CharField(max_length=30, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.last_value})"
+
+class OutboxEvent(models.Model):
+    """Side effect recorded in the originating transaction and delivered by mall.outbox"""
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Pending events are due from this time; claiming an event pushes it out by a lease
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} ({self.idempotency_key})"
@@ -0,0 +1,120 @@
+"""
+Notification inbox helpers and the cached unread counters.
+
+Each store and each recipient has an unread counter in the cache, so a
+dashboard badge poll is one GET. Write paths move the counters after commit:
+Notification signals cover create/save/delete, and bulk_create_notifications
+and mark_read cover the bulk paths that bypass signals. A missing counter is
+rebuilt with one COUNT on the (owner, read, created_at) index, and counters
+expire so any drift corrects itself.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+from .realtime import publish_on_commit, store_channel, buyer_channel
+
+logger = logging.getLogger(__name__)
+
+UNREAD_COUNTER_TIMEOUT = 60 * 60 * 6
+
+
+def unread_key(store_id=None, recipient_id=None):
+    if store_id:
+        return f"notifications:unread:store:{store_id}"
+    return f"notifications:unread:user:{recipient_id}"
+
+
+def owner_keys(notification):
+    keys = []
+    if notification.store_id:
+        keys.append(unread_key(store_id=notification.store_id))
+    if notification.recipient_id:
+        keys.append(unread_key(recipient_id=notification.recipient_id))
+    return keys
+
+
+def unread_count(store_id=None, recipient_id=None):
+    """Unread notifications of a store or recipient, from the counter when cached"""
+    key = unread_key(store_id, recipient_id)
+    count = cache.get(key)
+    if count is None:
+        queryset = Notification.objects.filter(read=False)
+        if store_id:
+            queryset = queryset.filter(store_id=store_id)
+        else:
+            queryset = queryset.filter(recipient_id=recipient_id)
+        count = queryset.count()
+        cache.add(key, count, UNREAD_COUNTER_TIMEOUT)
+    return max(count, 0)
+
+
+def _adjust(key, delta):
+    try:
+        if delta > 0:
+            cache.incr(key, delta)
+        else:
+            cache.decr(key, -delta)
+    except ValueError:
+        # Not cached: the next read counts from the table
+        pass
+
+
+def adjust_unread(keys, delta):
+    """Move the counters by `delta` once the current transaction commits"""
+    if not delta or not keys:
+        return
+    transaction.on_commit(lambda: [_adjust(key, delta) for key in keys])
+
+
+def _adjust_for(notifications, sign):
+    deltas = {}
+    for notification in notifications:
+        for key in owner_keys(notification):
+            deltas[key] = deltas.get(key, 0) + sign
+    for key, delta in deltas.items():
+        adjust_unread([key], delta)
+
+
+def publish_notification(notification):
+    """Push a new notification to its store's and recipient's live channels"""
+    channels = [
+        store_channel(notification.store_id) if notification.store_id else None,
+        buyer_channel(notification.recipient_id) if notification.recipient_id else None,
+    ]
+    publish_on_commit(channels, 'notification', {
+        'id': notification.id,
+        'message': notification.message,
+        'created_at': notification.created_at,
+        'read': notification.read,
+    })
+
+
+def bulk_create_notifications(notifications):
+    """bulk_create that keeps the unread counters in step"""
+    created = Notification.objects.bulk_create(notifications)
+    _adjust_for([notification for notification in created if not notification.read], 1)
+    for notification in created:
+        publish_notification(notification)
+    return created
+
+
+def mark_read(store_id=None, recipient_id=None, ids=None):
+    """Mark a store's or recipient's notifications read, all or just `ids`; returns the number updated"""
+    queryset = Notification.objects.filter(read=False)
+    if store_id:
+        queryset = queryset.filter(store_id=store_id)
+    else:
+        queryset = queryset.filter(recipient_id=recipient_id)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    with transaction.atomic():
+        # Locked so a concurrent mark_read cannot decrement for the same rows
+        rows = list(queryset.select_for_update().only('id', 'store_id', 'recipient_id'))
+        if rows:
+            Notification.objects.filter(id__in=[row.id for row in rows]).update(read=True)
+    _adjust_for(rows, -1)
+    return len(rows)
@@ -19,7 +19,9 @@ class OptimizedProductSerializer(serializers.ModelSerializer):
         if hasattr(obj, 'prefetched_images'):
             first_image = obj.prefetched_images[0] if obj.prefetched_images else None
         else:
-            first_image = obj.images.first()
+            # Same image as images.first(), without a query per product
+            # when the view prefetched images
+            first_image = min(obj.images.all(), key=lambda image: image.pk, default=None)
         
         if first_image:
             return optimize_product_image(first_image.images.url)
@@ -0,0 +1,176 @@
+"""
+Transactional outbox for side effects triggered by model signals.
+
+Signal handlers call enqueue() instead of talking to Route53, Brevo and
+friends directly. The event row is written in the same transaction as the
+change that caused it, so it exists exactly when that change commits, and
+relay_outbox (a Celery task) delivers due events in batches.
+
+Delivery is at least once: an event whose worker dies mid-delivery becomes
+due again after OUTBOX_LEASE, so handlers must be idempotent. Each event has
+an idempotency key; enqueueing the same key twice records a single event.
+"""
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_LEASE = timedelta(minutes=5)
+OUTBOX_MAX_ATTEMPTS = 8
+RELAY_SCHEDULED_KEY = "outbox:relay-scheduled"
+
+_handlers = {}
+
+
+def outbox_handler(topic, batch=False, atomic=False):
+    """
+    Register the handler for a topic. Plain handlers get (payload, event);
+    batch handlers get the list of due events of their topic at once and may
+    return {event.pk: error} for the events that should be retried.
+
+    With atomic=True a batch handler commits together with marking its events
+    delivered; use it for handlers that only write rows.
+    """
+    def register(func):
+        _handlers[topic] = (func, batch, atomic)
+        return func
+    return register
+
+
+def enqueue(topic, payload, idempotency_key):
+    """Record an event in the current transaction and wake the relay after commit"""
+    from .models import OutboxEvent
+
+    event, created = OutboxEvent.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={'topic': topic, 'payload': payload},
+    )
+    if created:
+        transaction.on_commit(schedule_relay)
+    return event
+
+
+def schedule_relay():
+    """Run the relay shortly; bursts of events share one run"""
+    from .tasks import relay_outbox
+
+    if cache.add(RELAY_SCHEDULED_KEY, True, getattr(settings, 'OUTBOX_RELAY_DELAY', 2)):
+        try:
+            relay_outbox.apply_async(countdown=getattr(settings, 'OUTBOX_RELAY_DELAY', 2))
+        except Exception as e:
+            # The periodic relay still picks the event up
+            logger.error(f"Failed to schedule outbox relay: {str(e)}")
+
+
+def claim_events(batch_size):
+    """Lease up to `batch_size` due events to this worker"""
+    from .models import OutboxEvent
+
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                available_at=now + OUTBOX_LEASE
+            )
+    return events
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(30 * 2 ** attempts, 3600))
+
+
+def _mark_done(events):
+    from .models import OutboxEvent
+
+    OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+        status=OutboxEvent.DONE, processed_at=timezone.now(), last_error=''
+    )
+
+
+def _mark_failed(events, error):
+    from .models import OutboxEvent
+
+    now = timezone.now()
+    for event in events:
+        attempts = event.attempts + 1
+        gave_up = attempts >= OUTBOX_MAX_ATTEMPTS
+        OutboxEvent.objects.filter(pk=event.pk).update(
+            attempts=attempts,
+            status=OutboxEvent.FAILED if gave_up else OutboxEvent.PENDING,
+            available_at=now + _retry_delay(attempts),
+            last_error=str(error)[:2000],
+        )
+        if gave_up:
+            logger.error(f"Outbox event {event.idempotency_key} failed {attempts} times, giving up: {error}")
+
+
+def deliver(events):
+    """Run the handlers for claimed events; returns the number delivered"""
+    by_topic = {}
+    for event in events:
+        by_topic.setdefault(event.topic, []).append(event)
+
+    delivered = 0
+    for topic, topic_events in by_topic.items():
+        handler = _handlers.get(topic)
+        if handler is None:
+            _mark_failed(topic_events, f"No outbox handler for topic '{topic}'")
+            continue
+
+        func, batch, atomic = handler
+        if batch:
+            try:
+                with transaction.atomic() if atomic else nullcontext():
+                    failed = func(topic_events) or {}
+                    _mark_done([event for event in topic_events if event.pk not in failed])
+            except Exception as e:
+                logger.error(f"Outbox batch for {topic} failed: {str(e)}")
+                _mark_failed(topic_events, e)
+                continue
+            for event in topic_events:
+                if event.pk in failed:
+                    _mark_failed([event], failed[event.pk])
+            delivered += len(topic_events) - len(failed)
+            continue
+
+        for event in topic_events:
+            try:
+                func(event.payload, event)
+                _mark_done([event])
+                delivered += 1
+            except Exception as e:
+                logger.error(f"Outbox event {event.idempotency_key} failed: {str(e)}")
+                _mark_failed([event], e)
+    return delivered
+
+
+def relay(batch_size=None, max_batches=20):
+    """Deliver due events batch by batch; returns the number delivered"""
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    delivered = 0
+    for _ in range(max_batches):
+        events = claim_events(batch_size)
+        if not events:
+            break
+        delivered += deliver(events)
+    return delivered
+
+
+def purge_delivered(older_than=timedelta(days=7)):
+    from .models import OutboxEvent
+
+    deleted, _ = OutboxEvent.objects.filter(
+        status=OutboxEvent.DONE, processed_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
@@ -1,6 +1,9 @@
-from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination as KeysetPagination
 from rest_framework.response import Response
 from collections import OrderedDict
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 class OptimizedPageNumberPagination(PageNumberPagination):
     """Optimized pagination with configurable page sizes"""
@@ -31,19 +34,171 @@ class SmallDatasetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 50
 
-class CursorPagination(LimitOffsetPagination):
-    """Cursor-based pagination for better performance on large datasets"""
-    default_limit = 20
-    limit_query_param = 'limit'
-    offset_query_param = 'offset'
-    max_limit = 100
-    
+class CursorPagination(KeysetPagination):
+    """
+    Keyset pagination: each page continues from the last row's ordering value
+    (WHERE created_at < ...), so deep pages cost the same as the first one.
+    Views can set `cursor_ordering`; the ordering field must be indexed.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+
+    def get_ordering(self, request, queryset, view):
+        # An explicit ?ordering= on views with OrderingFilter still wins
+        self.ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        return super().get_ordering(request, queryset, view)
+
     def get_paginated_response(self, data):
         return Response(OrderedDict([
-            ('count', self.count),
             ('next', self.get_next_link()),
             ('previous', self.get_previous_link()),
-            ('limit', self.limit),
-            ('offset', self.offset),
             ('results', data)
-        ]))
\ No newline at end of file
+        ]))
+
+
+def estimated_row_count(model, using='default'):
+    """Planner estimate of a table's row count (pg_class.reltuples), None if unavailable"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0) until the table has been vacuumed/analyzed
+    if not row or row[0] is None or row[0] <= 0:
+        return None
+    return row[0]
+
+
+class ProbedPage(Page):
+    """Page that knows whether a next page exists without relying on the count"""
+    has_more = None
+
+    def has_next(self):
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than `count_cap` rows.
+
+    Unfiltered querysets over big tables use the planner's row estimate; any
+    other queryset is counted with COUNT(*) over a LIMIT cap + 1 subquery, so
+    the count stops at the cap ("10,000+").
+
+    A capped or estimated count can't bound the page number, so those pages
+    fetch one row past the page instead: no rows means the page doesn't
+    exist, the extra row means there is a next page.
+    """
+
+    count_cap = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_is_capped = False
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_cap:
+                self.count_is_estimate = True
+                return estimate
+
+        count = queryset.order_by()[:self.count_cap + 1].count()
+        if count > self.count_cap:
+            self.count_is_capped = True
+            return self.count_cap
+        return count
+
+    @property
+    def count_is_exact(self):
+        self.count  # sets the flags below
+        return not (self.count_is_capped or self.count_is_estimate)
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+        # Only the lower bound here, page() checks that the page has rows
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return ProbedPage(*args, **kwargs)
+
+
+class CappedCountPagination(PageNumberPagination):
+    """
+    Page number pagination for large admin lists, with capped or estimated counts.
+
+    Passing `cursor` (or `pagination=cursor`) switches the request to keyset
+    pagination, which has no count at all and is cheapest for deep scrolling.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    django_paginator_class = CappedCountPaginator
+
+    def __init__(self):
+        self.keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor':
+            self.keyset = CursorPagination()
+            self.keyset.page_size = self.get_page_size(request) or self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_display(self, paginator):
+        if paginator.count_is_capped:
+            return f"{paginator.count:,}+"
+        if paginator.count_is_estimate:
+            return f"~{paginator.count:,}"
+        return f"{paginator.count:,}"
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_capped', paginator.count_is_capped),
+            ('count_is_estimate', paginator.count_is_estimate),
+            ('count_display', self.get_count_display(paginator)),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -1,76 +1,84 @@
 import time
 import logging
-from django.core.cache import cache
 from django.conf import settings
 
+from setup import metrics
+from .instrumentation import collect
+
 logger = logging.getLogger(__name__)
 
 class PerformanceMonitoringMiddleware:
-    """Monitor API performance and cache hit rates"""
-    
+    """
+    Per-request DB, cache and outbound HTTP totals (mall/instrumentation.py),
+    reported as a Server-Timing header and as request metrics. Views declare
+    `query_budget`, the most queries one request may run; going over it is
+    logged and counted here and fails the tests in mall/tests/test_query_budgets.py.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        start_time = time.time()
-        
-        # Track cache hits/misses
-        cache_hits_before = getattr(cache, '_cache_hits', 0)
-        cache_misses_before = getattr(cache, '_cache_misses', 0)
-        
-        response = self.get_response(request)
-        
+        start_time = time.perf_counter()
+
+        with collect() as stats:
+            request.instrumentation = stats
+            response = self.get_response(request)
+
         # Calculate response time
-        response_time = time.time() - start_time
-        
+        response_time = time.perf_counter() - start_time
+        view = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        stats.view = view
+
+        # Timings help probe the backend, so production only shows them to staff
+        user = getattr(request, 'user', None)
+        if getattr(settings, 'SERVER_TIMING_ENABLED', settings.DEBUG) or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = server_timing(stats, response_time)
+
+        labels = {'view': view, 'method': request.method}
+        # Static files and 404s would only add label values
+        if request.resolver_match:
+            metrics.observe_many([
+                ('http_request_duration_seconds', response_time, labels),
+                ('http_request_db_seconds', stats.db_time, labels),
+                ('http_request_db_queries', stats.db_queries, labels),
+                ('http_request_cache_calls', stats.cache_calls, labels),
+                ('http_request_external_seconds', stats.http_time, labels),
+            ], counters=[
+                ('http_requests_total', {**labels, 'status': response.status_code}),
+            ] + ([('http_query_budget_exceeded_total', {'view': view})] if over_budget(stats) else []))
+
+        if over_budget(stats):
+            logger.warning(f"Query budget exceeded: {view} ran {stats.db_queries} queries (budget {stats.query_budget})")
+
         # Log slow requests
         if response_time > 1.0:  # Log requests taking more than 1 second
             logger.warning(
                 f"Slow request: {request.method} {request.path} "
-                f"took {response_time:.2f}s"
+                f"took {response_time:.2f}s ({stats.db_queries} queries in {stats.db_time:.2f}s, "
+                f"{stats.cache_calls} cache calls, {stats.http_calls} HTTP calls in {stats.http_time:.2f}s)"
             )
-        
-        # Add performance headers in debug mode
-        if settings.DEBUG:
-            response['X-Response-Time'] = f"{response_time:.3f}s"
-            
-            cache_hits_after = getattr(cache, '_cache_hits', 0)
-            cache_misses_after = getattr(cache, '_cache_misses', 0)
-            
-            response['X-Cache-Hits'] = cache_hits_after - cache_hits_before
-            response['X-Cache-Misses'] = cache_misses_after - cache_misses_before
-        
+
         return response
 
-class CacheHitRateMiddleware:
-    """Track cache hit rates for optimization"""
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF views expose their class as `cls`, Django class-based views as `view_class`
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        stats = getattr(request, 'instrumentation', None)
+        if stats is not None:
+            stats.query_budget = getattr(view_class or view_func, 'query_budget', None)
+        return None
 
-    def __call__(self, request):
-        # Monkey patch cache to track hits/misses
-        original_get = cache.get
-        original_set = cache.set
-        
-        def tracked_get(key, default=None, version=None):
-            result = original_get(key, default, version)
-            if result is not None:
-                cache._cache_hits = getattr(cache, '_cache_hits', 0) + 1
-            else:
-                cache._cache_misses = getattr(cache, '_cache_misses', 0) + 1
-            return result
-        
-        def tracked_set(key, value, timeout=None, version=None):
-            return original_set(key, value, timeout, version)
-        
-        cache.get = tracked_get
-        cache.set = tracked_set
-        
-        response = self.get_response(request)
-        
-        # Restore original methods
-        cache.get = original_get
-        cache.set = original_set
-        
-        return response
\ No newline at end of file
+
+def over_budget(stats):
+    return stats.query_budget is not None and stats.db_queries > stats.query_budget
+
+
+def server_timing(stats, response_time):
+    """Server-Timing value; durations are in milliseconds"""
+    return ", ".join([
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"',
+        f'cache;dur={stats.cache_time * 1000:.1f};desc="{stats.cache_calls} calls, {stats.cache_hits} hits"',
+        f'http;dur={stats.http_time * 1000:.1f};desc="{stats.http_calls} calls"',
+        f'total;dur={response_time * 1000:.1f}',
+    ])
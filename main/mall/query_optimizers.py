@@ -1,5 +1,14 @@
-from django.db.models import Prefetch, Count, Q
-from .models import Product, ProductImage, Store
+from django.db.models import (
+    Prefetch, Count, Q, Sum, Subquery, OuterRef, Value, IntegerField, DecimalField
+)
+from django.db.models.functions import Coalesce
+from .models import Product, ProductImage, Store, StoreProductPricing, MarketPlace, CustomUser
+
+
+def _aggregate_subquery(queryset, group_by, aggregate, output_field):
+    """Correlated aggregate over `queryset`, one row per outer row and 0 when empty"""
+    subquery = queryset.order_by().values(group_by).annotate(value=aggregate).values('value')[:1]
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
 
 class QueryOptimizer:
     """Centralized query optimizations"""
@@ -43,4 +52,48 @@ class QueryOptimizer:
             is_available=True
         ).only(
             'id', 'name', 'description', 'category__name'
-        )[:50]  # Limit to prevent memory issues
\ No newline at end of file
+        )[:50]  # Limit to prevent memory issues
+
+    @staticmethod
+    def store_metric_annotations(store_ref='owners__id'):
+        """
+        Store metrics as independent correlated subqueries.
+
+        Joining pricings, orders and order items in one query multiplies the
+        rows (and inflates the sums), so each metric aggregates its own table
+        for the store referenced by `store_ref` on the outer queryset.
+        """
+        from order.models import StoreOrder, OrderItems
+
+        store = OuterRef(store_ref)
+        amount_field = DecimalField(max_digits=12, decimal_places=2)
+        return {
+            'total_products': _aggregate_subquery(
+                StoreProductPricing.objects.filter(store_id=store),
+                'store', Count('pk'), IntegerField()
+            ),
+            'total_products_available': _aggregate_subquery(
+                StoreProductPricing.objects.filter(store_id=store, product__is_available=True),
+                'store', Count('pk'), IntegerField()
+            ),
+            'total_products_sold': _aggregate_subquery(
+                OrderItems.objects.filter(userorder__store_id=store, userorder__status__in=StoreOrder.SALES_STATUSES),
+                'userorder__store', Sum('quantity'), IntegerField()
+            ),
+            'total_revenue': _aggregate_subquery(
+                StoreOrder.objects.filter(store_id=store, status__in=StoreOrder.SALES_STATUSES),
+                'store', Sum('total_price'), amount_field
+            ),
+            'listed_products': _aggregate_subquery(
+                MarketPlace.objects.filter(store_id=store, list_product=True),
+                'store', Count('pk'), IntegerField()
+            ),
+            'total_orders': _aggregate_subquery(
+                StoreOrder.objects.filter(store_id=store),
+                'store', Count('pk'), IntegerField()
+            ),
+            'total_customers': _aggregate_subquery(
+                CustomUser.objects.filter(associated_domain_id=store),
+                'associated_domain', Count('pk'), IntegerField()
+            ),
+        }
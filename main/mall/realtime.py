@@ -0,0 +1,186 @@
+"""
+Live updates for store dashboards and buyers.
+
+Write paths publish small deltas (new notifications, order settlement,
+tracking changes) to one Redis channel per store and one per buyer after
+their transaction commits. Each channel is a capped Redis stream rather than
+a bare PUBLISH, so a client that reconnects between two long-polls resumes
+from its cursor (the SSE Last-Event-ID) instead of missing what was sent in
+between. Readers block on XREAD, which costs no database work.
+
+Every open long-poll or stream holds a web worker thread, so each process
+serves at most REALTIME_MAX_STREAMS of them at once. EventSource can't send
+an Authorization header; it passes a short-lived ?ticket= instead, issued
+by EventTicketView to a signed-in user.
+"""
+import json
+import logging
+import re
+import threading
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = "rocktea:events"
+TICKET_SALT = "mall.realtime.ticket"
+
+# Redis stream ids: "<milliseconds>-<sequence>", or just the milliseconds
+CURSOR_PATTERN = re.compile(r'^\d+(-\d+)?$')
+
+_redis = None
+_stream_slots = None
+_stream_slots_lock = threading.Lock()
+
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        # Readers block for up to REALTIME_POLL_SECONDS, so the timeout must exceed it
+        _redis = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=realtime_poll_seconds() + 5,
+            socket_connect_timeout=1,
+            decode_responses=True,
+        )
+    return _redis
+
+
+def realtime_enabled():
+    return getattr(settings, 'REALTIME_ENABLED', False)
+
+
+def realtime_poll_seconds():
+    return getattr(settings, 'REALTIME_POLL_SECONDS', 25)
+
+
+def realtime_ticket_seconds():
+    return getattr(settings, 'REALTIME_TICKET_SECONDS', 300)
+
+
+def is_valid_cursor(cursor):
+    return bool(CURSOR_PATTERN.match(cursor))
+
+
+def acquire_stream_slot():
+    """Reserve one of this process's REALTIME_MAX_STREAMS slots; False when all are taken"""
+    global _stream_slots
+    with _stream_slots_lock:
+        if _stream_slots is None:
+            _stream_slots = threading.BoundedSemaphore(getattr(settings, 'REALTIME_MAX_STREAMS', 8))
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    _stream_slots.release()
+
+
+class SlotReleasingIterator:
+    """
+    Streaming content that frees its stream slot when the response is closed,
+    which Django does even if the client left before the first chunk.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.released = False
+
+    def __iter__(self):
+        return self.iterator
+
+    def close(self):
+        try:
+            self.iterator.close()
+        finally:
+            if not self.released:
+                self.released = True
+                release_stream_slot()
+
+
+def issue_ticket(user):
+    """Signed ticket that authenticates `user` on the event stream for REALTIME_TICKET_SECONDS"""
+    return signing.dumps({'user': str(user.pk)}, salt=TICKET_SALT)
+
+
+class EventTicketAuthentication(BaseAuthentication):
+    """Authenticates ?ticket= from issue_ticket(), for EventSource clients"""
+
+    def authenticate(self, request):
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        try:
+            payload = signing.loads(ticket, salt=TICKET_SALT, max_age=realtime_ticket_seconds())
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('Ticket has expired.')
+        except signing.BadSignature:
+            raise AuthenticationFailed('Invalid ticket.')
+
+        user = get_user_model().objects.filter(pk=payload['user'], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Invalid ticket.')
+        return (user, None)
+
+
+def store_channel(store_id):
+    return f"{STREAM_PREFIX}:store:{store_id}"
+
+
+def buyer_channel(user_id):
+    return f"{STREAM_PREFIX}:buyer:{user_id}"
+
+
+def publish(channels, event, data):
+    """Append an event to each channel now; prefer publish_on_commit from write paths"""
+    channels = [channel for channel in channels if channel]
+    if not channels or not realtime_enabled():
+        return
+    fields = {'event': event, 'data': json.dumps(data, cls=DjangoJSONEncoder)}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for channel in channels:
+            pipe.xadd(channel, fields, maxlen=getattr(settings, 'REALTIME_STREAM_MAXLEN', 200), approximate=True)
+            pipe.expire(channel, getattr(settings, 'REALTIME_STREAM_TTL', 60 * 60 * 24))
+        pipe.execute()
+    except redis.RedisError as e:
+        # Live updates are best effort; the REST endpoints stay authoritative
+        logger.warning(f"Failed to publish {event} to {channels}: {e}")
+
+
+def publish_on_commit(channels, event, data):
+    transaction.on_commit(lambda: publish(channels, event, data))
+
+
+def latest_cursor(channel):
+    """Id of the newest event on a channel, so a new client only gets what comes next"""
+    newest = get_redis().xrevrange(channel, count=1)
+    return newest[0][0] if newest else '0-0'
+
+
+def read_events(channel, cursor, block_seconds, count=100):
+    """
+    Events after `cursor`, waiting up to `block_seconds` for the first one.
+    Returns (events, cursor to resume from).
+    """
+    response = get_redis().xread({channel: cursor}, count=count, block=int(block_seconds * 1000) or None)
+    events = []
+    for _, entries in response or []:
+        for event_id, fields in entries:
+            events.append({
+                'id': event_id,
+                'event': fields.get('event'),
+                'data': json.loads(fields.get('data') or 'null'),
+            })
+            cursor = event_id
+    return events, cursor
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
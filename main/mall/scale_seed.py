@@ -0,0 +1,324 @@
+"""
+Synthetic production-scale data for local load testing.
+
+ScaleSeeder bulk-inserts stores (with owners and wallets), products with
+variants, store pricings and marketplace listings, buyers with open carts
+and pending checkouts, and settled orders spread over the last `days` days.
+bulk_create skips save() and the signals, so the seeder allocates the public
+identifiers itself and afterwards rebuilds what the signals would have kept
+current: order search documents, StoreStats and the daily sales rollups.
+
+Every run tags its rows with a short run label, so several runs can be
+loaded into one database. The endpoints timed against this data are listed
+in mall/benchmarks.py.
+"""
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from dashboards.rollups import rollup_daily_sales
+from order.models import Cart, CartItem, OrderItems, PaystackWebhook, StoreOrder
+from order.search import refresh_search_documents
+from .identifiers import allocate_identifier
+from .models import (
+    Category, CustomUser, MarketPlace, Product, ProductVariant, Store, StoreProductPricing, Wallet
+)
+from .store_stats import rebuild_store_stats
+
+logger = logging.getLogger(__name__)
+
+# Seeded accounts can sign in with this password
+SEED_PASSWORD = 'SeedPassword123'
+SEED_EMAIL_DOMAIN = 'seed.rocktea.local'
+CHECKOUT_REFERENCE_PREFIX = 'seed-checkout'
+
+SIZES = ('S', 'M', 'L', 'XL', '42', '44', '1kg', '500ml')
+COLORS = [color for color, _ in ProductVariant.COLOR_CHOICES]
+
+# Roughly the production order mix
+ORDER_STATUSES = ('Completed', 'Delivered', 'Enroute', 'Pending', 'Returned')
+ORDER_STATUS_WEIGHTS = (45, 30, 10, 10, 5)
+SALES_STATUSES = StoreOrder.SALES_STATUSES
+
+CENT = Decimal('0.01')
+
+
+@dataclass
+class ScaleConfig:
+    stores: int = 50
+    products: int = 5000
+    variants_per_product: int = 2
+    listed_per_store: int = 200
+    buyers: int = 2000
+    orders: int = 20000
+    items_per_order: int = 3
+    carts: int = 500
+    webhooks: int = 20000
+    days: int = 180
+    batch_size: int = 1000
+    seed: Optional[int] = None
+
+
+class ScaleSeeder:
+    def __init__(self, config, log=None):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.run = uuid4().hex[:8]
+        self.log = log or logger.info
+        self.now = timezone.now()
+        self.counts = defaultdict(int)
+
+        self.buyers = []
+        self.stores = []
+        self.products = []
+        # product id -> [(variant id, wholesale price)]
+        self.variants = defaultdict(list)
+        # store id -> [(product id, retail price)]
+        self.listings = defaultdict(list)
+
+    def seed(self):
+        """Insert everything, returns {model label: rows inserted}"""
+        config = self.config
+        self.log(f"Seeding run {self.run}")
+        categories = self.ensure_categories()
+
+        with transaction.atomic():
+            self.create_stores(categories)
+            self.buyers = self.create_users('buyer', config.buyers, is_consumer=True)
+            # Staff account for the admin endpoints
+            self.create_users('admin', 1, is_staff=True, is_superuser=True)
+        with transaction.atomic():
+            self.create_products(categories)
+        with transaction.atomic():
+            self.create_listings()
+
+        order_ids = self.create_orders()
+        with transaction.atomic():
+            self.create_carts()
+
+        self.log("Rebuilding order search documents, store stats and sales rollups")
+        for start in range(0, len(order_ids), config.batch_size):
+            refresh_search_documents(order_ids[start:start + config.batch_size])
+        rebuild_store_stats([store.id for store in self.stores], batch_size=config.batch_size)
+        today = timezone.localdate()
+        rollup_daily_sales(today - timedelta(days=config.days), today)
+        return dict(self.counts)
+
+    def insert(self, model, rows):
+        model.objects.bulk_create(rows, batch_size=self.config.batch_size)
+        self.counts[model._meta.label] += len(rows)
+        return rows
+
+    def backdate(self, model, rows):
+        # bulk_create stamps auto_now_add fields with the current time
+        model.objects.bulk_update(rows, ['created_at'], batch_size=self.config.batch_size)
+
+    def random_time(self):
+        return self.now - timedelta(seconds=self.random.randint(0, self.config.days * 24 * 60 * 60))
+
+    def ensure_categories(self):
+        existing = set(Category.objects.values_list('name', flat=True))
+        Category.objects.bulk_create(
+            [Category(name=name) for name, _ in Category.CHOICES if name not in existing], ignore_conflicts=True
+        )
+        return list(Category.objects.all())
+
+    def create_users(self, role, count, **flags):
+        # Hashing once keeps large runs fast; every seeded account shares the password
+        password = make_password(SEED_PASSWORD)
+        return self.insert(CustomUser, [
+            CustomUser(
+                username=f"seed{self.run}{role}{i}",
+                email=f"{role}-{self.run}-{i}@{SEED_EMAIL_DOMAIN}",
+                first_name=role.title(),
+                last_name=f"{self.run} {i}",
+                password=password,
+                is_verified=True,
+                **flags,
+            )
+            for i in range(count)
+        ])
+
+    def create_stores(self, categories):
+        owners = self.create_users('owner', self.config.stores, is_store_owner=True, completed_steps=3)
+        self.stores = self.insert(Store, [
+            Store(
+                owner=owner,
+                name=f"Seed {self.run} store {i}",
+                slug=f"seed-{self.run}-store-{i}",
+                category=self.random.choice(categories),
+                has_made_payment=True,
+                completed=True,
+            )
+            for i, owner in enumerate(owners)
+        ])
+        self.insert(Wallet, [Wallet(store=store, account_name=store.name) for store in self.stores])
+
+    def create_products(self, categories):
+        config = self.config
+        self.log(f"Creating {config.products} products with {config.variants_per_product} variants each")
+        for start in range(0, config.products, config.batch_size):
+            products = [
+                Product(
+                    sku=allocate_identifier('sku'),
+                    name=f"Seed {self.run} product {i}",
+                    description=f"Synthetic product {i} of seed run {self.run}",
+                    quantity=self.random.randint(0, 500),
+                    category=self.random.choice(categories),
+                    upload_status='Approved',
+                    is_available=True,
+                )
+                for i in range(start, min(start + config.batch_size, config.products))
+            ]
+            self.insert(Product, products)
+
+            variants, links = [], []
+            for product in products:
+                base_price = Decimal(self.random.randint(1000, 250000))
+                for _ in range(config.variants_per_product):
+                    variant = ProductVariant(
+                        size=self.random.choice(SIZES),
+                        colors=self.random.sample(COLORS, 2),
+                        wholesale_price=(base_price * Decimal(self.random.uniform(0.9, 1.1))).quantize(CENT),
+                    )
+                    variants.append(variant)
+                    links.append((product, variant))
+            self.insert(ProductVariant, variants)
+            self.insert(ProductVariant.product.through, [
+                ProductVariant.product.through(productvariant_id=variant.id, product_id=product.id)
+                for product, variant in links
+            ])
+            for product, variant in links:
+                self.variants[product.id].append((variant.id, variant.wholesale_price))
+            self.products.extend(products)
+
+    def create_listings(self):
+        """Each store prices and lists a random slice of the catalogue"""
+        listed = min(self.config.listed_per_store, len(self.products))
+        self.log(f"Listing {listed} products in each of {len(self.stores)} stores")
+        pricings, listings, product_stores = [], [], []
+        for store in self.stores:
+            for product in self.random.sample(self.products, listed):
+                wholesale = max(price for _, price in self.variants[product.id]) if self.variants[product.id] else Decimal(1000)
+                retail = (wholesale * Decimal(self.random.uniform(1.1, 1.6))).quantize(CENT)
+                pricings.append(StoreProductPricing(product=product, store=store, retail_price=retail))
+                listings.append(MarketPlace(store=store, product=product, list_product=True))
+                product_stores.append(Product.store.through(product_id=product.id, store_id=store.id))
+                self.listings[store.id].append((product.id, retail))
+        self.insert(StoreProductPricing, pricings)
+        self.insert(MarketPlace, listings)
+        self.insert(Product.store.through, product_stores)
+
+    def pick_items(self, store_id):
+        """[(product id, variant id, quantity, retail price)] for one basket"""
+        listings = self.listings[store_id]
+        count = min(self.random.randint(1, self.config.items_per_order), len(listings))
+        items = []
+        for product_id, retail in self.random.sample(listings, count):
+            variant_id = self.random.choice(self.variants[product_id])[0] if self.variants[product_id] else None
+            items.append((product_id, variant_id, self.random.randint(1, 3), retail))
+        return items
+
+    def create_orders(self):
+        """Settled orders with their items and Paystack webhooks, returns the order ids"""
+        config = self.config
+        stores = [store for store in self.stores if self.listings[store.id]]
+        if not stores or not self.buyers:
+            return []
+
+        self.log(f"Creating {config.orders} orders")
+        order_ids = []
+        sales_counts = defaultdict(int)
+        for start in range(0, config.orders, config.batch_size):
+            orders, items, webhooks = [], [], []
+            for i in range(start, min(start + config.batch_size, config.orders)):
+                store = self.random.choice(stores)
+                buyer = self.random.choice(self.buyers)
+                basket = self.pick_items(store.id)
+                status = self.random.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0]
+                order = StoreOrder(
+                    buyer=buyer,
+                    store=store,
+                    status=status,
+                    total_price=sum(retail * quantity for _, _, quantity, retail in basket),
+                    order_sn=allocate_identifier('order_sn'),
+                    delivery_code=allocate_identifier('delivery_code'),
+                    delivery_location=f"{i} Seed Street, Lagos",
+                    created_at=self.random_time(),
+                )
+                orders.append(order)
+                for product_id, variant_id, quantity, retail in basket:
+                    items.append(OrderItems(
+                        userorder=order, product_id=product_id, product_variant_id=variant_id,
+                        quantity=quantity, unit_price=retail, created_at=order.created_at,
+                    ))
+                    if status in SALES_STATUSES:
+                        sales_counts[product_id] += quantity
+                if i < config.webhooks:
+                    webhooks.append(PaystackWebhook(
+                        user=buyer,
+                        store=store,
+                        order=order,
+                        reference=f"seed-{self.run}-order-{i}",
+                        total_price=order.total_price,
+                        status='Success',
+                        purpose='order',
+                        created_at=order.created_at,
+                    ))
+
+            with transaction.atomic():
+                self.insert(StoreOrder, orders)
+                self.backdate(StoreOrder, orders)
+                self.insert(OrderItems, items)
+                self.backdate(OrderItems, items)
+                self.insert(PaystackWebhook, webhooks)
+                self.backdate(PaystackWebhook, webhooks)
+            order_ids.extend(order.id for order in orders)
+            self.log(f"  {len(order_ids)} orders")
+
+        products = [Product(id=product_id, sales_count=count) for product_id, count in sales_counts.items()]
+        Product.objects.bulk_update(products, ['sales_count'], batch_size=config.batch_size)
+        return order_ids
+
+    def create_carts(self):
+        """Open carts whose checkout is waiting for the Paystack webhook"""
+        stores = [store for store in self.stores if self.listings[store.id]]
+        buyers = self.buyers[:self.config.carts]
+        if not stores or not buyers:
+            return
+
+        self.log(f"Creating {len(buyers)} carts with pending checkouts")
+        carts, baskets = [], []
+        for buyer in buyers:
+            store = self.random.choice(stores)
+            basket = self.pick_items(store.id)
+            carts.append(Cart(user=buyer, store=store, price=sum(retail * quantity for _, _, quantity, retail in basket)))
+            baskets.append(basket)
+        self.insert(Cart, carts)
+
+        self.insert(CartItem, [
+            CartItem(cart=cart, product_id=product_id, product_variant_id=variant_id,
+                     quantity=quantity, price=retail * quantity)
+            for cart, basket in zip(carts, baskets)
+            for product_id, variant_id, quantity, retail in basket
+        ])
+        self.insert(PaystackWebhook, [
+            PaystackWebhook(
+                user=cart.user,
+                store=cart.store,
+                reference=f"{CHECKOUT_REFERENCE_PREFIX}-{self.run}-{i}",
+                total_price=cart.price,
+                status='Pending',
+                purpose='order',
+            )
+            for i, cart in enumerate(carts)
+        ])
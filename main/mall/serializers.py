@@ -138,18 +138,18 @@ class StoreOwnerSerializer(ModelSerializer):
 
          # Send welcome email
          try:
-            from setup.tasks import send_email_task
+            from setup.utils import sendEmail
             subject = "Welcome to Rocktea Mall - Your Dropshipping Journey Begins!"
             context = {
                'full_name': user.get_full_name() or user.email,
                'confirmation_url': verify_email_url,
                'current_year': timezone.now().year,
             }
-            send_email_task.delay(
-               recipient_email=user.email,
-               template_name='emails/dropshippers_welcome.html',
-               context=context,
-               subject=subject,
+            sendEmail(
+               user.email,
+               'emails/dropshippers_welcome.html',
+               context,
+               subject,
                tags=["user-onboarding", "email-verification"]
             )
             logger.info(f"Welcome email queued for {user.email}")
@@ -1,12 +1,20 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_save, pre_delete
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
+from django.db import transaction
 import logging
 import re
 
-from .models import Store, Wallet, StoreProductPricing, MarketPlace, Notification, CustomUser
-from .utils import generate_store_slug, determine_environment_config
+from .models import (
+    Store, Wallet, StoreProductPricing, MarketPlace, Notification, CustomUser,
+    Category, SubCategories, ProductTypes, Brand, Product, StoreStats
+)
+from .taxonomy import invalidate_taxonomy
+from . import store_stats
+from .notifications import adjust_unread, owner_keys, bulk_create_notifications, publish_notification
+from .utils import generate_store_slug, determine_environment_config, generate_store_domain
 from .middleware import get_current_request
-from workshop.route53 import create_cname_record, delete_store_dns_record
+from .outbox import enqueue, outbox_handler, OUTBOX_MAX_ATTEMPTS
+from workshop.route53 import DNSChangeQueue
 
 from django.utils import timezone
 from django.conf import settings
@@ -38,51 +46,87 @@ def create_wallet(sender, instance, created, **kwargs):
     if created:
         Wallet.objects.get_or_create(store=instance)
 
+@receiver(post_save, sender=Store)
+def create_store_stats(sender, instance, created, **kwargs):
+    """Start every new Store with an empty StoreStats row"""
+    if created:
+        StoreStats.objects.get_or_create(store=instance)
+
 @receiver(post_save, sender=Store)
 def create_dropshipper_dns_record(sender, instance, created, **kwargs):
     """Create DNS record for new stores - only send email after DNS success"""
     if not created or instance.dns_record_created:
         return
         
-    # Use transaction.on_commit to ensure email is sent after successful DB commit
-    from django.db import transaction
-    
-    def send_store_email():
-        env_config = determine_environment_config(get_current_request())
+    # The environment depends on the request host, so it is captured now;
+    # Route53 and the emails run in the outbox relay once the store commits
+    enqueue(
+        'store.dns.provision',
+        {
+            'store_id': str(instance.id),
+            'env_config': determine_environment_config(get_current_request()),
+        },
+        idempotency_key=f"store-dns-provision:{instance.id}"
+    )
+
+def flush_dns_queues(queues):
+    """Flush one DNSChangeQueue per hosted zone; returns {key: error} for failed changes"""
+    failed = {}
+    for queue in queues.values():
+        failed.update(queue.flush().failed)
+    return failed
+
+@outbox_handler('store.dns.provision', batch=True)
+def provision_store_dns(events):
+    """Create the CNAMEs of new stores in one Route53 change batch per zone"""
+    stores = Store.objects.select_related('owner').filter(
+        id__in=[event.payload['store_id'] for event in events], dns_record_created=False)
+    stores = {str(store.id): store for store in stores}
+
+    queues = {}
+    queued = {}
+    for event in events:
+        # Gone or already provisioned by an earlier delivery
+        store = stores.get(event.payload['store_id'])
+        if store is None:
+            continue
+
+        env_config = event.payload['env_config']
         
         # Handle local environment
         if env_config.get('is_local', False):
-            send_local_development_email(instance, instance.domain_name)
-            return
+            send_local_development_email(store, store.domain_name)
+            continue
         
         # Extract domain from domain_name for DNS creation
-        domain_match = re.search(r'https://([^?]+)', instance.domain_name or '')
+        domain_match = re.search(r'https://([^?]+)', store.domain_name or '')
         if not domain_match:
-            logger.error(f"Invalid domain_name for store {instance.name}")
-            return
-            
-        full_domain = domain_match.group(1)
-        
-        try:
-            # Create DNS record
-            if create_cname_record(
-                zone_id=env_config['hosted_zone_id'],
-                subdomain=full_domain,
-                target=env_config['target_domain']
-            ):
-                instance.dns_record_created = True
-                instance.save(update_fields=['dns_record_created'])
-                # Only send email after DNS is successfully created
-                send_store_success_email(instance, instance.domain_name, env_config['environment'])
-            else:
-                send_store_dns_failure_email(instance, full_domain)
-                
-        except Exception as e:
-            logger.error(f"DNS creation failed for {instance.name}: {e}")
-            send_store_dns_error_email(instance, str(e))
-    
-    # Schedule email sending after transaction commits
-    transaction.on_commit(send_store_email)
+            logger.error(f"Invalid domain_name for store {store.name}")
+            continue
+
+        zone_id = env_config['hosted_zone_id']
+        queue = queues.setdefault(zone_id, DNSChangeQueue(zone_id))
+        queue.upsert(domain_match.group(1), env_config['target_domain'], key=event.pk)
+        queued[event.pk] = (event, store, domain_match.group(1))
+
+    failed = flush_dns_queues(queues)
+    for pk in failed:
+        event, store, full_domain = queued[pk]
+        # Tell the owner once; the relay keeps retrying with backoff
+        if event.attempts == 0:
+            send_store_dns_failure_email(store, full_domain)
+
+    created = [store.pk for pk, (event, store, full_domain) in queued.items() if pk not in failed]
+    if created:
+        # Only the delivery that flips the flag sends the welcome email
+        with transaction.atomic():
+            flipped = set(Store.objects.select_for_update().filter(
+                pk__in=created, dns_record_created=False).values_list('pk', flat=True))
+            Store.objects.filter(pk__in=flipped).update(dns_record_created=True)
+        for event, store, full_domain in queued.values():
+            if store.pk in flipped:
+                send_store_success_email(store, store.domain_name, event.payload['env_config']['environment'])
+    return failed
 
 def send_local_development_email(store_instance, store_url):
     """Send welcome email for local development environment"""
@@ -213,13 +257,107 @@ def create_marketplace(sender, instance, created, **kwargs):
     if not created:
         return
         
-    # Create marketplace entry and notification
+    # Create marketplace entry; the notification goes through the outbox so a
+    # bulk import produces one notification per store rather than one per row
     MarketPlace.objects.get_or_create(store=instance.store, product=instance.product)
-    Notification.objects.create(
-        store=instance.store, 
-        message=f"{instance.store.name} you just added a new product to your Marketplace."
+    enqueue(
+        'marketplace.product_added',
+        {'store_id': str(instance.store_id)},
+        idempotency_key=f"marketplace-added:{instance.pk}"
     )
 
+@outbox_handler('marketplace.product_added', batch=True, atomic=True)
+def notify_marketplace_additions(events):
+    added = {}
+    for event in events:
+        store_id = event.payload['store_id']
+        added[store_id] = added.get(store_id, 0) + 1
+
+    notifications = []
+    for store in Store.objects.filter(id__in=added).only('id', 'name'):
+        count = added[str(store.id)]
+        if count == 1:
+            message = f"{store.name} you just added a new product to your Marketplace."
+        else:
+            message = f"{store.name} you just added {count} new products to your Marketplace."
+        notifications.append(Notification(store=store, message=message))
+    bulk_create_notifications(notifications)
+
+@receiver(post_save, sender=StoreProductPricing)
+def count_store_pricing(sender, instance, created, **kwargs):
+    if created:
+        store_stats.apply_delta(
+            instance.store_id,
+            products_added=1,
+            products_available=1 if instance.product.is_available else 0
+        )
+
+@receiver(post_delete, sender=StoreProductPricing)
+def uncount_store_pricing(sender, instance, **kwargs):
+    available = Product.objects.filter(pk=instance.product_id, is_available=True).exists()
+    store_stats.apply_delta(
+        instance.store_id,
+        products_added=-1,
+        products_available=-1 if available else 0
+    )
+
+@receiver(post_save, sender=Product)
+def count_product_availability(sender, instance, created, **kwargs):
+    """Move products_available for every store pricing a product whose availability flipped"""
+    previous = getattr(instance, '_loaded_is_available', None)
+    if not created and previous is not None and previous != instance.is_available:
+        store_stats.apply_delta_for_product(
+            instance.pk, products_available=1 if instance.is_available else -1)
+    instance._loaded_is_available = instance.is_available
+
+@receiver(pre_save, sender=MarketPlace)
+def remember_marketplace_listing(sender, instance, **kwargs):
+    instance._previous_list_product = None
+    if not instance._state.adding:
+        instance._previous_list_product = MarketPlace.objects.filter(
+            pk=instance.pk).values_list('list_product', flat=True).first()
+
+@receiver(post_save, sender=MarketPlace)
+def count_marketplace_listing(sender, instance, created, **kwargs):
+    was_listed = bool(getattr(instance, '_previous_list_product', None)) and not created
+    if was_listed != instance.list_product:
+        store_stats.apply_delta(instance.store_id, listed_products=1 if instance.list_product else -1)
+
+@receiver(post_delete, sender=MarketPlace)
+def uncount_marketplace_listing(sender, instance, **kwargs):
+    if instance.list_product:
+        store_stats.apply_delta(instance.store_id, listed_products=-1)
+
+@receiver(pre_save, sender=Notification)
+def remember_notification_read(sender, instance, **kwargs):
+    instance._previous_read = None
+    if not instance._state.adding:
+        instance._previous_read = Notification.objects.filter(
+            pk=instance.pk).values_list('read', flat=True).first()
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    was_unread = not created and getattr(instance, '_previous_read', None) is False
+    if was_unread != (not instance.read):
+        adjust_unread(owner_keys(instance), 1 if not instance.read else -1)
+    if created:
+        publish_notification(instance)
+
+@receiver(post_delete, sender=Notification)
+def uncount_unread_notification(sender, instance, **kwargs):
+    if not instance.read:
+        adjust_unread(owner_keys(instance), -1)
+
+@receiver(post_save, sender=CustomUser)
+def count_store_customer(sender, instance, created, **kwargs):
+    if created and instance.associated_domain_id:
+        store_stats.apply_delta(instance.associated_domain_id, customers=1)
+
+@receiver(post_delete, sender=CustomUser)
+def uncount_store_customer(sender, instance, **kwargs):
+    if instance.associated_domain_id:
+        store_stats.apply_delta(instance.associated_domain_id, customers=-1)
+
 @receiver(pre_delete, sender=CustomUser)
 def delete_dropshipper_domain(sender, instance, **kwargs):
     """Delete DNS record when dropshipper is deleted"""
@@ -231,36 +369,55 @@ def delete_dropshipper_domain(sender, instance, **kwargs):
         if hasattr(instance, 'owners') and instance.owners:
             store = instance.owners
             
-            # Store data before deletion for email
-            user_email = instance.email
-            user_name = instance.get_full_name() or instance.first_name or instance.email
-            store_name = store.name
-            store_domain = store.domain_name
-            
             # Only delete DNS if it was actually created
             if store.dns_record_created and store.slug:
-                logger.info(f"Processing DNS deletion for dropshipper: {user_email}, store: {store_name}")
-                
-                try:
-                    success = delete_store_dns_record(store.slug)
-                    
-                    if success:
-                        logger.info(f"Successfully deleted DNS record for store: {store_name}")
-                        # Send success email after deletion
-                        _send_deletion_success_email(user_email, user_name, store_name, store_domain)
-                    else:
-                        logger.error(f"Failed to delete DNS record for store: {store_name}")
-                        _send_deletion_failure_email(user_email, user_name, store_name, store_domain)
-                        
-                except Exception as dns_error:
-                    logger.error(f"DNS deletion error for store {store_name}: {dns_error}")
-                    _send_deletion_failure_email(user_email, user_name, store_name, store_domain)
+                logger.info(f"Queueing DNS deletion for dropshipper: {instance.email}, store: {store.name}")
+                # The store row is gone once this commits, so the payload
+                # carries everything the relay and the emails need
+                enqueue(
+                    'store.dns.delete',
+                    {
+                        'slug': store.slug,
+                        'user_email': instance.email,
+                        'user_name': instance.get_full_name() or instance.first_name or instance.email,
+                        'store_name': store.name,
+                        'store_domain': store.domain_name,
+                    },
+                    idempotency_key=f"store-dns-delete:{store.id}"
+                )
             else:
-                logger.info(f"No DNS record to delete for store: {store_name}")
+                logger.info(f"No DNS record to delete for store: {store.name}")
                 
     except Exception as e:
         logger.error(f"Error in delete_dropshipper_domain for {instance.email}: {e}")
 
+@outbox_handler('store.dns.delete', batch=True)
+def remove_store_dns(events):
+    """Delete the CNAMEs of removed stores; a record that is already gone counts as deleted"""
+    env_config = determine_environment_config()
+
+    queues = {}
+    if not env_config.get('is_local', False):
+        zone_id = env_config['hosted_zone_id']
+        queue = queues[zone_id] = DNSChangeQueue(zone_id)
+        for event in events:
+            # Records are created pointing at the environment's target domain
+            full_domain = generate_store_domain(event.payload['slug'], env_config['environment'])
+            queue.delete(full_domain, env_config['target_domain'], key=event.pk)
+
+    failed = flush_dns_queues(queues)
+    for event in events:
+        payload = event.payload
+        email_args = (payload['user_email'], payload['user_name'], payload['store_name'], payload['store_domain'])
+        if event.pk not in failed:
+            logger.info(f"Successfully deleted DNS record for store: {payload['store_name']}")
+            _send_deletion_success_email(*email_args)
+        elif event.attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+            # Manual cleanup is only needed once the relay gives up
+            logger.error(f"Failed to delete DNS record for store: {payload['store_name']}")
+            _send_deletion_failure_email(*email_args)
+    return failed
+
 
 def _send_deletion_success_email(user_email, user_name, store_name, store_domain):
     """Send email notification when store and domain are successfully deleted"""
@@ -316,4 +473,20 @@ def _send_deletion_failure_email(user_email, user_name, store_name, store_domain
         logger.info(f"Store deletion failure email sent to {user_email} for store: {store_name}")
         
     except Exception as e:
-        logger.error(f"Error sending store deletion failure email for {store_name}: {e}")
\ No newline at end of file
+        logger.error(f"Error sending store deletion failure email for {store_name}: {e}")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategories)
+@receiver(post_delete, sender=SubCategories)
+@receiver(post_save, sender=ProductTypes)
+@receiver(post_delete, sender=ProductTypes)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(m2m_changed, sender=Brand.producttype.through)
+def refresh_taxonomy(sender, instance, **kwargs):
+    """Reload the in-memory taxonomy graph and tree when the taxonomy changes"""
+    # Reset now for this process, and again once other processes can see the change
+    invalidate_taxonomy()
+    transaction.on_commit(invalidate_taxonomy)
@@ -0,0 +1,132 @@
+"""
+Maintenance of the StoreStats rollup rows.
+
+Write paths (pricing, marketplace, signup and order signals) apply F()
+deltas inside the transaction that changed the underlying rows, so readers
+get the dashboard numbers from one indexed row per store. A missing row is
+computed read-only on first read and built by the reconcile_store_stats
+task, which also rebuilds every row nightly to correct any drift from bulk
+updates that bypass the signals.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Store, StoreStats
+from .query_optimizers import QueryOptimizer
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = (
+    'listed_products', 'orders', 'customers', 'products_added',
+    'products_available', 'units_sold', 'revenue',
+)
+
+# StoreStats field -> QueryOptimizer.store_metric_annotations() key
+METRIC_SOURCES = {
+    'listed_products': 'listed_products',
+    'orders': 'total_orders',
+    'customers': 'total_customers',
+    'products_added': 'total_products',
+    'products_available': 'total_products_available',
+    'units_sold': 'total_products_sold',
+    'revenue': 'total_revenue',
+}
+
+
+def apply_delta(store_id, **deltas):
+    """Add the given deltas to the store's counters"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not store_id or not deltas:
+        return
+    # A missing row is left alone; it is built by reconcile_store_stats
+    StoreStats.objects.filter(store_id=store_id).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def apply_delta_for_product(product_id, **deltas):
+    """Apply deltas to every store that prices the given product"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    StoreStats.objects.filter(store__pricings__product_id=product_id).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def compute_store_stats(store_ids):
+    """Count the stats from the raw tables, returns {store_id: {field: value}}"""
+    metrics = QueryOptimizer.store_metric_annotations(store_ref='pk')
+    rows = Store.objects.filter(id__in=store_ids).annotate(
+        **{f'stat_{field}': metrics[source] for field, source in METRIC_SOURCES.items()}
+    ).values('id', *[f'stat_{field}' for field in STAT_FIELDS])
+    return {row['id']: {field: row[f'stat_{field}'] for field in STAT_FIELDS} for row in rows}
+
+
+def rebuild_store_stats(store_ids=None, batch_size=500):
+    """Recompute the counters from the raw tables, returns the number of rows written"""
+    stores = Store.objects.order_by('id')
+    if store_ids is not None:
+        stores = stores.filter(id__in=store_ids)
+    store_ids = list(stores.values_list('id', flat=True))
+
+    written = 0
+    for start in range(0, len(store_ids), batch_size):
+        written += _rebuild_batch(store_ids[start:start + batch_size])
+    return written
+
+
+def _rebuild_batch(store_ids):
+    with transaction.atomic():
+        StoreStats.objects.bulk_create(
+            [StoreStats(store_id=store_id) for store_id in store_ids], ignore_conflicts=True
+        )
+        # Lock the rows before counting: a delta applied by a transaction that
+        # is still open holds the lock until its changes are committed and
+        # counted, and later deltas wait and land on top of the rebuilt values
+        rows = list(
+            StoreStats.objects.select_for_update().filter(store_id__in=store_ids).order_by('store_id')
+        )
+        counts = compute_store_stats(store_ids)
+        now = timezone.now()
+        for stats in rows:
+            for field, value in counts.get(stats.store_id, {}).items():
+                setattr(stats, field, value)
+            stats.reconciled_at = now
+        StoreStats.objects.bulk_update(rows, [*STAT_FIELDS, 'reconciled_at'])
+    return len(rows)
+
+
+def get_store_stats(store):
+    """
+    Return the StoreStats row for a store (or store id). When the row is
+    missing an unsaved one is counted for this read and the row is built by
+    the reconcile_store_stats task, so requests never write or lock it.
+    """
+    if isinstance(store, Store):
+        try:
+            # Uses the row loaded by select_related('stats') when present
+            return store.stats
+        except StoreStats.DoesNotExist:
+            pass
+    store_id = getattr(store, 'pk', store)
+    stats = StoreStats.objects.filter(store_id=store_id).first()
+    if stats is None:
+        counts = compute_store_stats([store_id])
+        if store_id not in counts:
+            return None
+        stats = StoreStats(store_id=store_id, **counts[store_id])
+        if cache.add(f'store_stats_rebuild_{store_id}', True, timeout=60):
+            from .tasks import reconcile_store_stats
+            transaction.on_commit(lambda: reconcile_store_stats.delay([store_id]))
+    return stats
+
+
+def stats_as_dict(stats):
+    if stats is None:
+        return {field: 0 for field in STAT_FIELDS}
+    return {field: getattr(stats, field) for field in STAT_FIELDS}
@@ -1,7 +1,7 @@
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 import logging
-from django.db import transaction
 from django.core.cache import cache
 
 from .models import Store, ProductImage
@@ -12,6 +12,10 @@ from order.models import StoreOrder
 from order.shipbubble_service import ShipbubbleService
 from .cloudinary_utils import CloudinaryOptimizer
 from .cache_utils import CacheManager
+from .store_stats import rebuild_store_stats
+from .dns_reconcile import reconcile_store_dns as reconcile_dns
+from .upload_staging import open_staged, discard_staged, purge_expired
+from . import outbox
 
 logger = logging.getLogger(__name__)
 
@@ -263,41 +267,91 @@ def send_deletion_failure_email_async(user_email, store_name):
 
 
 # Product and Order Management Tasks
+def store_product_image(productimage, file):
+    """Upload a file object to Cloudinary for the ProductImage and refresh the store caches"""
+    result = CloudinaryOptimizer.upload_optimized(
+        file,
+        folder="products",
+        transformation_type='large'
+    )
+
+    productimage.image = result.get('secure_url')
+    productimage.save()
+
+    # Invalidate related cache
+    product = productimage.product_set.first()
+    store = product.store.first() if product else None
+    CacheManager.invalidate_store(store.id if store else None)
+
+
 @shared_task(bind=True, max_retries=3, retry_backoff=60)
-def upload_image(self, product_id, file_content, file_name, content_type):
+def upload_image(self, product_id, staged_reference, file_name, content_type):
+    """
+    Stream a staged upload to Cloudinary, see mall.upload_staging. Every
+    failure, including a staged file this worker cannot see, goes through the
+    retries and then fails the task rather than being dropped.
+    """
     task_id = f'upload_image_{product_id}'
     
     if not cache.add(task_id, True, timeout=60):
         return
     
     try:
-        with transaction.atomic():
-            logger.info(f"Uploading optimized image {file_name}")
-            productimage = ProductImage.objects.select_for_update().get(id=product_id)
-            
-            # Use optimized upload
-            result = CloudinaryOptimizer.upload_optimized(
-                file_content,
-                folder="products",
-                transformation_type='large'
-            )
-            
-            productimage.image = result.get('secure_url')
-            productimage.save()
-            
-            # Invalidate related cache
-            CacheManager.invalidate_store(productimage.product.store.first().id if productimage.product.store.exists() else None)
+        logger.info(f"Uploading optimized image {file_name}")
+        productimage = ProductImage.objects.get(id=product_id)
+
+        # Use optimized upload, reading the file straight from the staging store.
+        # No transaction: the upload is an HTTP call and the cache key above
+        # already keeps a second run of this task out
+        with open_staged(staged_reference) as staged_file:
+            store_product_image(productimage, staged_file)
+
+        discard_staged(staged_reference)
             
     except ProductImage.DoesNotExist:
         logger.error(f"ProductImage {product_id} not found")
+        discard_staged(staged_reference)
         return
     except Exception as e:
-        logger.error(f"Error uploading image: {e}")
+        logger.error(f"Error uploading image {file_name}: {e}")
+        # Raises e once the retries are used up, so the failure is recorded
         self.retry(exc=e)
     finally:
         cache.delete(task_id)
 
 
+@shared_task(bind=True)
+def purge_staged_uploads(self):
+    """Remove staged uploads that were never picked up by upload_image"""
+    removed = purge_expired()
+    if removed:
+        logger.info(f"Purged {removed} expired staged uploads")
+    return removed
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def reconcile_store_stats(self, store_ids=None):
+    """Nightly rebuild of every StoreStats row from the raw tables, or of the given stores"""
+    try:
+        written = rebuild_store_stats(store_ids)
+        logger.info(f"Reconciled statistics for {written} stores")
+        return written
+    except Exception as e:
+        logger.error(f"Error reconciling store statistics: {e}")
+        self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=600)
+def reconcile_store_dns(self):
+    """Nightly sync of store CNAMEs in Route53 with the Store table"""
+    try:
+        summary = reconcile_dns(delete_orphans=settings.DNS_RECONCILE_DELETE_ORPHANS)
+        return {key: len(value) if isinstance(value, (list, dict)) else value for key, value in summary.items()}
+    except Exception as e:
+        logger.error(f"Error reconciling store DNS records: {e}")
+        self.retry(exc=e)
+
+
 @shared_task(bind=True, max_retries=3, retry_backoff=60)
 def check_shipping_status(self):
     shipbubble_service = ShipbubbleService()
@@ -336,6 +390,21 @@ def cancel_unpaid_shipments(self):
             logger.error(f"Error cancelling shipment {key}: {e}")
 
 
+@shared_task(bind=True)
+def relay_outbox(self, batch_size=None):
+    """Deliver due outbox events (mall/outbox.py) in batches"""
+    delivered = outbox.relay(batch_size)
+    if delivered:
+        logger.info(f"Delivered {delivered} outbox events")
+    return delivered
+
+
+@shared_task(bind=True)
+def purge_outbox(self):
+    """Drop delivered outbox events after a week"""
+    return outbox.purge_delivered()
+
+
 @shared_task
 def log_webhook_attempt(reference, email, purpose, status):
     """Log webhook processing attempts for debugging"""
@@ -0,0 +1,180 @@
+"""
+In-process view of the category -> subcategory -> product type tree.
+
+The taxonomy changes rarely but is consulted on every Product save and every
+storefront navigation, so each process keeps the parent mappings and the
+serialized tree in memory and only reloads them when the shared version key
+changes (bumped by the taxonomy signals in mall.signals).
+"""
+import hashlib
+import json
+import logging
+import threading
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TAXONOMY_VERSION_KEY = "taxonomy:version"
+
+_lock = threading.Lock()
+_graph = None
+_tree = None
+
+
+class TaxonomyGraph:
+    """Parent lookups for subcategories and product types, keyed by id"""
+
+    def __init__(self, version, subcategory_parents, producttype_parents):
+        self.version = version
+        self.subcategory_parents = subcategory_parents
+        self.producttype_parents = producttype_parents
+
+    @classmethod
+    def load(cls, version):
+        from .models import SubCategories, ProductTypes
+
+        return cls(
+            version,
+            dict(SubCategories.objects.values_list('id', 'category_id')),
+            dict(ProductTypes.objects.values_list('id', 'subcategory_id')),
+        )
+
+    def validate(self, category_id, subcategory_id, producttype_id):
+        """Return the list of relationship errors for the given ids"""
+        errors = []
+
+        # Ids missing from the graph are left to the foreign key validation
+        subcategory_parent = self.subcategory_parents.get(subcategory_id)
+        producttype_parent = self.producttype_parents.get(producttype_id)
+
+        if subcategory_id and category_id and subcategory_parent is not None:
+            if subcategory_parent != category_id:
+                errors.append("Selected subcategory does not belong to the selected category.")
+
+        if producttype_id and subcategory_id and producttype_parent is not None:
+            if producttype_parent != subcategory_id:
+                errors.append("Selected product type does not belong to the selected subcategory.")
+
+        if producttype_id and category_id and producttype_parent is not None:
+            if self.subcategory_parents.get(producttype_parent) != category_id:
+                errors.append("Selected product type does not belong to the selected category.")
+
+        return errors
+
+
+def get_taxonomy_version():
+    """
+    The shared version, or None when the cache cannot hold one. A missing key
+    (never set, or evicted) starts a fresh version, so copies built before
+    the eviction are not served again.
+    """
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        # add() keeps the value of a process that got there first
+        cache.add(TAXONOMY_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(TAXONOMY_VERSION_KEY)
+    return version
+
+
+def get_taxonomy_graph():
+    """Return the cached graph, reloading it if another process changed the taxonomy"""
+    global _graph
+
+    version = get_taxonomy_version()
+    graph = _graph
+    if graph is not None and graph.version == version:
+        return graph
+
+    with _lock:
+        if _graph is None or _graph.version != version:
+            _graph = TaxonomyGraph.load(version)
+            logger.debug(f"Loaded taxonomy graph (version {version})")
+        return _graph
+
+
+def build_taxonomy_tree():
+    """Build the full category tree with brands in one pass over the tables"""
+    from .models import Category, SubCategories, ProductTypes, Brand
+
+    brand_ids_by_producttype = {}
+    brand_producttypes = {}
+    for brand_id, producttype_id in Brand.producttype.through.objects.values_list('brand_id', 'producttypes_id'):
+        brand_ids_by_producttype.setdefault(producttype_id, []).append(brand_id)
+        brand_producttypes.setdefault(brand_id, []).append(producttype_id)
+
+    producttypes_by_subcategory = {}
+    for producttype in ProductTypes.objects.order_by('name').values('id', 'name', 'subcategory_id'):
+        producttypes_by_subcategory.setdefault(producttype['subcategory_id'], []).append({
+            'id': producttype['id'],
+            'name': producttype['name'],
+            'brands': sorted(brand_ids_by_producttype.get(producttype['id'], [])),
+        })
+
+    subcategories_by_category = {}
+    for subcategory in SubCategories.objects.order_by('name').values('id', 'name', 'category_id'):
+        subcategories_by_category.setdefault(subcategory['category_id'], []).append({
+            'id': subcategory['id'],
+            'name': subcategory['name'],
+            'product_types': producttypes_by_subcategory.get(subcategory['id'], []),
+        })
+
+    return {
+        'categories': [
+            {
+                'id': category['id'],
+                'name': category['name'],
+                'subcategories': subcategories_by_category.get(category['id'], []),
+            }
+            for category in Category.objects.order_by('name').values('id', 'name')
+        ],
+        'brands': [
+            {
+                'id': brand['id'],
+                'name': brand['name'],
+                'producttypes': sorted(brand_producttypes.get(brand['id'], [])),
+            }
+            for brand in Brand.objects.order_by('name').values('id', 'name')
+        ],
+    }
+
+
+def _serialize_tree():
+    body = json.dumps(build_taxonomy_tree(), separators=(',', ':')).encode()
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def get_taxonomy_tree():
+    """Return the serialized tree and its ETag as (bytes, str)"""
+    global _tree
+
+    version = get_taxonomy_version()
+    if version is None:
+        # Without a shared version no copy can be trusted to be current
+        return _serialize_tree()
+
+    tree = _tree
+    if tree is not None and tree[0] == version:
+        return tree[1], tree[2]
+
+    cache_key = f"taxonomy:tree:{version}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = _serialize_tree()
+        timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('taxonomy_tree', 60 * 60 * 24)
+        cache.set(cache_key, cached, timeout)
+
+    _tree = (version, cached[0], cached[1])
+    return cached
+
+
+def invalidate_taxonomy():
+    """Drop the local graph and tell the other processes to reload theirs"""
+    global _graph, _tree
+
+    with _lock:
+        _graph = None
+        _tree = None
+    cache.set(TAXONOMY_VERSION_KEY, uuid4().hex, None)
@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+
+from mall.benchmarks import SCENARIOS, compare_results, percentile
+
+
+def run(**scenarios):
+   return {'scenarios': scenarios}
+
+
+class BenchmarkResultsTests(SimpleTestCase):
+   def test_hot_endpoints_have_scenarios(self):
+      for name in ('marketplace', 'products', 'checkout_webhook', 'admin_orders', 'admin_dashboard'):
+         self.assertIn(name, SCENARIOS)
+
+   def test_percentile(self):
+      values = [float(value) for value in range(1, 21)]
+      self.assertEqual(percentile(values, 0.5), 10.0)
+      self.assertEqual(percentile(values, 0.95), 19.0)
+      self.assertEqual(percentile([3.0], 0.95), 3.0)
+
+   def test_compare_flags_slower_and_chattier_scenarios(self):
+      baseline = run(
+         marketplace={'p50_ms': 10.0, 'queries': 6},
+         products={'p50_ms': 10.0, 'queries': 4},
+         admin_orders={'p50_ms': 10.0, 'queries': 5},
+      )
+      current = run(
+         marketplace={'p50_ms': 11.0, 'queries': 6},
+         products={'p50_ms': 13.0, 'queries': 4},
+         admin_orders={'p50_ms': 9.0, 'queries': 7},
+         checkout_webhook={'skipped': 'no pending seeded checkouts left'},
+      )
+
+      rows = {row['scenario']: row for row in compare_results(current, baseline, threshold=0.2)}
+
+      self.assertEqual(set(rows), {'marketplace', 'products', 'admin_orders'})
+      self.assertFalse(rows['marketplace']['regressed'])
+      self.assertTrue(rows['products']['regressed'])
+      self.assertTrue(rows['admin_orders']['regressed'])
+
+   def test_compare_flags_new_error_statuses(self):
+      baseline = run(
+         marketplace={'p50_ms': 10.0, 'queries': 6, 'statuses': {'200': 20}},
+         products={'p50_ms': 10.0, 'queries': 4, 'statuses': {'200': 18, '404': 2}},
+      )
+      current = run(
+         marketplace={'p50_ms': 2.0, 'queries': 1, 'statuses': {'500': 20}},
+         products={'p50_ms': 10.0, 'queries': 4, 'statuses': {'200': 19, '404': 1}},
+      )
+
+      rows = {row['scenario']: row for row in compare_results(current, baseline)}
+
+      self.assertTrue(rows['marketplace']['regressed'])
+      self.assertEqual(rows['marketplace']['new_errors'], ['500'])
+      self.assertFalse(rows['products']['regressed'])
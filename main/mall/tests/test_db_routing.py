@@ -0,0 +1,74 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from mall.db_routing import (
+   ReplicaRouter, ReplicaRoutingMiddleware, STICKY_COOKIE, primary_reads, replica_reads
+)
+from mall.models import Store
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'db-routing'}}
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=10, CACHES=LOCMEM_CACHE)
+class ReplicaRoutingTests(SimpleTestCase):
+   def setUp(self):
+      self.router = ReplicaRouter()
+      self.factory = RequestFactory()
+      self.seen = {}
+
+   def view(self, write=False):
+      def get_response(request):
+         self.seen['before'] = self.router.db_for_read(Store)
+         if write:
+            self.router.db_for_write(Store)
+         self.seen['after'] = self.router.db_for_read(Store)
+         return HttpResponse()
+      return ReplicaRoutingMiddleware(get_response)
+
+   def test_reads_outside_requests_use_the_primary(self):
+      self.assertIsNone(self.router.db_for_read(Store))
+      with replica_reads():
+         self.assertEqual(self.router.db_for_read(Store), 'replica')
+         with primary_reads():
+            self.assertIsNone(self.router.db_for_read(Store))
+
+   def test_safe_request_reads_from_a_replica(self):
+      response = self.view()(self.factory.get('/rocktea/marketplace/'))
+
+      self.assertEqual(self.seen, {'before': 'replica', 'after': 'replica'})
+      self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+   def test_unsafe_request_stays_on_the_primary_and_sticks(self):
+      response = self.view(write=True)(self.factory.post('/rocktea/cart/'))
+
+      self.assertEqual(self.seen, {'before': None, 'after': None})
+      self.assertIn(STICKY_COOKIE, response.cookies)
+
+   def test_reads_after_a_write_in_a_get_use_the_primary(self):
+      response = self.view(write=True)(self.factory.get('/rocktea/products/'))
+
+      self.assertEqual(self.seen, {'before': 'replica', 'after': None})
+      self.assertIn(STICKY_COOKIE, response.cookies)
+
+   def test_sticky_cookie_keeps_the_next_reads_on_the_primary(self):
+      response = self.view(write=True)(self.factory.post('/rocktea/cart/'))
+      request = self.factory.get('/rocktea/cart/')
+      request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+
+      self.view()(request)
+
+      self.assertIsNone(self.seen['before'])
+
+   def test_token_clients_stick_through_the_cache_marker(self):
+      headers = {'HTTP_AUTHORIZATION': 'Bearer token-one'}
+      self.view(write=True)(self.factory.post('/rocktea/cart/', **headers))
+
+      self.view()(self.factory.get('/rocktea/cart/', **headers))
+      self.assertIsNone(self.seen['before'])
+
+      self.view()(self.factory.get('/rocktea/cart/', HTTP_AUTHORIZATION='Bearer token-two'))
+      self.assertEqual(self.seen['before'], 'replica')
+
+   def test_replicas_are_never_migrated(self):
+      self.assertFalse(self.router.allow_migrate('replica', 'mall'))
+      self.assertIsNone(self.router.allow_migrate('default', 'mall'))
@@ -0,0 +1,198 @@
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from django.test import SimpleTestCase
+
+from mall.dns_reconcile import is_store_record, reconcile_store_dns
+from workshop.route53 import DNSChangeQueue, list_cname_records
+
+
+class StubRoute53:
+   """Minimal Route53 client: one zone of CNAMEs, batches applied all-or-nothing"""
+
+   def __init__(self, records=None, pending_polls=0, rejected=()):
+      self.records = dict(records or {})
+      self.rejected = set(rejected)
+      self.batches = []
+      self.polls = []
+      self.pending_polls = pending_polls
+
+   def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+      changes = ChangeBatch['Changes']
+      self.batches.append(changes)
+      records = dict(self.records)
+      for change in changes:
+         record = change['ResourceRecordSet']
+         name, value = record['Name'].rstrip('.').lower(), record['ResourceRecords'][0]['Value']
+         if name in self.rejected:
+            raise ClientError({'Error': {
+               'Code': 'InvalidChangeBatch', 'Message': f"RRSet with DNS name {name} is not permitted in zone",
+            }}, 'ChangeResourceRecordSets')
+         if change['Action'] == 'UPSERT':
+            records[name] = value
+         elif name not in records:
+            raise ClientError({'Error': {
+               'Code': 'InvalidChangeBatch',
+               'Message': f"Tried to delete resource record set [name='{name}', type='CNAME'] but it was not found",
+            }}, 'ChangeResourceRecordSets')
+         elif records[name] != value:
+            raise ClientError({'Error': {
+               'Code': 'InvalidChangeBatch',
+               'Message': f"Tried to delete resource record set [name='{name}', type='CNAME'] but the values provided do not match the current values",
+            }}, 'ChangeResourceRecordSets')
+         else:
+            del records[name]
+      self.records = records
+      return {'ChangeInfo': {'Id': f'/change/C{len(self.batches)}', 'Status': 'PENDING'}}
+
+   def get_change(self, Id):
+      self.polls.append(Id)
+      status = 'PENDING' if self.pending_polls else 'INSYNC'
+      self.pending_polls = max(self.pending_polls - 1, 0)
+      return {'ChangeInfo': {'Id': Id, 'Status': status}}
+
+   def list_resource_record_sets(self, HostedZoneId, StartRecordName, StartRecordType, MaxItems):
+      start = StartRecordName.rstrip('.').lower()
+      names = [name for name in sorted(self.records) if name >= start][:int(MaxItems)]
+      return {'ResourceRecordSets': [
+         {'Name': f'{name}.', 'Type': 'CNAME', 'TTL': 300, 'ResourceRecords': [{'Value': self.records[name]}]}
+         for name in names
+      ]}
+
+   def get_paginator(self, operation):
+      return self
+
+   def paginate(self, HostedZoneId, page_size=2):
+      record_sets = [{'Name': 'example.com.', 'Type': 'NS', 'ResourceRecords': [{'Value': 'ns1.example.net'}]}]
+      record_sets += [
+         {'Name': f'{name}.', 'Type': 'CNAME', 'TTL': 60, 'ResourceRecords': [{'Value': value}]}
+         for name, value in sorted(self.records.items())
+      ]
+      for start in range(0, len(record_sets), page_size):
+         yield {'ResourceRecordSets': record_sets[start:start + page_size]}
+
+
+class DNSChangeQueueTests(SimpleTestCase):
+   def queue(self, client, **kwargs):
+      return DNSChangeQueue('Z123', client=client, sleep=lambda seconds: None, **kwargs)
+
+   def test_changes_are_submitted_in_batches(self):
+      client = StubRoute53()
+      queue = self.queue(client, batch_size=2)
+      for number in range(5):
+         queue.upsert(f'store{number}.example.com', 'example.com', key=number)
+
+      result = queue.flush()
+
+      self.assertEqual([len(batch) for batch in client.batches], [2, 2, 1])
+      self.assertEqual(sorted(result.applied), [0, 1, 2, 3, 4])
+      self.assertEqual(client.polls, result.change_ids)
+      self.assertEqual(len(client.records), 5)
+      self.assertEqual(len(queue), 0)
+
+   def test_later_change_to_a_name_replaces_the_earlier_one(self):
+      client = StubRoute53({'a.example.com': 'example.com'})
+      queue = self.queue(client)
+      queue.upsert('a.example.com', 'example.com', key='up')
+      queue.delete('A.example.com.', 'example.com', key='down')
+
+      result = queue.flush()
+
+      self.assertEqual(len(client.batches[0]), 1)
+      self.assertEqual(client.batches[0][0]['Action'], 'DELETE')
+      self.assertEqual(sorted(result.applied), ['down', 'up'])
+      self.assertEqual(client.records, {})
+
+   def test_rejected_change_does_not_fail_the_rest_of_the_batch(self):
+      client = StubRoute53({'b.example.com': 'example.com'}, rejected=['b.example.com'])
+      queue = self.queue(client)
+      queue.upsert('a.example.com', 'example.com', key='a')
+      queue.delete('b.example.com', 'example.com', key='b')
+      queue.delete('gone.example.com', 'example.com', key='gone')
+
+      result = queue.flush()
+
+      self.assertEqual(sorted(result.applied), ['a', 'gone'])
+      self.assertEqual(list(result.failed), ['b'])
+      self.assertIn('a.example.com', client.records)
+
+   def test_delete_with_a_stale_target_uses_the_current_record(self):
+      client = StubRoute53({'b.example.com': 'other.example.com', 'c.example.com': 'example.com'})
+      queue = self.queue(client)
+      queue.delete('b.example.com', 'example.com', key='b')
+
+      result = queue.flush()
+
+      self.assertEqual(result.applied, ['b'])
+      self.assertEqual(result.failed, {})
+      self.assertEqual(client.records, {'c.example.com': 'example.com'})
+      self.assertEqual(client.batches[-1][0]['ResourceRecordSet']['ResourceRecords'], [{'Value': 'other.example.com'}])
+
+   def test_delete_of_a_record_gone_since_the_mismatch_succeeds(self):
+      client = StubRoute53({'b.example.com': 'other.example.com'})
+      queue = self.queue(client)
+      queue.delete('b.example.com', 'example.com', key='b')
+      client.list_resource_record_sets = lambda **kwargs: {'ResourceRecordSets': []}
+
+      result = queue.flush()
+
+      self.assertEqual(result.applied, ['b'])
+
+   def test_unsynced_batches_are_reported(self):
+      client = StubRoute53(pending_polls=100)
+      queue = self.queue(client, poll_timeout=0)
+      queue.upsert('a.example.com', 'example.com', key='a')
+
+      result = queue.flush()
+
+      self.assertEqual(result.applied, ['a'])
+      self.assertEqual(result.unsynced, result.change_ids)
+
+   def test_listing_reads_every_page(self):
+      client = StubRoute53({
+         'a.example.com': 'example.com', 'b.example.com': 'example.com',
+         'c.example.com': 'example.com', 'x.other.com': 'other.com',
+      })
+
+      records = list_cname_records('Z123', ['example.com'], client=client)
+
+      self.assertEqual(records, {
+         'a.example.com': 'example.com', 'b.example.com': 'example.com', 'c.example.com': 'example.com',
+      })
+
+
+class ReconcileStoreDNSTests(SimpleTestCase):
+   env_config = {'target_domain': 'example.com', 'hosted_zone_id': 'Z123', 'environment': 'prod', 'is_local': False}
+
+   def test_only_single_slug_labels_are_store_records(self):
+      domains = ('example.com',)
+      self.assertTrue(is_store_record('shop-1.example.com', 'example.com', domains))
+      self.assertFalse(is_store_record('www.example.com', 'example.com', domains))
+      self.assertFalse(is_store_record('user-dev.example.com', 'example.com', domains))
+      self.assertFalse(is_store_record('a.b.example.com', 'example.com', domains))
+      self.assertFalse(is_store_record('_acme.example.com', 'example.com', domains))
+      self.assertFalse(is_store_record('shop.example.com', 'cdn.example.net', domains))
+
+   def reconcile(self, client, **kwargs):
+      with mock.patch('mall.dns_reconcile.expected_store_records', return_value={'live.example.com': 's1'}), \
+            mock.patch('mall.dns_reconcile.Store'):
+         return reconcile_store_dns(self.env_config, client=client, **kwargs)
+
+   def test_orphans_are_reported_but_kept_by_default(self):
+      client = StubRoute53({'live.example.com': 'example.com', 'gone.example.com': 'example.com'})
+
+      summary = self.reconcile(client)
+
+      self.assertEqual(summary['orphaned'], ['gone.example.com'])
+      self.assertEqual(summary['deleted'], [])
+      self.assertIn('gone.example.com', client.records)
+
+   def test_orphans_are_deleted_when_asked(self):
+      client = StubRoute53({
+         'live.example.com': 'example.com', 'gone.example.com': 'example.com', 'www.example.com': 'example.com',
+      })
+
+      summary = self.reconcile(client, delete_orphans=True)
+
+      self.assertEqual(summary['deleted'], ['gone.example.com'])
+      self.assertEqual(set(client.records), {'live.example.com', 'www.example.com'})
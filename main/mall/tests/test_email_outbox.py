@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from setup.email_rendering import render_email
+from setup.emails import send_outbox_emails
+
+
+def email_event(pk, tags=()):
+   return SimpleNamespace(pk=pk, payload={
+      'id': f'm{pk}', 'recipient_email': f'user{pk}@example.com', 'template_name': 'emails/welcome.html',
+      'context': {}, 'subject': 'Welcome', 'tags': list(tags),
+   })
+
+
+def http_error(status_code):
+   return requests.exceptions.HTTPError(response=SimpleNamespace(status_code=status_code, text='error'))
+
+
+@override_settings(EMAIL_BATCH_SIZE=2)
+class SendOutboxEmailsTests(SimpleTestCase):
+   def test_batches_by_tags_and_size(self):
+      events = [email_event(1, ['a']), email_event(2, ['a']), email_event(3, ['a']), email_event(4, ['b'])]
+      with mock.patch('setup.emails.send_batch') as send_batch:
+         self.assertEqual(send_outbox_emails(events), {})
+      self.assertEqual(
+         [[message['id'] for message in call.args[0]] for call in send_batch.call_args_list],
+         [['m1', 'm2'], ['m3'], ['m4']]
+      )
+
+   def test_failed_batches_stay_in_the_outbox(self):
+      events = [email_event(1), email_event(2), email_event(3)]
+      with mock.patch('setup.emails.send_batch', side_effect=[http_error(503), None]):
+         failed = send_outbox_emails(events)
+      self.assertEqual(set(failed), {1, 2})
+
+   def test_rejected_batches_are_sent_one_by_one(self):
+      with mock.patch('setup.emails.send_batch', side_effect=http_error(400)), \
+            mock.patch('setup.tasks.send_email_task.delay') as delay:
+         self.assertEqual(send_outbox_emails([email_event(1), email_event(2)]), {})
+      self.assertEqual(delay.call_count, 2)
+
+
+class RenderEmailTests(SimpleTestCase):
+   def test_every_context_is_rendered_and_timed(self):
+      template = mock.Mock()
+      template.render.side_effect = lambda context: f"<p>Your code is {context['otp']}</p>"
+      with mock.patch('setup.email_rendering.get_email_template', return_value=template), \
+            mock.patch('setup.email_rendering.metrics.observe') as observe:
+         self.assertEqual(render_email('emails/otp.html', {'otp': '1234'})[1], 'Your code is 1234')
+         self.assertEqual(render_email('emails/otp.html', {'otp': '1234'})[1], 'Your code is 1234')
+
+      # Nothing is memoized, so the OTP is not kept once the email is built
+      self.assertEqual(template.render.call_count, 2)
+      self.assertEqual(observe.call_count, 2)
+      self.assertEqual(observe.call_args.args[0], 'email_render_seconds')
+      self.assertEqual(observe.call_args.args[2], {'template': 'emails/otp.html'})
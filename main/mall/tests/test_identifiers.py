@@ -0,0 +1,28 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from mall.identifiers import _find_identifier
+from mall.models import Product
+from order.models import StoreOrder
+
+
+class FindIdentifierTests(SimpleTestCase):
+   def test_formatted_codes_query_only_their_fields(self):
+      with mock.patch('mall.identifiers._lookup', return_value='p1') as lookup:
+         self.assertEqual(_find_identifier(Product, 'ABC123XYZ', {'sku': 'sku'}), 'p1')
+      lookup.assert_called_once_with(Product, 'ABC123XYZ', ['sku'])
+
+   def test_codes_outside_the_format_fall_back_to_an_exact_match(self):
+      with mock.patch('mall.identifiers._lookup', return_value='p1') as lookup:
+         self.assertEqual(_find_identifier(Product, 'old-sku-12', {'sku': 'sku'}), 'p1')
+      lookup.assert_called_once_with(Product, 'old-sku-12', ['sku'])
+
+   def test_fallback_skips_fields_already_queried(self):
+      fields = {'order_sn': 'order_sn', 'delivery_code': 'delivery_code'}
+      with mock.patch('mall.identifiers._lookup', side_effect=[None, 'o1']) as lookup:
+         self.assertEqual(_find_identifier(StoreOrder, 'ABC123', fields), 'o1')
+      self.assertEqual(lookup.call_args_list, [
+         mock.call(StoreOrder, 'ABC123', ['delivery_code']),
+         mock.call(StoreOrder, 'ABC123', ['order_sn']),
+      ])
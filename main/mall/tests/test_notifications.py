@@ -0,0 +1,121 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from mall import signals
+from mall.models import Notification
+from mall.notifications import mark_read, unread_count, unread_key
+
+STORE_KEY = unread_key(store_id='s1')
+RECIPIENT_KEY = unread_key(recipient_id='u1')
+
+
+@contextmanager
+def no_transaction():
+   yield
+
+
+@override_settings(CACHES={'default': {
+   'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notification-tests',
+}})
+class UnreadCounterTestCase(SimpleTestCase):
+   def setUp(self):
+      cache.clear()
+      cache.set(STORE_KEY, 5)
+      cache.set(RECIPIENT_KEY, 5)
+      for patcher in (
+         mock.patch('mall.notifications.transaction.on_commit', side_effect=lambda func: func()),
+         mock.patch('mall.notifications.transaction.atomic', no_transaction),
+         mock.patch('mall.signals.publish_notification'),
+      ):
+         patcher.start()
+         self.addCleanup(patcher.stop)
+      rows = mock.patch.object(Notification.objects, 'filter')
+      self.filter = rows.start()
+      self.addCleanup(rows.stop)
+
+   def counters(self):
+      return cache.get(STORE_KEY), cache.get(RECIPIENT_KEY)
+
+
+class NotificationSignalTests(UnreadCounterTestCase):
+   def save(self, notification, previous_read=None, created=False):
+      notification._state.adding = created
+      self.filter.return_value.values_list.return_value.first.return_value = previous_read
+      signals.remember_notification_read(Notification, notification)
+      signals.count_unread_notification(Notification, notification, created=created)
+
+   def test_new_unread_notification_counts_for_store_and_recipient(self):
+      self.save(Notification(id=1, store_id='s1', recipient_id='u1', read=False), created=True)
+      self.assertEqual(self.counters(), (6, 6))
+
+   def test_new_read_notification_is_not_counted(self):
+      self.save(Notification(id=1, store_id='s1', recipient_id='u1', read=True), created=True)
+      self.assertEqual(self.counters(), (5, 5))
+
+   def test_read_transitions_move_the_counters(self):
+      notification = Notification(id=1, store_id='s1', recipient_id='u1', read=True)
+      self.save(notification, previous_read=False)
+      self.assertEqual(self.counters(), (4, 4))
+
+      notification.read = False
+      self.save(notification, previous_read=True)
+      self.assertEqual(self.counters(), (5, 5))
+
+   def test_saves_that_keep_the_read_flag_leave_the_counters(self):
+      self.save(Notification(id=1, store_id='s1', read=False), previous_read=False)
+      self.save(Notification(id=2, store_id='s1', read=True), previous_read=True)
+      self.assertEqual(self.counters(), (5, 5))
+
+   def test_deleting_an_unread_notification_uncounts_it(self):
+      signals.uncount_unread_notification(Notification, Notification(id=1, store_id='s1', read=False))
+      signals.uncount_unread_notification(Notification, Notification(id=2, store_id='s1', read=True))
+      self.assertEqual(self.counters(), (4, 5))
+
+
+class MarkReadTests(UnreadCounterTestCase):
+   def setUp(self):
+      super().setUp()
+      self.queryset = self.filter.return_value
+      self.queryset.filter.return_value = self.queryset
+      self.queryset.select_for_update.return_value.only.return_value = [
+         Notification(id=1, store_id='s1', recipient_id='u1'),
+         Notification(id=2, store_id='s1'),
+      ]
+
+   def test_marks_every_unread_notification(self):
+      self.assertEqual(mark_read(store_id='s1'), 2)
+      self.queryset.filter.assert_called_once_with(store_id='s1')
+      self.queryset.update.assert_called_once_with(read=True)
+      self.assertEqual(self.counters(), (3, 4))
+
+   def test_marks_only_the_given_ids(self):
+      mark_read(store_id='s1', ids=[1, 2])
+      self.assertEqual(self.queryset.filter.call_args_list, [
+         mock.call(store_id='s1'), mock.call(id__in=[1, 2]),
+      ])
+      self.assertEqual(self.counters(), (3, 4))
+
+   def test_nothing_unread_leaves_the_counters(self):
+      self.queryset.select_for_update.return_value.only.return_value = []
+      self.assertEqual(mark_read(recipient_id='u1'), 0)
+      self.queryset.update.assert_not_called()
+      self.assertEqual(self.counters(), (5, 5))
+
+
+class UnreadCountTests(UnreadCounterTestCase):
+   def test_missing_counter_is_rebuilt_once(self):
+      cache.delete(STORE_KEY)
+      self.filter.return_value.filter.return_value.count.return_value = 7
+
+      self.assertEqual(unread_count(store_id='s1'), 7)
+      self.assertEqual(unread_count(store_id='s1'), 7)
+      self.filter.assert_called_once_with(read=False)
+      self.filter.return_value.filter.assert_called_once_with(store_id='s1')
+      self.assertEqual(cache.get(STORE_KEY), 7)
+
+   def test_cached_counter_skips_the_count(self):
+      self.assertEqual(unread_count(recipient_id='u1'), 5)
+      self.filter.assert_not_called()
@@ -0,0 +1,41 @@
+from django.core.paginator import EmptyPage
+from django.test import SimpleTestCase
+from django.utils.functional import cached_property
+
+from mall.pagination import CappedCountPaginator
+
+
+class SmallCapPaginator(CappedCountPaginator):
+   """Caps a plain list at 25 rows, as the queryset count would"""
+   count_cap = 25
+
+   @cached_property
+   def count(self):
+      if len(self.object_list) > self.count_cap:
+         self.count_is_capped = True
+         return self.count_cap
+      return len(self.object_list)
+
+
+class CappedCountPaginatorTests(SimpleTestCase):
+   def test_pages_past_the_cap_are_served(self):
+      paginator = SmallCapPaginator(list(range(47)), 10)
+      self.assertEqual(paginator.num_pages, 3)
+
+      page = paginator.page(5)
+      self.assertEqual(list(page), [40, 41, 42, 43, 44, 45, 46])
+      self.assertFalse(page.has_next())
+      with self.assertRaises(EmptyPage):
+         paginator.page(6)
+
+   def test_last_counted_page_links_to_the_next(self):
+      paginator = SmallCapPaginator(list(range(47)), 10)
+      page = paginator.page(3)
+      self.assertTrue(page.has_next())
+      self.assertEqual(page.next_page_number(), 4)
+
+   def test_exact_count_keeps_the_default_bounds(self):
+      paginator = SmallCapPaginator(list(range(20)), 10)
+      self.assertFalse(paginator.page(2).has_next())
+      with self.assertRaises(EmptyPage):
+         paginator.page(3)
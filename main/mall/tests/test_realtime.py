@@ -0,0 +1,70 @@
+import threading
+from unittest import mock
+
+from django.core import signing
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mall import realtime
+from mall.models import CustomUser
+from mall.views import EventStreamView
+
+
+@override_settings(REALTIME_ENABLED=True)
+class EventStreamViewTests(SimpleTestCase):
+   def setUp(self):
+      self.user = CustomUser(id='buyer-1', email='buyer@example.com')
+
+   def get(self, **params):
+      request = APIRequestFactory().get('/mall/events/', params)
+      force_authenticate(request, user=self.user)
+      return EventStreamView.as_view()(request)
+
+   def test_invalid_timeout_is_a_bad_request(self):
+      for timeout in ('-1', 'soon', 'nan'):
+         with self.subTest(timeout=timeout):
+            self.assertEqual(self.get(timeout=timeout).status_code, 400)
+
+   def test_invalid_cursor_is_a_bad_request(self):
+      self.assertEqual(self.get(cursor='not-a-cursor').status_code, 400)
+
+   def test_long_poll_frees_its_slot(self):
+      slots = threading.BoundedSemaphore(1)
+      with mock.patch.object(realtime, '_stream_slots', slots), \
+            mock.patch('mall.views.read_events', return_value=([], '5-0')):
+         self.assertEqual(self.get(cursor='4-0', timeout='0').status_code, 200)
+         self.assertEqual(self.get(cursor='5-0', timeout='0').status_code, 200)
+
+   def test_requests_over_the_cap_are_turned_away(self):
+      slots = threading.BoundedSemaphore(1)
+      slots.acquire()
+      with mock.patch.object(realtime, '_stream_slots', slots):
+         response = self.get(cursor='4-0', timeout='0')
+      self.assertEqual(response.status_code, 503)
+      self.assertEqual(response['Retry-After'], '5')
+
+
+class EventTicketTests(SimpleTestCase):
+   def authenticate(self, ticket, user):
+      request = mock.Mock(query_params={'ticket': ticket})
+      with mock.patch('mall.realtime.get_user_model') as get_user_model:
+         get_user_model.return_value.objects.filter.return_value.first.return_value = user
+         return realtime.EventTicketAuthentication().authenticate(request)
+
+   def test_ticket_authenticates_its_user(self):
+      user = CustomUser(id='buyer-1', email='buyer@example.com')
+      self.assertEqual(self.authenticate(realtime.issue_ticket(user), user), (user, None))
+
+   def test_tampered_ticket_is_rejected(self):
+      user = CustomUser(id='buyer-1', email='buyer@example.com')
+      with self.assertRaises(AuthenticationFailed):
+         self.authenticate(realtime.issue_ticket(user) + 'x', user)
+
+   @override_settings(REALTIME_TICKET_SECONDS=60)
+   def test_expired_ticket_is_rejected(self):
+      user = CustomUser(id='buyer-1', email='buyer@example.com')
+      ticket = realtime.issue_ticket(user)
+      with mock.patch('django.core.signing.time.time', return_value=signing.time.time() + 120), \
+            self.assertRaises(AuthenticationFailed):
+         self.authenticate(ticket, user)
@@ -0,0 +1,42 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+
+from dashboards.models import DailyStoreSales
+from mall.models import StoreProductPricing, StoreStats
+from mall.scale_seed import ScaleConfig, ScaleSeeder
+from order.models import OrderItems, StoreOrder
+
+
+# Variant colours are array columns, so the seeder only runs on Postgres
+@skipUnless(connection.vendor == 'postgresql', 'seed_scale needs PostgreSQL')
+class ScaleSeederTests(TestCase):
+   @classmethod
+   def setUpTestData(cls):
+      cls.seeder = ScaleSeeder(ScaleConfig(
+         stores=3, products=30, listed_per_store=10, buyers=10, orders=40, carts=3, webhooks=20,
+         days=10, batch_size=7, seed=1,
+      ), log=lambda message: None)
+      cls.seeder.seed()
+
+   def test_items_record_the_store_price_at_sale(self):
+      items = OrderItems.objects.filter(userorder__store__in=self.seeder.stores).select_related('userorder')
+      self.assertTrue(items.exists())
+      prices = {
+         (pricing.store_id, pricing.product_id): pricing.retail_price
+         for pricing in StoreProductPricing.objects.filter(store__in=self.seeder.stores)
+      }
+      for item in items:
+         self.assertEqual(item.unit_price, prices[(item.userorder.store_id, item.product_id)])
+
+   def test_stats_and_rollups_count_only_sales(self):
+      for store in self.seeder.stores:
+         sales = StoreOrder.objects.filter(store=store, status__in=StoreOrder.SALES_STATUSES)
+         revenue = sales.aggregate(total=Sum('total_price'))['total'] or Decimal('0.00')
+         rolled_up = DailyStoreSales.objects.filter(store=store).aggregate(total=Sum('revenue'))['total']
+
+         self.assertEqual(StoreStats.objects.get(store=store).revenue, revenue)
+         self.assertEqual(rolled_up or Decimal('0.00'), revenue)
@@ -0,0 +1,58 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from mall.models import Store, StoreStats
+from mall.query_optimizers import QueryOptimizer
+from mall.store_stats import get_store_stats
+from order.models import StoreOrder
+
+
+class SalesStatusesTests(SimpleTestCase):
+   def metric_sql(self, metric):
+      annotation = QueryOptimizer.store_metric_annotations(store_ref='pk')[metric]
+      return str(Store.objects.annotate(value=annotation).values('value').query)
+
+   def test_units_sold_and_revenue_count_only_sales_statuses(self):
+      for metric in ('total_products_sold', 'total_revenue'):
+         sql = self.metric_sql(metric)
+         for status in StoreOrder.SALES_STATUSES:
+            self.assertIn(status, sql)
+         self.assertNotIn('Pending', sql)
+
+   def test_orders_count_every_status(self):
+      sql = self.metric_sql('total_orders')
+      for status in StoreOrder.SALES_STATUSES:
+         self.assertNotIn(status, sql)
+
+
+@override_settings(CACHES={'default': {
+   'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'store-stats-tests',
+}})
+class GetStoreStatsTests(SimpleTestCase):
+   def setUp(self):
+      missing_row = mock.patch.object(StoreStats.objects, 'filter')
+      missing_row.start().return_value.first.return_value = None
+      self.addCleanup(missing_row.stop)
+
+   def test_missing_row_is_counted_without_writing(self):
+      counts = {'orders': 3, 'units_sold': 5, 'revenue': Decimal('20.00')}
+      with mock.patch('mall.store_stats.compute_store_stats', return_value={'s1': counts}), \
+            mock.patch('mall.store_stats.rebuild_store_stats') as rebuild, \
+            mock.patch('mall.store_stats.transaction.on_commit', side_effect=lambda func: func()), \
+            mock.patch('mall.tasks.reconcile_store_stats.delay') as delay:
+         stats = get_store_stats('s1')
+         get_store_stats('s1')
+
+      self.assertTrue(stats._state.adding)
+      self.assertEqual((stats.orders, stats.units_sold, stats.revenue), (3, 5, Decimal('20.00')))
+      rebuild.assert_not_called()
+      # One rebuild is queued however many requests miss the row
+      delay.assert_called_once_with(['s1'])
+
+   def test_unknown_store_has_no_stats(self):
+      with mock.patch('mall.store_stats.compute_store_stats', return_value={}), \
+            mock.patch('mall.tasks.reconcile_store_stats.delay') as delay:
+         self.assertIsNone(get_store_stats('missing'))
+      delay.assert_not_called()
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from mall import taxonomy
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'taxonomy'}}
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class TaxonomyVersionTests(SimpleTestCase):
+   def setUp(self):
+      taxonomy._tree = None
+      self.addCleanup(setattr, taxonomy, '_tree', None)
+
+   @override_settings(CACHES=LOCMEM_CACHE)
+   def test_evicted_version_starts_a_fresh_one(self):
+      cache.set(taxonomy.TAXONOMY_VERSION_KEY, 'v1', None)
+      self.assertEqual(taxonomy.get_taxonomy_version(), 'v1')
+
+      cache.delete(taxonomy.TAXONOMY_VERSION_KEY)
+      version = taxonomy.get_taxonomy_version()
+
+      self.assertNotIn(version, (None, 'v1'))
+      self.assertEqual(taxonomy.get_taxonomy_version(), version)
+
+   @override_settings(CACHES=LOCMEM_CACHE)
+   def test_tree_built_before_an_eviction_is_not_served(self):
+      with mock.patch.object(taxonomy, 'build_taxonomy_tree', return_value={'categories': ['old']}):
+         old_body, _ = taxonomy.get_taxonomy_tree()
+
+      cache.delete(taxonomy.TAXONOMY_VERSION_KEY)
+      with mock.patch.object(taxonomy, 'build_taxonomy_tree', return_value={'categories': ['new']}):
+         body, _ = taxonomy.get_taxonomy_tree()
+
+      self.assertNotEqual(body, old_body)
+      self.assertFalse(cache.get('taxonomy:tree:None'))
+
+   @override_settings(CACHES=DUMMY_CACHE)
+   def test_tree_is_never_cached_without_a_version(self):
+      with mock.patch.object(taxonomy, 'build_taxonomy_tree', return_value={'categories': []}) as build:
+         taxonomy.get_taxonomy_tree()
+         taxonomy.get_taxonomy_tree()
+
+      self.assertEqual(build.call_count, 2)
+      self.assertIsNone(taxonomy._tree)
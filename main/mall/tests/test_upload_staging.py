@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from mall import upload_staging
+from mall.upload_staging import StagedUploadNotFound
+from mall.views import UploadProductImage
+
+
+class StagingStorageTestCase(SimpleTestCase):
+   def setUp(self):
+      self.staging_dir = tempfile.mkdtemp()
+      self.addCleanup(shutil.rmtree, self.staging_dir, ignore_errors=True)
+      storages = override_settings(STORAGES={
+         'upload_staging': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': self.staging_dir},
+         },
+      })
+      storages.enable()
+      self.addCleanup(storages.disable)
+
+
+class UploadStagingTests(StagingStorageTestCase):
+   def test_staged_upload_round_trip(self):
+      reference = upload_staging.stage_upload(SimpleUploadedFile('Photo.JPG', b'image bytes'))
+      self.assertTrue(reference.startswith('staging/'))
+      self.assertTrue(reference.endswith('.jpg'))
+
+      with upload_staging.open_staged(reference) as staged_file:
+         self.assertEqual(staged_file.read(), b'image bytes')
+
+      upload_staging.discard_staged(reference)
+      with self.assertRaises(StagedUploadNotFound):
+         upload_staging.open_staged(reference)
+
+   def test_references_outside_the_staging_folder_are_rejected(self):
+      with self.assertRaises(StagedUploadNotFound):
+         upload_staging.open_staged('exports/report.gz')
+      with self.assertRaises(StagedUploadNotFound):
+         upload_staging.open_staged('staging/../exports/report.gz')
+
+   def test_purge_only_removes_expired_files(self):
+      old = upload_staging.stage_upload(SimpleUploadedFile('old.png', b'old'))
+      new = upload_staging.stage_upload(SimpleUploadedFile('new.png', b'new'))
+      an_hour_ago = time.time() - 60 * 60
+      os.utime(os.path.join(self.staging_dir, old), (an_hour_ago, an_hour_ago))
+
+      self.assertEqual(upload_staging.purge_expired(ttl=60), 1)
+      _, files = upload_staging.get_staging_storage().listdir('staging')
+      self.assertEqual(files, [os.path.basename(new)])
+
+
+class UploadProductImageTests(StagingStorageTestCase):
+   def test_upload_is_queued_after_commit(self):
+      view = UploadProductImage()
+      view.request = SimpleNamespace(FILES={'image': SimpleUploadedFile('photo.png', b'png', 'image/png')})
+      serializer = mock.Mock()
+      serializer.save.return_value = SimpleNamespace(id=7)
+
+      with mock.patch('mall.views.transaction.on_commit') as on_commit, \
+            mock.patch('mall.views.upload_image.delay') as delay:
+         view.perform_create(serializer)
+         delay.assert_not_called()
+         on_commit.call_args.args[0]()
+
+      product_id, reference, name, content_type = delay.call_args.args
+      self.assertEqual((product_id, name, content_type), (7, 'photo.png', 'image/png'))
+      with upload_staging.open_staged(reference) as staged_file:
+         self.assertEqual(staged_file.read(), b'png')
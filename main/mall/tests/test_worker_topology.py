@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, override_settings
+
+from setup.celery import app
+from setup.worker_topology import validate_topology, worker_env
+
+TOPOLOGY = {
+   'io': {'queues': ['emails', 'webhooks'], 'pool': 'gevent', 'concurrency': 200, 'uses_db': False},
+   'rest': {
+      'queues': ['default', 'tracking', 'media', 'periodic'], 'pool': 'gevent', 'concurrency': 20,
+   },
+}
+
+
+class WorkerTopologyTests(SimpleTestCase):
+   @override_settings(WORKER_DB_CONNECTION_BUDGET=20)
+   def test_groups_without_database_work_are_not_counted(self):
+      self.assertEqual(validate_topology(app, TOPOLOGY), [])
+
+   @override_settings(WORKER_DB_CONNECTION_BUDGET=10)
+   def test_groups_over_the_connection_budget_are_rejected(self):
+      self.assertEqual(validate_topology(app, TOPOLOGY), [
+         'Worker groups can hold 20 database connections, over the budget of 10',
+      ])
+
+   def test_green_pools_close_connections_after_each_task(self):
+      self.assertEqual(worker_env(TOPOLOGY['io']), {'DB_CONN_MAX_AGE': '0'})
+      self.assertEqual(worker_env({'queues': ['default'], 'pool': 'prefork'}), {})
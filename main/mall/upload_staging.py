@@ -0,0 +1,86 @@
+"""
+Staging store for uploads that are processed by a Celery worker.
+
+The web process saves the upload to the "upload_staging" storage and enqueues
+only the returned reference, so file bytes never travel through the Redis
+broker. The worker opens the staged file, streams it to Cloudinary and
+discards it. Anything left behind (failed tasks, lost messages) is purged once
+it is older than UPLOAD_STAGING_TTL.
+
+The storage is private object storage by default, so web and worker do not
+need to share a disk; see STORAGES in settings.
+"""
+import logging
+import os
+import re
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = 'staging'
+EXTENSION_PATTERN = re.compile(r'^\.[A-Za-z0-9]{1,10}$')
+
+
+class StagedUploadNotFound(Exception):
+    pass
+
+
+def get_staging_storage():
+    return storages['upload_staging']
+
+
+def _check_reference(reference):
+    # Storages may prepend their own prefix, so only the last folder is checked
+    if os.path.basename(os.path.dirname(reference or '')) != STAGING_DIR or '..' in reference:
+        raise StagedUploadNotFound(f"Invalid staged upload reference: {reference!r}")
+    return reference
+
+
+def stage_upload(uploaded_file):
+    """Save an UploadedFile to the staging storage and return its reference"""
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()
+    if not EXTENSION_PATTERN.match(extension):
+        extension = ''
+    # The storage may rename the file, so the name it returns is the reference
+    return get_staging_storage().save(f"{STAGING_DIR}/{uuid4().hex}{extension}", uploaded_file)
+
+
+def open_staged(reference):
+    """Open a staged upload for reading"""
+    try:
+        return get_staging_storage().open(_check_reference(reference), 'rb')
+    except FileNotFoundError:
+        raise StagedUploadNotFound(f"Staged upload {reference} no longer exists")
+
+
+def discard_staged(reference):
+    try:
+        get_staging_storage().delete(_check_reference(reference))
+    except (FileNotFoundError, StagedUploadNotFound):
+        pass
+
+
+def purge_expired(ttl=None):
+    """Delete staged files older than the TTL, returns the number removed"""
+    storage = get_staging_storage()
+    cutoff = timezone.now() - timedelta(seconds=ttl or settings.UPLOAD_STAGING_TTL)
+    try:
+        _, files = storage.listdir(STAGING_DIR)
+    except FileNotFoundError:
+        return 0
+
+    removed = 0
+    for filename in files:
+        name = f"{STAGING_DIR}/{filename}"
+        try:
+            if storage.get_modified_time(name) < cutoff:
+                storage.delete(name)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
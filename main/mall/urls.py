@@ -10,7 +10,9 @@ from .views import (
     SalesCountView,
     ProductFilter,
     CustomResetPasswordRequestToken, 
-    CustomResetPasswordConfirm
+    CustomResetPasswordConfirm,
+    EventStreamView,
+    EventTicketView
     )
 # PaystackWebhookView,
 from order.views import paystack_webhook
@@ -35,6 +37,8 @@ urlpatterns = [
     path('verify_payment/<str:transaction_id>', verify_payment, name="payment"),
     path('payouts/', PayoutDropshipper.as_view(), name='make-payment'),
     path('webhook/paystack/', paystack_webhook, name='paystack_webhook'),
+    path('events/', EventStreamView.as_view(), name='events'),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
     path('password_reset/', CustomResetPasswordRequestToken.as_view(), name='password_reset'),
     # path('password_reset/confirm/<uidb64>/<token>/', CustomResetPasswordConfirm.as_view(), name='password_reset_confirm'),
     path('password_reset/confirm/<str:token>/', CustomResetPasswordConfirm.as_view(), name='password_reset_confirm'),
@@ -28,7 +28,8 @@ from .serializers import (
    ResetPasswordConfirmSerializer,
    ResendVerificationSerializer,
 )
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from .models import (
    CustomUser, 
    Category,
@@ -56,7 +57,7 @@ from order.models import StoreOrder
 from order.serializers import OrderSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import permissions, viewsets, status, serializers
-from rest_framework.renderers import JSONRenderer
+from rest_framework.renderers import JSONRenderer, BaseRenderer
 from rest_framework.parsers import MultiPartParser
 from rest_framework.generics import ListCreateAPIView, ListAPIView
 from rest_framework.pagination import PageNumberPagination
@@ -64,8 +65,9 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.decorators import action
-from django.db import transaction
+from django.db import transaction, connection
 from .tasks import upload_image
+from .upload_staging import stage_upload
 import logging
 from workshop.processor import DomainNameHandler
 from .cloudinary_utils import optimize_product_image
@@ -87,9 +89,22 @@ from order.pagination import CustomPagination
 from setup.utils import get_store_domain
 from django.utils import timezone
 from .cache_utils import CacheManager, cache_result
-from .pagination import OptimizedPageNumberPagination, LargeDatasetPagination
+from .pagination import OptimizedPageNumberPagination, LargeDatasetPagination, CursorPagination
+from .notifications import unread_count, mark_read
+from .realtime import (
+   realtime_enabled, realtime_poll_seconds, realtime_ticket_seconds, store_channel, buyer_channel,
+   latest_cursor, read_events, format_sse, is_valid_cursor, acquire_stream_slot, release_stream_slot,
+   SlotReleasingIterator, EventTicketAuthentication, issue_ticket
+)
+from rest_framework.settings import api_settings
+import math
+import json
+import redis
+import time
 from .cloudinary_utils import CloudinaryOptimizer, optimize_product_image
 from .query_optimizers import QueryOptimizer
+from .taxonomy import get_taxonomy_tree
+from .store_stats import get_store_stats
 from .optimized_serializers import OptimizedProductSerializer, OptimizedStoreSerializer
 
 from django.utils.decorators import method_decorator
@@ -97,7 +112,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
 
 from .utils import get_store_from_request
-from workshop.exceptions import ValidationError
+from workshop.exceptions import ValidationError, UpstreamServiceError
 
 handler = DomainNameHandler()
 
@@ -161,6 +176,7 @@ class ProductViewSet(viewsets.ModelViewSet):
    serializer_class = OptimizedProductSerializer
    permission_classes = [IsAuthenticatedOrReadOnly]
    pagination_class = LargeDatasetPagination
+   query_budget = 4  # Queries per request, enforced in mall/tests/test_query_budgets.py
    
    def get_queryset(self):
       category_id = self.request.query_params.get('category')
@@ -198,24 +214,12 @@ class ProductViewSet(viewsets.ModelViewSet):
          )
 
       try:
-         # Get summary data
-         total_products_added = StoreProductPricing.objects.filter(store=store).count()
-         total_products_available = Product.objects.filter(
-               id__in=StoreProductPricing.objects.filter(store=store).values_list('product', flat=True),
-               is_available=True
-         ).count()
-         # Calculate total products sold using database aggregation
-         from django.db.models import Sum
-         total_products_sold = StoreOrder.objects.filter(
-            store=store
-         ).aggregate(
-            total_sold=Sum('items__quantity')
-         )['total_sold'] or 0
-
+         # Get summary data from the store's rollup row
+         stats = get_store_stats(store)
          summary = {
-            "total_products_added": total_products_added,
-            "total_products_available": total_products_available,
-            "total_products_sold": total_products_sold,
+            "total_products_added": stats.products_added,
+            "total_products_available": stats.products_available,
+            "total_products_sold": stats.units_sold,
          }
 
          # Optimize product query using `select_related` and `prefetch_related`
@@ -522,6 +526,7 @@ class StoreProductPricingAPIView(APIView):
 class GetCategories(viewsets.ReadOnlyModelViewSet):
    queryset = Category.objects.all()
    serializer_class = CategorySerializer
+   query_budget = 1
    
    def list(self, request, *args, **kwargs):
       cached_data = CacheManager.get_categories()
@@ -546,6 +551,21 @@ class GetCategories(viewsets.ReadOnlyModelViewSet):
          # 'brand': brand_serializer.data
       })
 
+   @action(detail=False, methods=['get'], url_path='tree')
+   def tree(self, request):
+      """Full category/subcategory/product type/brand tree, served from a prebuilt blob"""
+      body, etag = get_taxonomy_tree()
+      etag = quote_etag(etag)
+
+      if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+      if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+         response = HttpResponseNotModified()
+      else:
+         response = HttpResponse(body, content_type='application/json')
+      response['ETag'] = etag
+      response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+      return response
+
 class CategoryViewSet(viewsets.ModelViewSet):
    queryset = Category.objects.all()
    serializer_class = CategorySerializer
@@ -600,13 +620,21 @@ class UploadProductImage(ListCreateAPIView):
 
    def perform_create(self, serializer):
       image = self.request.FILES.get('image')
-      images = serializer.save()
+      if not image:
+         serializer.save()
+         return
 
-      if image:
-         # Start optimized Celery task
-         result = upload_image.delay(images.id, image.read(), image.name, image.content_type)
-         return Response({'message': 'Image upload started.'}, status=status.HTTP_202_ACCEPTED)
-      return Response({'message': 'Image created successfully.'}, status=status.HTTP_201_CREATED)
+      # Stage the file and queue only its reference, once the row is committed
+      # so the worker can find it
+      try:
+         staged_reference = stage_upload(image)
+      except Exception as e:
+         logger.error(f"Error staging image {image.name}: {e}")
+         raise UpstreamServiceError('Image upload failed, please try again.')
+      images = serializer.save()
+      transaction.on_commit(
+         lambda: upload_image.delay(images.id, staged_reference, image.name, image.content_type)
+      )
 
 class MarketPlacePagination(PageNumberPagination):
    page_size = 5
@@ -614,6 +642,7 @@ class MarketPlacePagination(PageNumberPagination):
 class MarketPlaceView(viewsets.ModelViewSet):
    serializer_class = MarketPlaceSerializer
    pagination_class = OptimizedPageNumberPagination
+   query_budget = 5
 
    def get_queryset(self):
       store_host = self.request.query_params.get("mall")
@@ -643,21 +672,13 @@ class DropshipperDashboardCounts(APIView):
 
       store = get_object_or_404(Store, id=store_id)
 
-      # Get Number of Listed Products
-      product_count = MarketPlace.objects.filter(
-      store=store.id, list_product=True).count()
-
-      # # Get Number of all Orders per store
-      order_count = StoreOrder.objects.filter(store=store).count()
-
-      # Get Number of Customers
-      customer_count = CustomUser.objects.filter(
-         associated_domain=store).count()
+      # Listed products, orders and customers come from the store's rollup row
+      stats = get_store_stats(store)
 
       data = {
-         "Listed_Products": product_count,
-         "Orders": order_count,
-         "Customers": customer_count
+         "Listed_Products": stats.listed_products,
+         "Orders": stats.orders,
+         "Customers": stats.customers
       }
       return Response(data, status=status.HTTP_200_OK)
 
@@ -863,6 +884,7 @@ class ProductTypeView(viewsets.ModelViewSet):
 class ProductDetails(viewsets.ModelViewSet):
    queryset = Product.objects.select_related('category', 'subcategory', 'producttype', 'brand').prefetch_related('store', 'images', 'product_variants')
    serializer_class = ProductDetailSerializer
+   query_budget = 4
 
 class WalletView(viewsets.ModelViewSet):
    queryset = Wallet.objects.select_related('store')
@@ -897,33 +919,174 @@ class ServicesBusinessInformationView(viewsets.ModelViewSet):
    serializer_class = ServicesBusinessInformationSerializer
 
 class NotificationView(viewsets.ModelViewSet):
+   """
+   Notification inbox of a store (?mall=) or buyer (?mall_cli=), newest first
+   with keyset pagination; ?read=false limits it to unread notifications.
+   """
    serializer_class = NotificationSerializer
+   pagination_class = CursorPagination
+   cursor_ordering = '-created_at'
+   query_budget = 1
 
-   def get_queryset(self):
-      queryset = Notification.objects.select_related('recipient', 'store')
+   def get_owner(self):
+      return self.request.query_params.get('mall'), self.request.query_params.get('mall_cli')
 
-      store_id = self.request.query_params.get('mall')
-      recipient_id = self.request.query_params.get('mall_cli')
+   def get_queryset(self):
+      queryset = Notification.objects.all()
 
+      store_id, recipient_id = self.get_owner()
       if store_id:
          queryset = queryset.filter(store_id=store_id)
       elif recipient_id:
          queryset = queryset.filter(recipient_id=recipient_id)
 
-      try:
-         if queryset.exists():
-               return queryset
-         else:
-               return None
-      except Exception as e:
-         return None
+      read = self.request.query_params.get('read')
+      if read in ('true', 'false'):
+         queryset = queryset.filter(read=read == 'true')
+      return queryset
 
    def list(self, request, *args, **kwargs):
-      queryset = self.get_queryset()
-      if queryset is None:
+      page = self.paginate_queryset(self.get_queryset())
+      if not page and 'cursor' not in request.query_params:
          return Response(status=status.HTTP_204_NO_CONTENT)
-      serializer = self.get_serializer(queryset, many=True)
-      return Response(serializer.data)
+      serializer = self.get_serializer(page, many=True)
+      return self.get_paginated_response(serializer.data)
+
+   @action(detail=False, methods=['get'], url_path='unread-count')
+   def unread_count(self, request):
+      """Badge count for dashboard polling, served from the cached counter"""
+      store_id, recipient_id = self.get_owner()
+      if not store_id and not recipient_id:
+         return Response({"detail": "Pass mall or mall_cli."}, status=status.HTTP_400_BAD_REQUEST)
+      return Response({"unread": unread_count(store_id=store_id, recipient_id=recipient_id)})
+
+   @action(detail=False, methods=['post'], url_path='mark-read')
+   def mark_read(self, request):
+      """Mark the listed `ids`, or every unread notification, as read"""
+      store_id, recipient_id = self.get_owner()
+      if not store_id and not recipient_id:
+         return Response({"detail": "Pass mall or mall_cli."}, status=status.HTTP_400_BAD_REQUEST)
+
+      ids = request.data.get('ids')
+      if ids is not None and not isinstance(ids, list):
+         return Response({"ids": "Must be a list of notification ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+      updated = mark_read(store_id=store_id, recipient_id=recipient_id, ids=ids)
+      return Response({
+         "updated": updated,
+         "unread": unread_count(store_id=store_id, recipient_id=recipient_id),
+      })
+
+class EventStreamRenderer(BaseRenderer):
+   media_type = 'text/event-stream'
+   format = 'sse'
+   charset = 'utf-8'
+
+   def render(self, data, accepted_media_type=None, renderer_context=None):
+      # Only error bodies reach the renderer; events are streamed by the view
+      return json.dumps(data)
+
+class EventStreamView(APIView):
+   """
+   Live updates for a store (?mall=, owner or staff only) or for the signed-in
+   buyer, in place of polling notifications and orders.
+
+   Long-poll by default: waits up to REALTIME_POLL_SECONDS and returns
+   {"cursor": ..., "events": [...]}; send the cursor back on the next call.
+   With Accept: text/event-stream the same window is streamed as SSE, and
+   EventSource reconnects with Last-Event-ID. EventSource can't set headers,
+   so it authenticates with ?ticket= from EventTicketView.
+   """
+   authentication_classes = [EventTicketAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+   permission_classes = [IsAuthenticated]
+   renderer_classes = [JSONRenderer, EventStreamRenderer]
+   query_budget = 2
+
+   def get_channel(self, request):
+      store_id = request.query_params.get('mall')
+      if not store_id:
+         return buyer_channel(request.user.id)
+      if request.user.is_staff or Store.objects.filter(id=store_id, owner=request.user).exists():
+         return store_channel(store_id)
+      return None
+
+   def get(self, request):
+      if not realtime_enabled():
+         return Response({"detail": "Live updates are disabled."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+      channel = self.get_channel(request)
+      if channel is None:
+         return Response({"detail": "Not allowed to follow this store."}, status=status.HTTP_403_FORBIDDEN)
+
+      try:
+         wait = float(request.query_params.get('timeout', realtime_poll_seconds()))
+      except ValueError:
+         wait = -1
+      if not math.isfinite(wait) or wait < 0:
+         return Response({"timeout": "Must be a non-negative number of seconds."}, status=status.HTTP_400_BAD_REQUEST)
+      wait = min(wait, realtime_poll_seconds())
+
+      cursor = request.query_params.get('cursor') or request.headers.get('Last-Event-ID')
+      if cursor and not is_valid_cursor(cursor):
+         return Response({"cursor": "Must be an event id from this stream."}, status=status.HTTP_400_BAD_REQUEST)
+
+      # Every open request holds a worker thread; leave the rest for normal traffic
+      if not acquire_stream_slot():
+         response = Response({"detail": "Too many live connections, try again shortly."},
+                             status=status.HTTP_503_SERVICE_UNAVAILABLE)
+         response['Retry-After'] = '5'
+         return response
+
+      # Nothing below touches the database, so don't hold a connection while blocked
+      if not connection.in_atomic_block:
+         connection.close()
+
+      streaming = False
+      try:
+         cursor = cursor or latest_cursor(channel)
+         if request.accepted_renderer.format == 'sse':
+            response = self.stream(channel, cursor, wait)
+            streaming = True
+            return response
+         events, cursor = read_events(channel, cursor, wait)
+      except redis.RedisError as e:
+         logger.warning(f"Event stream read failed for {channel}: {e}")
+         return Response({"detail": "Live updates are unavailable."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+      finally:
+         # A stream frees its slot when the response is closed
+         if not streaming:
+            release_stream_slot()
+
+      return Response({"cursor": cursor, "events": events})
+
+   def stream(self, channel, cursor, wait):
+      def events(cursor):
+         deadline = time.monotonic() + wait
+         yield "retry: 1000\n\n"
+         try:
+            while (remaining := deadline - time.monotonic()) > 0:
+               batch, cursor = read_events(channel, cursor, remaining)
+               for event in batch:
+                  yield format_sse(event)
+               if not batch:
+                  yield ": keep-alive\n\n"
+         except redis.RedisError as e:
+            logger.warning(f"Event stream read failed for {channel}: {e}")
+
+      response = StreamingHttpResponse(SlotReleasingIterator(events(cursor)), content_type='text/event-stream')
+      response['Cache-Control'] = 'no-cache'
+      response['X-Accel-Buffering'] = 'no'
+      return response
+
+class EventTicketView(APIView):
+   """
+   Short-lived ticket for EventSource clients: GET /mall/events/?ticket=...
+   Reconnects reuse it until it expires, then the client fetches a new one.
+   """
+   permission_classes = [IsAuthenticated]
+
+   def post(self, request):
+      return Response({"ticket": issue_ticket(request.user), "expires_in": realtime_ticket_seconds()})
 
 class PromoPlansView(viewsets.ModelViewSet):
    queryset = PromoPlans.objects.select_related('store', 'category')
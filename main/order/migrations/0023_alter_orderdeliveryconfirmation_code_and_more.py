@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0022_storeorder_order_store_status_4f73b6_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderdeliveryconfirmation',
+            name='code',
+            field=models.CharField(max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='storeorder',
+            name='delivery_code',
+            field=models.CharField(max_length=12, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='storeorder',
+            name='order_sn',
+            field=models.CharField(max_length=12, null=True, unique=True),
+        ),
+    ]
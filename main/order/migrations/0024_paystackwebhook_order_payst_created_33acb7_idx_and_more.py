@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0059_storestats'),
+        ('order', '0023_alter_orderdeliveryconfirmation_code_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paystackwebhook',
+            index=models.Index(fields=['created_at'], name='order_payst_created_33acb7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storeorder',
+            index=models.Index(fields=['created_at'], name='order_store_created_83de9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storeorder',
+            index=models.Index(fields=['store', 'created_at'], name='order_store_store_i_52eac7_idx'),
+        ),
+    ]
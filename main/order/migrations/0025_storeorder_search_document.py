@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:28
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of order.search as of this migration, so later changes to the
+# live document format don't change what this backfill does
+ORDER_SEARCH_FIELDS = (
+    'id', 'order_sn', 'status', 'total_price', 'delivery_location',
+    'tracking_id', 'delivery_code', 'buyer__first_name', 'buyer__last_name', 'buyer__contact',
+)
+ITEM_SEARCH_FIELDS = ('product__name', 'product__sku')
+
+
+def build_search_documents(order_ids, StoreOrder, OrderItems):
+    parts = {}
+    for row in StoreOrder.objects.filter(pk__in=order_ids).values_list('pk', *ORDER_SEARCH_FIELDS):
+        parts[row[0]] = [value for value in row[1:] if value not in (None, '')]
+
+    items = OrderItems.objects.filter(userorder_id__in=order_ids).values_list('userorder_id', *ITEM_SEARCH_FIELDS)
+    for row in items:
+        if row[0] in parts:
+            parts[row[0]].extend(value for value in row[1:] if value not in (None, '') and value not in parts[row[0]])
+
+    return {
+        order_id: " ".join(" ".join(map(str, values)).lower().split())
+        for order_id, values in parts.items()
+    }
+
+
+def backfill_search_documents(apps, schema_editor):
+    StoreOrder = apps.get_model('order', 'StoreOrder')
+    OrderItems = apps.get_model('order', 'OrderItems')
+
+    order_ids = list(StoreOrder.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(order_ids), 1000):
+        documents = build_search_documents(order_ids[start:start + 1000], StoreOrder, OrderItems)
+        StoreOrder.objects.bulk_update(
+            [StoreOrder(pk=order_id, search_document=document) for order_id, document in documents.items()],
+            ['search_document'], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mall', '0060_customuser_user_owner_last_login_idx_and_more'),
+        ('order', '0024_paystackwebhook_order_payst_created_33acb7_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeorder',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='storeorder',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='order_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
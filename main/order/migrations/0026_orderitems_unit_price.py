@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0025_storeorder_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitems',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=11, null=True),
+        ),
+    ]
@@ -1,13 +1,14 @@
 from django.db import models
 from mall.models import Product, CustomUser, Store, ProductVariant, StoreProductPricing, Wallet
+from mall.identifiers import allocate_identifier
 from uuid import uuid4
-import random as rand, string
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.serializers import ValidationError
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
 
 
 class StoreOrder(models.Model):
@@ -18,35 +19,50 @@ class StoreOrder(models.Model):
       ("Delivered", "Delivered"),
       ("Returned", "Returned")
    )
+   # Paid for and not returned: what revenue, units sold and the sales rollups count
+   SALES_STATUSES = ("Completed", "Enroute", "Delivered")
    id = models.CharField(primary_key=True, default=uuid4, max_length=36)
    buyer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='user_orders', null=True)
    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='store_orders', null=True)
    created_at = models.DateTimeField(auto_now_add=True, null=True)
    total_price = models.DecimalField(decimal_places=2, max_digits=11, default=0.00, null=True)
    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default="Pending", null=True)
-   order_sn = models.CharField(max_length=5, unique=True, null=True)
-   delivery_code = models.CharField(max_length=5, null=True, unique=True)
+   order_sn = models.CharField(max_length=12, unique=True, null=True)
+   delivery_code = models.CharField(max_length=12, null=True, unique=True)
    delivery_location = models.CharField(max_length=200, null=True)
    state = models.ForeignKey('State', on_delete=models.CASCADE, null=True)
    tracking_id = models.CharField(max_length=100, null=True, blank=True) 
    tracking_url = models.URLField(max_length=200, null=True, blank=True) 
    tracking_status = models.CharField(max_length=50, null=True, blank=True)
    shipping_fee = models.DecimalField(decimal_places=2, max_digits=11, default=0.00, null=True)
+   # Lowercased order, buyer and product text for admin search, see order.search
+   search_document = models.TextField(blank=True, default='', editable=False)
 
    class Meta:
       indexes = [
          models.Index(fields=['status']),
          models.Index(fields=['store', 'status']),
          models.Index(fields=['total_price']),
+         models.Index(fields=['created_at']),
+         models.Index(fields=['store', 'created_at']),
+         GinIndex(fields=['search_document'], name='order_search_trgm_idx', opclasses=['gin_trgm_ops']),
       ]
    
+   @classmethod
+   def from_db(cls, db, field_names, values):
+      instance = super().from_db(db, field_names, values)
+      # Previous values let the StoreStats signals apply exact deltas
+      instance._loaded_status = instance.__dict__.get('status')
+      instance._loaded_total_price = instance.__dict__.get('total_price')
+      instance._loaded_tracking_status = instance.__dict__.get('tracking_status')
+      return instance
+
    def save(self, *args, **kwargs):
       if not self.order_sn:
-         random_digits = "".join(rand.choices(string.digits, k=5))
-         self.order_sn = random_digits
+         self.order_sn = allocate_identifier('order_sn')
    
       if not self.delivery_code:
-         self.delivery_code = "".join(rand.choices(string.ascii_uppercase + string.digits, k=5))
+         self.delivery_code = allocate_identifier('delivery_code')
       return super(StoreOrder, self).save(*args, **kwargs)
 
 class PaymentHistory(models.Model):
@@ -116,13 +132,23 @@ class OrderItems(models.Model):
    product_variant = models.ForeignKey(ProductVariant, on_delete=models.DO_NOTHING, null=True)
    quantity = models.PositiveIntegerField(default=1)
    created_at = models.DateTimeField(auto_now_add=True, null=True)
+   # Store retail price when the order was placed; later repricing must not
+   # change past revenue. Null for items that predate the column
+   unit_price = models.DecimalField(max_digits=11, decimal_places=2, null=True, blank=True)
 
    def __str__(self):
       return self.created_at
 
+   def save(self, *args, **kwargs):
+      if self.unit_price is None and self.product_id and self.userorder_id:
+         self.unit_price = StoreProductPricing.objects.filter(
+            store__store_orders=self.userorder_id, product_id=self.product_id
+         ).order_by('-id').values_list('retail_price', flat=True).first()
+      return super().save(*args, **kwargs)
+
 class OrderDeliveryConfirmation(models.Model):
    userorder = models.ForeignKey('StoreOrder', on_delete=models.DO_NOTHING)
-   code = models.CharField(max_length=5)
+   code = models.CharField(max_length=12)
 
    def __str__(self):
       return self.code
@@ -171,5 +197,10 @@ class PaystackWebhook(models.Model):
    order = models.ForeignKey(StoreOrder, on_delete=models.SET_NULL, null=True, blank=True)  # New field for order ID
    purpose = models.CharField(max_length=50, default="order")  # New field for payment purpose
 
+   class Meta:
+      indexes = [
+         models.Index(fields=['created_at']),
+      ]
+
    def __str__(self):
       return self.reference
@@ -0,0 +1,109 @@
+"""
+Denormalized search text for StoreOrder.
+
+Admin order search used to join buyers, order items and products and needed
+DISTINCT. Instead every order keeps a lowercased `search_document` with the
+fields admins search on, backed by a trigram index, so a search is a single
+LIKE on StoreOrder. Documents are rebuilt after commit whenever an order or
+its items change, and by a Celery task for every affected order when a
+buyer's or product's searched fields change.
+"""
+import logging
+import threading
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+ORDER_SEARCH_FIELDS = (
+   'id', 'order_sn', 'status', 'total_price', 'delivery_location',
+   'tracking_id', 'delivery_code', 'buyer__first_name', 'buyer__last_name', 'buyer__contact',
+)
+ITEM_SEARCH_FIELDS = ('product__name', 'product__sku')
+
+# CustomUser and Product fields that appear in the documents of their orders
+BUYER_DOCUMENT_FIELDS = ('first_name', 'last_name', 'contact')
+PRODUCT_DOCUMENT_FIELDS = ('name', 'sku')
+
+# Saves limited to other fields (e.g. tracking_status) leave the document alone
+ORDER_DOCUMENT_FIELDS = {
+   'id', 'order_sn', 'status', 'total_price', 'delivery_location',
+   'tracking_id', 'delivery_code', 'buyer', 'buyer_id',
+}
+
+_pending = threading.local()
+
+
+def normalize_search_text(value):
+   return " ".join(str(value).lower().split())
+
+
+def build_search_documents(order_ids, order_model=None, item_model=None):
+   """Return {order_id: document} for the given orders"""
+   if order_model is None:
+      from .models import StoreOrder as order_model
+   if item_model is None:
+      from .models import OrderItems as item_model
+
+   parts = {}
+   for row in order_model.objects.filter(pk__in=order_ids).values_list('pk', *ORDER_SEARCH_FIELDS):
+      parts[row[0]] = [value for value in row[1:] if value not in (None, '')]
+
+   items = item_model.objects.filter(userorder_id__in=order_ids).values_list('userorder_id', *ITEM_SEARCH_FIELDS)
+   for row in items:
+      if row[0] in parts:
+         parts[row[0]].extend(value for value in row[1:] if value not in (None, '') and value not in parts[row[0]])
+
+   return {order_id: normalize_search_text(" ".join(map(str, values))) for order_id, values in parts.items()}
+
+
+def refresh_search_documents(order_ids, order_model=None, item_model=None):
+   """Recompute and store the search documents of the given orders"""
+   if order_model is None:
+      from .models import StoreOrder as order_model
+
+   documents = build_search_documents(order_ids, order_model, item_model)
+   orders = [order_model(pk=order_id, search_document=document) for order_id, document in documents.items()]
+   order_model.objects.bulk_update(orders, ['search_document'], batch_size=500)
+   return len(orders)
+
+
+def refresh_related_search_documents(buyer_id=None, product_id=None, chunk_size=1000):
+   """Refresh the documents of every order placed by the buyer or containing the product"""
+   from .models import StoreOrder
+
+   orders = StoreOrder.objects.order_by('pk')
+   if buyer_id is not None:
+      orders = orders.filter(buyer_id=buyer_id)
+   if product_id is not None:
+      orders = orders.filter(items__product_id=product_id).distinct()
+   order_ids = list(orders.values_list('pk', flat=True))
+
+   refreshed = 0
+   for start in range(0, len(order_ids), chunk_size):
+      refreshed += refresh_search_documents(order_ids[start:start + chunk_size])
+   return refreshed
+
+
+def _flush_pending():
+   order_ids = getattr(_pending, 'order_ids', None)
+   if not order_ids:
+      return
+   _pending.order_ids = set()
+   try:
+      refresh_search_documents(order_ids)
+   except Exception as e:
+      logger.error(f"Failed to refresh order search documents for {len(order_ids)} orders: {str(e)}")
+
+
+def schedule_search_refresh(order_id):
+   """
+   Refresh the order's document once the current transaction commits.
+
+   An order created with several items in one transaction is refreshed once:
+   the first callback to run handles every order queued so far.
+   """
+   if not hasattr(_pending, 'order_ids'):
+      _pending.order_ids = set()
+   _pending.order_ids.add(order_id)
+   transaction.on_commit(_flush_pending)
@@ -90,7 +90,7 @@ class OrderSerializer(serializers.ModelSerializer):
    created_at = serializers.SerializerMethodField()
    order_id = serializers.CharField(max_length=5, read_only=True)
    status = serializers.CharField(max_length=9) # , read_only=True
-   delivery_code = serializers.CharField(max_length=5, read_only=True)
+   delivery_code = serializers.CharField(max_length=12, read_only=True)
 
    # Logistics
    rider_assigned = serializers.CharField(max_length=32, read_only=True)
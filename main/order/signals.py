@@ -1,11 +1,20 @@
 from .models import (
    PaymentHistory, StoreOrder, 
-   OrderItems, StoreProductPricing
+   OrderItems, StoreProductPricing, PaystackWebhook
    )
-from mall.models import Wallet, Notification, Store
+from mall.models import Wallet, Notification, Store, CustomUser, Product
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models import Sum
 from django.shortcuts import get_object_or_404
+from mall import store_stats
+from django.utils import timezone
+from dashboards.rollups import schedule_day_rebuild
+from .search import (
+   ORDER_DOCUMENT_FIELDS, BUYER_DOCUMENT_FIELDS, PRODUCT_DOCUMENT_FIELDS, schedule_search_refresh
+   )
+from mall.realtime import publish_on_commit, store_channel, buyer_channel
 
 
 """ @receiver(post_save, sender=OrderItems)
@@ -70,3 +79,131 @@ def create_payment_history(sender, instance, created, **kwargs):
       store = get_object_or_404(Store, id=store_id)
       
       Notification.objects.create(store=store, message=notification_message)
+
+
+def order_event_data(order):
+   return {
+      'id': order.id,
+      'order_sn': order.order_sn,
+      'status': order.status,
+      'tracking_status': order.tracking_status,
+      'tracking_url': order.tracking_url,
+      'total_price': order.total_price,
+   }
+
+# Connected before count_store_order, which moves _loaded_status on
+@receiver(post_save, sender=StoreOrder)
+def publish_order_update(sender, instance, created, **kwargs):
+   """Push new orders, settlement and tracking changes to the store and buyer channels"""
+   events = []
+   if created:
+      events.append('order.created')
+   elif getattr(instance, '_loaded_status', None) != instance.status:
+      events.append('order.status')
+   if not created and getattr(instance, '_loaded_tracking_status', None) != instance.tracking_status:
+      events.append('order.tracking')
+   instance._loaded_tracking_status = instance.tracking_status
+
+   channels = [
+      store_channel(instance.store_id) if instance.store_id else None,
+      buyer_channel(instance.buyer_id) if instance.buyer_id else None,
+   ]
+   for event in events:
+      publish_on_commit(channels, event, order_event_data(instance))
+
+@receiver(post_save, sender=PaystackWebhook)
+def publish_payment_settled(sender, instance, **kwargs):
+   """Lets the checkout page stop polling orders/by-reference once the order exists"""
+   if instance.status == 'Success' and instance.order_id:
+      publish_on_commit([buyer_channel(instance.user_id)], 'payment.settled', {
+         'reference': instance.reference, 'order_id': instance.order_id,
+      })
+
+@receiver(post_save, sender=StoreOrder)
+def count_store_order(sender, instance, created, **kwargs):
+   """Keep the store's order, revenue and units sold counters and the sales rollups current"""
+   was_completed = not created and getattr(instance, '_loaded_status', None) in StoreOrder.SALES_STATUSES
+   is_completed = instance.status in StoreOrder.SALES_STATUSES
+   previous_total = getattr(instance, '_loaded_total_price', None) or 0
+   current_total = instance.total_price or 0
+
+   # Late settlements and returns change days the hourly rollup no longer covers
+   if not created and instance.created_at and (was_completed != is_completed or previous_total != current_total):
+      schedule_day_rebuild(timezone.localtime(instance.created_at).date())
+
+   revenue = (current_total if is_completed else 0) - (previous_total if was_completed else 0)
+   units_sold = 0
+   if was_completed != is_completed and not created:
+      units = instance.items.aggregate(total=Sum('quantity'))['total'] or 0
+      units_sold = units if is_completed else -units
+
+   store_stats.apply_delta(
+      instance.store_id,
+      orders=1 if created else 0,
+      revenue=revenue,
+      units_sold=units_sold
+   )
+   instance._loaded_status = instance.status
+   instance._loaded_total_price = instance.total_price
+
+@receiver(post_delete, sender=StoreOrder)
+def uncount_store_order(sender, instance, **kwargs):
+   completed = instance.status in StoreOrder.SALES_STATUSES
+   if completed and instance.created_at:
+      schedule_day_rebuild(timezone.localtime(instance.created_at).date())
+   store_stats.apply_delta(
+      instance.store_id,
+      orders=-1,
+      revenue=-(instance.total_price or 0) if completed else 0
+   )
+
+@receiver(post_save, sender=OrderItems)
+def count_units_sold(sender, instance, created, **kwargs):
+   if created and instance.userorder_id:
+      order = instance.userorder
+      if order.status in StoreOrder.SALES_STATUSES:
+         store_stats.apply_delta(order.store_id, units_sold=instance.quantity)
+
+@receiver(post_delete, sender=OrderItems)
+def uncount_units_sold(sender, instance, **kwargs):
+   store_id = StoreOrder.objects.filter(
+      pk=instance.userorder_id, status__in=StoreOrder.SALES_STATUSES
+   ).values_list('store_id', flat=True).first()
+   if store_id:
+      store_stats.apply_delta(store_id, units_sold=-instance.quantity)
+
+@receiver(post_save, sender=StoreOrder)
+def refresh_order_search_document(sender, instance, created, update_fields=None, **kwargs):
+   if update_fields and not ORDER_DOCUMENT_FIELDS.intersection(update_fields):
+      return
+   schedule_search_refresh(instance.pk)
+
+@receiver(post_save, sender=OrderItems)
+@receiver(post_delete, sender=OrderItems)
+def refresh_item_search_document(sender, instance, **kwargs):
+   if instance.userorder_id:
+      schedule_search_refresh(instance.userorder_id)
+
+def _document_fields_changed(instance, fields, update_fields):
+   if instance._state.adding or (update_fields and not set(fields).intersection(update_fields)):
+      return False
+   previous = type(instance).objects.filter(pk=instance.pk).values_list(*fields).first()
+   return previous is not None and previous != tuple(getattr(instance, field) for field in fields)
+
+@receiver(pre_save, sender=CustomUser)
+def remember_buyer_document_fields(sender, instance, update_fields=None, **kwargs):
+   instance._search_fields_changed = _document_fields_changed(instance, BUYER_DOCUMENT_FIELDS, update_fields)
+
+@receiver(pre_save, sender=Product)
+def remember_product_document_fields(sender, instance, update_fields=None, **kwargs):
+   instance._search_fields_changed = _document_fields_changed(instance, PRODUCT_DOCUMENT_FIELDS, update_fields)
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=Product)
+def refresh_renamed_search_documents(sender, instance, created, **kwargs):
+   if not getattr(instance, '_search_fields_changed', False):
+      return
+   from .tasks import refresh_order_search_documents
+
+   key = 'buyer_id' if sender is CustomUser else 'product_id'
+   transaction.on_commit(lambda: refresh_order_search_documents.delay(**{key: instance.pk}))
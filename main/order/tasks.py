@@ -0,0 +1,18 @@
+from celery import shared_task
+import logging
+
+from .search import refresh_related_search_documents
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def refresh_order_search_documents(self, buyer_id=None, product_id=None):
+   """Rebuild the search documents of a renamed buyer's or product's orders"""
+   try:
+      refreshed = refresh_related_search_documents(buyer_id=buyer_id, product_id=product_id)
+      logger.info(f"Refreshed {refreshed} order search documents")
+      return refreshed
+   except Exception as e:
+      logger.error(f"Error refreshing order search documents: {str(e)}")
+      self.retry(exc=e)
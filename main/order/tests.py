@@ -1,3 +1,107 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from mall.models import CustomUser, Product
+from order import signals, views
+from order.models import PaystackWebhook
+
+
+@contextmanager
+def no_transaction():
+   yield
+
+
+class PaystackWebhookLockTests(SimpleTestCase):
+   def post(self, body):
+      payload = json.dumps(body).encode('utf-8')
+      signature = hmac.new(views.secret.encode('utf-8'), payload, digestmod=hashlib.sha512).hexdigest()
+      request = RequestFactory().post(
+         '/mall/webhook/paystack/', payload, content_type='application/json', HTTP_X_PAYSTACK_SIGNATURE=signature
+      )
+      return views.paystack_webhook(request)
+
+   def test_webhook_row_is_locked_inside_a_transaction(self):
+      state = {'in_transaction': False, 'locked_in_transaction': None}
+
+      @contextmanager
+      def atomic():
+         state['in_transaction'] = True
+         try:
+            yield
+         finally:
+            state['in_transaction'] = False
+
+      def get(**kwargs):
+         state['locked_in_transaction'] = state['in_transaction']
+         raise PaystackWebhook.DoesNotExist
+
+      with mock.patch('order.views.transaction.atomic', atomic), \
+            mock.patch.object(PaystackWebhook.objects, 'select_for_update') as select_for_update:
+         select_for_update.return_value.get.side_effect = get
+         response = self.post({
+            'event': 'charge.success',
+            'data': {'reference': 'ref-1', 'amount': 1000, 'email': 'buyer@example.com',
+                     'metadata': {'purpose': 'order', 'user_id': 'u1'}},
+         })
+
+      self.assertEqual(response.status_code, 404)
+      self.assertIs(state['locked_in_transaction'], True)
+
+   def test_redelivered_webhook_does_not_create_a_second_order(self):
+      webhook = PaystackWebhook(reference='ref-1', status='Pending')
+      body = {
+         'event': 'charge.success',
+         'data': {'reference': 'ref-1', 'amount': 1000, 'email': 'buyer@example.com',
+                  'metadata': {'purpose': 'order', 'user_id': 'u1'}},
+      }
+
+      def settle(data, paystack_webhook, total_price, metadata):
+         paystack_webhook.status = 'Success'
+         return JsonResponse({'message': 'Order created'}, status=201)
+
+      with mock.patch('order.views.transaction.atomic', no_transaction), \
+            mock.patch.object(PaystackWebhook.objects, 'select_for_update') as select_for_update, \
+            mock.patch('order.views.handle_order_payment', side_effect=settle) as handle_order_payment, \
+            mock.patch('order.views.log_webhook_attempt.delay'):
+         select_for_update.return_value.get.return_value = webhook
+         first = self.post(body)
+         second = self.post(body)
+
+      self.assertEqual(first.status_code, 201)
+      self.assertEqual(second.status_code, 200)
+      handle_order_payment.assert_called_once()
+
+
+class RenamedSearchDocumentTests(SimpleTestCase):
+   def save(self, instance, previous, update_fields=None):
+      instance._state.adding = False
+      with mock.patch.object(type(instance).objects, 'filter') as filter_rows, \
+            mock.patch('order.signals.transaction.on_commit', side_effect=lambda func: func()), \
+            mock.patch('order.tasks.refresh_order_search_documents.delay') as delay:
+         filter_rows.return_value.values_list.return_value.first.return_value = previous
+         pre_save = signals.remember_product_document_fields if isinstance(instance, Product) \
+            else signals.remember_buyer_document_fields
+         pre_save(type(instance), instance, update_fields=update_fields)
+         signals.refresh_renamed_search_documents(type(instance), instance, created=False)
+      return delay
+
+   def test_buyer_rename_refreshes_their_orders(self):
+      buyer = CustomUser(id='u1', first_name='Ada', last_name='Obi', contact=None)
+      delay = self.save(buyer, ('Ade', 'Obi', None))
+      delay.assert_called_once_with(buyer_id='u1')
+
+   def test_product_sku_change_refreshes_its_orders(self):
+      product = Product(id='p1', name='Kettle', sku='NEW123')
+      delay = self.save(product, ('Kettle', 'OLD123'))
+      delay.assert_called_once_with(product_id='p1')
+
+   def test_unchanged_fields_leave_documents_alone(self):
+      buyer = CustomUser(id='u1', first_name='Ada', last_name='Obi', contact=None)
+      self.save(buyer, ('Ada', 'Obi', None)).assert_not_called()
+      self.save(buyer, ('Ade', 'Obi', None), update_fields=['last_login']).assert_not_called()
@@ -130,25 +130,35 @@ def paystack_webhook(request):
          logger.info(f"Purpose: {purpose}")
          logger.info(f"Amount: {total_price}")
 
-         try:
-               paystack_webhook = PaystackWebhook.objects.select_for_update().get(reference=transaction_id)
-               logger.info(f"Found webhook record for reference: {transaction_id}")
-         except PaystackWebhook.DoesNotExist:
-               logger.error(f"Transaction reference not found: {transaction_id}")
-               return JsonResponse({"error": "Transaction reference not found"}, status=status.HTTP_404_NOT_FOUND)
-         
-         if purpose == 'order':
-               result = handle_order_payment(data, paystack_webhook, total_price, metadata)
-               log_webhook_attempt.delay(transaction_id, email, purpose, "order_processed")
-               return result
-         elif purpose == 'dropshipping_payment':
-               result = handle_dropshipping_payment(data, paystack_webhook, email)
-               log_webhook_attempt.delay(transaction_id, email, purpose, "dropshipping_processed")
-               return result
-         else:
-               logger.error(f"Unknown payment purpose: {purpose}")
-               log_webhook_attempt.delay(transaction_id, email, purpose, "unknown_purpose")
-               return JsonResponse({"error": "Unknown payment purpose"}, status=status.HTTP_400_BAD_REQUEST)
+         # The row lock holds until the payment is recorded, so a retried
+         # webhook waits instead of processing the same payment twice
+         with transaction.atomic():
+            try:
+                  paystack_webhook = PaystackWebhook.objects.select_for_update().get(reference=transaction_id)
+                  logger.info(f"Found webhook record for reference: {transaction_id}")
+            except PaystackWebhook.DoesNotExist:
+                  logger.error(f"Transaction reference not found: {transaction_id}")
+                  return JsonResponse({"error": "Transaction reference not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            # Paystack redelivers until it gets a 2xx; a settled payment must
+            # not create a second order
+            if paystack_webhook.status == 'Success':
+                  logger.info(f"Payment {transaction_id} already processed, ignoring redelivery")
+                  return JsonResponse({"message": "Payment already processed"}, status=status.HTTP_200_OK)
+
+            if purpose == 'order':
+                  result = handle_order_payment(data, paystack_webhook, total_price, metadata)
+                  outcome = "order_processed"
+            elif purpose == 'dropshipping_payment':
+                  result = handle_dropshipping_payment(data, paystack_webhook, email)
+                  outcome = "dropshipping_processed"
+            else:
+                  logger.error(f"Unknown payment purpose: {purpose}")
+                  result = JsonResponse({"error": "Unknown payment purpose"}, status=status.HTTP_400_BAD_REQUEST)
+                  outcome = "unknown_purpose"
+
+         log_webhook_attempt.delay(transaction_id, email, purpose, outcome)
+         return result
       else:
          logger.warning(f"Unhandled event type: {event}")
          return JsonResponse({"error": "Unhandled event type"}, status=status.HTTP_400_BAD_REQUEST)
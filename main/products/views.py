@@ -17,7 +17,8 @@ from .serializers import (
 )
 from order.models import OrderItems
 import logging
-from order.pagination import CustomPagination
+from mall.pagination import CappedCountPagination
+from mall.identifiers import get_by_identifier
 from .filters import ProductFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -31,7 +32,7 @@ class AdminProductViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
     # Allow both JSON and multipart requests
     parser_classes = [JSONParser, MultiPartParser, FormParser]
-    pagination_class = CustomPagination
+    pagination_class = CappedCountPagination
     ordering = ['-created_at']
 
     # Add filter backends and custom filter class
@@ -64,17 +65,11 @@ class AdminProductViewSet(viewsets.ModelViewSet):
 
     def get_object(self):
         """Allow lookup by ID or SKU"""
-        identifier = self.kwargs.get('identifier')
-        
-        try:
-            # Try to find by UUID (primary key)
-            return self.get_queryset().get(id=identifier)
-        except (Product.DoesNotExist, ValueError):
-            try:
-                # Try to find by SKU
-                return self.get_queryset().get(sku=identifier)
-            except Product.DoesNotExist:
-                raise Http404("No product found with the provided identifier")
+        product = get_by_identifier(self.get_queryset(), self.kwargs.get('identifier'), {'sku': 'sku'})
+        if product is None:
+            raise Http404("No product found with the provided identifier")
+        self.check_object_permissions(self.request, product)
+        return product
             
     def filter_queryset(self, queryset):
         """Handle custom search for stock status"""
@@ -1,6 +1,8 @@
 from celery import Celery
 import os
 from datetime import timedelta
+from celery.schedules import crontab
+from celery.signals import worker_init
 from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
@@ -20,7 +22,7 @@ app.conf.update(
    task_track_started=True,
    task_time_limit=30 * 60,
    task_soft_time_limit=25 * 60,
-   worker_prefetch_multiplier=1,
+   worker_prefetch_multiplier=1,  # Pools and concurrency per queue: WORKER_TOPOLOGY in settings
    worker_max_tasks_per_child=1000,  # Prevent memory leaks
    worker_disable_rate_limits=False,
    task_compression='gzip',
@@ -31,21 +33,85 @@ app.conf.update(
       'check-shipping-status': {
          'task': 'mall.tasks.check_shipping_status',
          'schedule': timedelta(minutes=30),
-         'options': {'queue': 'periodic', 'expires': 1800}
+         'options': {'queue': 'tracking', 'expires': 1800}
       },
       'cancel-unpaid-shipments': {
          'task': 'mall.tasks.cancel_unpaid_shipments', 
          'schedule': timedelta(hours=2),
+         'options': {'queue': 'tracking', 'expires': 3600}
+      },
+      'reconcile-store-stats': {
+         'task': 'mall.tasks.reconcile_store_stats',
+         'schedule': crontab(hour=2, minute=0),
+         'options': {'queue': 'periodic', 'expires': 3 * 3600}
+      },
+      'build-daily-sales-rollups': {
+         'task': 'dashboards.tasks.build_daily_sales_rollups',
+         'schedule': crontab(minute=15),
+         'options': {'queue': 'periodic', 'expires': 3600}
+      },
+      # Catches order changes that bypassed the signals (queryset updates)
+      'rebuild-sales-rollups-window': {
+         'task': 'dashboards.tasks.build_daily_sales_rollups',
+         'schedule': crontab(hour=3, minute=30),
+         'kwargs': {'days': settings.SALES_ROLLUP_REBUILD_DAYS},
+         'options': {'queue': 'periodic', 'expires': 3 * 3600}
+      },
+      'reconcile-store-dns': {
+         'task': 'mall.tasks.reconcile_store_dns',
+         'schedule': crontab(hour=2, minute=30),
+         'options': {'queue': 'periodic', 'expires': 3 * 3600}
+      },
+      'relay-outbox': {
+         'task': 'mall.tasks.relay_outbox',
+         'schedule': timedelta(minutes=1),
+         'options': {'queue': 'default', 'expires': 60}
+      },
+      'purge-outbox': {
+         'task': 'mall.tasks.purge_outbox',
+         'schedule': crontab(hour=3, minute=0),
+         'options': {'queue': 'periodic', 'expires': 3 * 3600}
+      },
+      'purge-staged-uploads': {
+         'task': 'mall.tasks.purge_staged_uploads',
+         'schedule': timedelta(hours=1),
+         'options': {'queue': 'periodic', 'expires': 3600}
+      },
+      'purge-export-files': {
+         'task': 'admin_orders.tasks.purge_export_files',
+         'schedule': timedelta(hours=1),
          'options': {'queue': 'periodic', 'expires': 3600}
       },
    },
    timezone='UTC',
+   # Every queue used here needs a consumer in WORKER_TOPOLOGY (checked by run_workers)
    task_routes={
+      'setup.tasks.send_email_task': {'queue': 'emails'},
+      'mall.tasks.log_webhook_attempt': {'queue': 'webhooks'},
       'mall.tasks.upload_image': {'queue': 'media'},
-      'mall.tasks.check_shipping_status': {'queue': 'periodic'},
-      'mall.tasks.cancel_unpaid_shipments': {'queue': 'periodic'},
+      'mall.tasks.check_shipping_status': {'queue': 'tracking'},
+      'mall.tasks.cancel_unpaid_shipments': {'queue': 'tracking'},
+      'mall.tasks.relay_outbox': {'queue': 'default'},
+      'mall.tasks.purge_outbox': {'queue': 'periodic'},
+      'mall.tasks.purge_staged_uploads': {'queue': 'periodic'},
+      'mall.tasks.reconcile_store_stats': {'queue': 'periodic'},
+      'mall.tasks.reconcile_store_dns': {'queue': 'periodic'},
+      'dashboards.tasks.build_daily_sales_rollups': {'queue': 'periodic'},
+      'dashboards.tasks.rebuild_sales_day': {'queue': 'periodic'},
+      'dashboards.tasks.refresh_admin_dashboard_stats_task': {'queue': 'periodic'},
+      'admin_orders.tasks.export_admin_rows': {'queue': 'periodic'},
+      'admin_orders.tasks.purge_export_files': {'queue': 'periodic'},
    }
 )
 
+@worker_init.connect
+def preload_email_templates(**kwargs):
+   # Compiled before the pool forks, so every child starts with them
+   from .email_rendering import preload_email_templates
+   preload_email_templates()
+
+# Task, queue and worker metrics (setup/task_metrics.py)
+from . import task_metrics  # noqa: E402,F401
+
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
\ No newline at end of file
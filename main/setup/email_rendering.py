@@ -0,0 +1,112 @@
+"""
+Email template rendering for the email workers.
+
+Templates under templates/emails are compiled once per worker (preloaded on
+worker start) and the plain-text part is derived with precompiled patterns
+instead of re-parsing the HTML. Rendered output is not kept: contexts carry
+per-recipient values such as OTPs and reset links. Render timings go to the
+email_render_seconds histogram in setup.metrics.
+"""
+import html
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+EMAIL_TEMPLATE_DIR = 'emails'
+
+_lock = threading.Lock()
+_templates = {}
+_stats = {}
+
+# Plain text: drop non-content blocks, turn block ends into line breaks,
+# remove the remaining tags and collapse whitespace
+_HIDDEN_BLOCKS = re.compile(r'<(style|script|head|title)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_COMMENTS = re.compile(r'<!--.*?-->', re.DOTALL)
+_LINE_BREAKS = re.compile(r'<br\s*/?>|</(p|div|h[1-6]|li|tr|table)\s*>', re.IGNORECASE)
+_TAGS = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'[ \t\r\f\v]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+
+def html_to_text(html_content):
+   text = _HIDDEN_BLOCKS.sub('', html_content)
+   text = _COMMENTS.sub('', text)
+   text = _LINE_BREAKS.sub('\n', text)
+   text = html.unescape(_TAGS.sub('', text))
+   text = _SPACES.sub(' ', text)
+   text = "\n".join(line.strip() for line in text.split("\n"))
+   return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def email_template_names():
+   """All templates in the email template directories"""
+   names = []
+   for engine in settings.TEMPLATES:
+      for directory in engine.get('DIRS', []):
+         email_dir = Path(directory) / EMAIL_TEMPLATE_DIR
+         if email_dir.is_dir():
+            names.extend(f"{EMAIL_TEMPLATE_DIR}/{path.name}" for path in sorted(email_dir.glob('*.html')))
+   return names
+
+
+def get_email_template(template_name):
+   template = _templates.get(template_name)
+   if template is None:
+      template = get_template(template_name)
+      with _lock:
+         _templates[template_name] = template
+   return template
+
+
+def preload_email_templates():
+   """Compile every email template up front so the first emails don't pay for it"""
+   loaded = 0
+   for template_name in email_template_names():
+      try:
+         get_email_template(template_name)
+         loaded += 1
+      except Exception as e:
+         logger.error(f"Failed to preload email template {template_name}: {str(e)}")
+   logger.info(f"Preloaded {loaded} email templates")
+   return loaded
+
+
+def _record(template_name, elapsed_ms):
+   with _lock:
+      stats = _stats.setdefault(template_name, {'renders': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+      stats['renders'] += 1
+      stats['total_ms'] += elapsed_ms
+      stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+   metrics.observe('email_render_seconds', elapsed_ms / 1000, {'template': template_name})
+
+
+def render_email(template_name, context):
+   """Return (html, plain text) for an email template and context"""
+   started = time.perf_counter()
+   html_content = get_email_template(template_name).render(context)
+   rendered = (html_content, html_to_text(html_content))
+   elapsed_ms = (time.perf_counter() - started) * 1000
+   _record(template_name, elapsed_ms)
+   logger.debug(f"Rendered {template_name} in {elapsed_ms:.1f}ms")
+   return rendered
+
+
+def get_render_stats():
+   """Per-template render counts and timings for this worker, see email_render_seconds for all workers"""
+   with _lock:
+      return {
+         template_name: {
+            **stats,
+            'avg_ms': round(stats['total_ms'] / stats['renders'], 2) if stats['renders'] else 0.0,
+         }
+         for template_name, stats in _stats.items()
+      }
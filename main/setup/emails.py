@@ -0,0 +1,145 @@
+"""
+Batched transactional email through Brevo.
+
+sendEmail() records each message as an event in the transactional outbox
+(mall/outbox.py) instead of queueing one Celery task per email. The outbox
+relay hands the pending messages to send_outbox_emails, which sends up to
+EMAIL_BATCH_SIZE of them per Brevo request as `messageVersions` (one version
+per recipient). A message stays in the outbox until Brevo has accepted it, so
+a worker dying mid-send or a full Redis can't lose it; like every outbox
+event it can be sent twice if the worker dies after Brevo accepted it.
+"""
+import logging
+from uuid import uuid4
+
+import requests
+from django.conf import settings
+
+from mall.outbox import enqueue, outbox_handler
+from .email_rendering import render_email, get_render_stats
+
+logger = logging.getLogger(__name__)
+
+BREVO_SEND_URL = "https://api.brevo.com/v3/smtp/email"
+# Brevo accepts at most 1000 message versions (and 2000 recipients) per request
+BREVO_MAX_MESSAGE_VERSIONS = 1000
+
+EMAIL_TOPIC = 'email.send'
+
+
+def batch_size():
+   return min(getattr(settings, 'EMAIL_BATCH_SIZE', 100), BREVO_MAX_MESSAGE_VERSIONS)
+
+
+def brevo_headers():
+   return {
+      "accept": "application/json",
+      'api-key': settings.BREVO_API_KEY,
+      "content-type": "application/json",
+   }
+
+
+def brevo_sender():
+   return {
+      "name": settings.SENDER_NAME,
+      "email": settings.SENDER_EMAIL,
+   }
+
+
+def queue_email(recipient_email, template_name, context, subject, tags=None):
+   """Add a message to the outbox; it is sent once the current transaction commits"""
+   message_id = uuid4().hex
+   message = {
+      'id': message_id,
+      'recipient_email': recipient_email,
+      'template_name': template_name,
+      'context': context,
+      'subject': subject,
+      'tags': tags or [],
+   }
+   enqueue(EMAIL_TOPIC, message, idempotency_key=f"email:{message_id}")
+   return message_id
+
+
+def outbox_length():
+   """Emails waiting to be sent"""
+   from mall.models import OutboxEvent
+
+   return OutboxEvent.objects.filter(topic=EMAIL_TOPIC, status=OutboxEvent.PENDING).count()
+
+
+def build_batch_payload(messages):
+   """One Brevo request for messages sharing the same tags"""
+   versions = []
+   for message in messages:
+      html_content, plain_text_content = render_email(message['template_name'], message['context'])
+      versions.append({
+         "to": [{"email": message['recipient_email']}],
+         "subject": message['subject'],
+         "htmlContent": html_content,
+         "textContent": plain_text_content,
+      })
+
+   # The top level content is required but every version overrides it
+   payload = {
+      "sender": brevo_sender(),
+      "subject": versions[0]["subject"],
+      "htmlContent": versions[0]["htmlContent"],
+      "messageVersions": versions,
+   }
+   if messages[0]['tags']:
+      payload["tags"] = messages[0]['tags']
+   return payload
+
+
+def send_batch(messages):
+   """Send messages with the same tags in a single Brevo request"""
+   response = requests.post(BREVO_SEND_URL, json=build_batch_payload(messages), headers=brevo_headers(), timeout=30)
+   response.raise_for_status()
+   logger.info(f"Sent {len(messages)} emails in one Brevo batch (Status: {response.status_code})")
+   return response.json()
+
+
+@outbox_handler(EMAIL_TOPIC, batch=True)
+def send_outbox_emails(events):
+   """
+   Send due emails in Brevo batches of EMAIL_BATCH_SIZE messages with the same
+   tags. Returns {event pk: error} for the batches to retry.
+   """
+   from .tasks import send_email_task
+
+   failed = {}
+   by_tags = {}
+   for event in events:
+      by_tags.setdefault(tuple(event.payload['tags']), []).append(event)
+
+   size = batch_size()
+   for group in by_tags.values():
+      for start in range(0, len(group), size):
+         chunk = group[start:start + size]
+         messages = [event.payload for event in chunk]
+         try:
+            send_batch(messages)
+            continue
+         except requests.exceptions.RequestException as e:
+            response = getattr(e, 'response', None)
+            if response is None or response.status_code >= 500 or response.status_code == 429:
+               logger.error(f"Email batch of {len(chunk)} failed, retrying later: {e}")
+               failed.update({event.pk: e for event in chunk})
+               continue
+            # One bad message rejects the whole batch; send these one by one
+            logger.error(f"Brevo rejected a batch of {len(chunk)} emails: {response.text}")
+         except Exception as e:
+            logger.error(f"Failed to build an email batch of {len(chunk)} emails: {str(e)}")
+
+         for message in messages:
+            send_email_task.delay(
+               recipient_email=message['recipient_email'],
+               template_name=message['template_name'],
+               context=message['context'],
+               subject=message['subject'],
+               tags=message['tags'] or None
+            )
+
+   logger.debug(f"Email render stats: {get_render_stats()}")
+   return failed
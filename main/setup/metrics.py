@@ -0,0 +1,130 @@
+"""
+Small Redis-backed metrics registry shared by the web and worker processes.
+
+Counters and histogram buckets are HINCRBY/HINCRBYFLOAT fields in two hashes,
+so recording is one pipelined round trip and a scrape is two HGETALLs (never
+a keyspace scan). render_prometheus() turns them into the Prometheus text
+exposition format, together with any gauges computed at scrape time.
+"""
+import logging
+import math
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = "rocktea:metrics:counters"
+HISTOGRAMS_KEY = "rocktea:metrics:histograms"
+
+# Seconds; shared by every histogram so a scrape stays small
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+_redis = None
+
+
+def get_redis():
+   global _redis
+   if _redis is None:
+      _redis = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+   return _redis
+
+
+def metrics_enabled():
+   return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def _field(name, labels):
+   label_text = ",".join(f'{key}="{value}"' for key, value in sorted((labels or {}).items()))
+   return f"{name}|{label_text}"
+
+
+def increment(name, labels=None, amount=1):
+   """Add `amount` to a counter"""
+   if not metrics_enabled():
+      return
+   try:
+      get_redis().hincrby(COUNTERS_KEY, _field(name, labels), amount)
+   except redis.RedisError as e:
+      logger.debug(f"Failed to record metric {name}: {e}")
+
+
+def observe(name, value, labels=None, buckets=DEFAULT_BUCKETS):
+   """Record one observation in a histogram"""
+   observe_many([(name, value, labels)], buckets=buckets)
+
+
+def observe_many(observations, counters=(), buckets=DEFAULT_BUCKETS):
+   """
+   Record (name, value, labels) histogram observations and (name, labels)
+   counter increments in one round trip
+   """
+   if not metrics_enabled():
+      return
+   try:
+      pipe = get_redis().pipeline(transaction=False)
+      for name, value, labels in observations:
+         field = _field(name, labels)
+         for bound in buckets:
+            if value <= bound:
+               pipe.hincrby(HISTOGRAMS_KEY, f"{field}|{bound}", 1)
+         pipe.hincrby(HISTOGRAMS_KEY, f"{field}|+Inf", 1)
+         pipe.hincrbyfloat(HISTOGRAMS_KEY, f"{field}|sum", value)
+      for name, labels in counters:
+         pipe.hincrby(COUNTERS_KEY, _field(name, labels), 1)
+      pipe.execute()
+   except redis.RedisError as e:
+      logger.debug(f"Failed to record metrics {[observation[0] for observation in observations]}: {e}")
+
+
+def _labels(label_text, **extra):
+   parts = [label_text] if label_text else []
+   parts += [f'{key}="{value}"' for key, value in extra.items()]
+   return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _sort_bound(bound):
+   return math.inf if bound == '+Inf' else float(bound)
+
+
+def render_prometheus(gauges=()):
+   """
+   Prometheus text format for all counters and histograms, plus `gauges`:
+   an iterable of (name, labels dict, value) computed by the caller.
+   """
+   client = get_redis()
+   counters = client.hgetall(COUNTERS_KEY)
+   histograms = client.hgetall(HISTOGRAMS_KEY)
+
+   lines = []
+   by_name = {}
+   for raw_field, raw_value in counters.items():
+      name, label_text = raw_field.decode().split("|", 1)
+      by_name.setdefault(name, []).append(f"{name}{_labels(label_text)} {int(raw_value)}")
+   for name in sorted(by_name):
+      lines.append(f"# TYPE {name} counter")
+      lines.extend(sorted(by_name[name]))
+
+   series = {}
+   for raw_field, raw_value in histograms.items():
+      name, label_text, bound = raw_field.decode().split("|", 2)
+      series.setdefault(name, {}).setdefault(label_text, {})[bound] = float(raw_value)
+   for name in sorted(series):
+      lines.append(f"# TYPE {name} histogram")
+      for label_text, values in sorted(series[name].items()):
+         # Every bucket is exported, empty ones included, so quantiles line up
+         bounds = {str(bound) for bound in DEFAULT_BUCKETS} | {bound for bound in values if bound != 'sum'}
+         for bound in sorted(bounds | {'+Inf'}, key=_sort_bound):
+            lines.append(f"{name}_bucket{_labels(label_text, le=bound)} {int(values.get(bound, 0))}")
+         lines.append(f"{name}_sum{_labels(label_text)} {values.get('sum', 0.0)}")
+         lines.append(f"{name}_count{_labels(label_text)} {int(values.get('+Inf', 0))}")
+
+   gauge_lines = {}
+   for name, labels, value in gauges:
+      label_text = ",".join(f'{key}="{val}"' for key, val in sorted(labels.items()))
+      gauge_lines.setdefault(name, []).append(f"{name}{_labels(label_text)} {value}")
+   for name in sorted(gauge_lines):
+      lines.append(f"# TYPE {name} gauge")
+      lines.extend(gauge_lines[name])
+
+   return "\n".join(lines) + "\n"
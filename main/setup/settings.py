@@ -152,10 +152,12 @@ if not CI_ENVIRONMENT:
 MIDDLEWARE = [
     # Security middleware must come first
     'django.middleware.security.SecurityMiddleware',
+
+    # Replica reads for safe requests, primary after a write
+    'mall.db_routing.ReplicaRoutingMiddleware',
     
-    # Performance monitoring (disabled for now)
-    # 'mall.performance_middleware.PerformanceMonitoringMiddleware',
-    # 'mall.performance_middleware.CacheHitRateMiddleware',
+    # Per-request DB/cache/HTTP totals, Server-Timing header and query budgets
+    'mall.performance_middleware.PerformanceMonitoringMiddleware',
     
     # File validation (simple version without python-magic)
     'mall.simple_file_validation.SimpleFileUploadMiddleware',
@@ -218,7 +220,9 @@ else:
             'PASSWORD': env('PGPASSWORD'),
             'HOST': env('PGHOST'),
             'PORT': env('PGPORT'),
-            'CONN_MAX_AGE': 600,
+            # run_workers sets DB_CONN_MAX_AGE=0 for gevent workers, whose
+            # greenlets would each keep their own connection open
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=600),
         }
     }
 
@@ -230,7 +234,7 @@ else:
     # Enhanced cache configuration with memory management
     CACHES = {
         "default": {
-            "BACKEND": "django_redis.cache.RedisCache",
+            "BACKEND": "mall.instrumentation.InstrumentedRedisCache",  # django-redis counting calls per request
             "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/0",
             "OPTIONS": {
                 "PASSWORD": REDIS_PASSWORD,
@@ -255,8 +259,19 @@ else:
 REDIS_MAX_MEMORY = "256mb"  # Adjust based on your server
 REDIS_EVICTION_POLICY = "allkeys-lru"  # Evict least recently used keys
 
-# Database query optimizations
-DATABASE_ROUTERS = []
+# Read replicas (see mall/db_routing.py): PG_REPLICA_HOSTS lists streaming
+# replicas of PGHOST; reads of safe requests go to them, writes never do
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(env.list('PG_REPLICA_HOSTS', default=[]), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=10)  # Primary-only window after a write
+
+DATABASE_ROUTERS = ['mall.db_routing.ReplicaRouter']
 
 # Cache timeouts for different data types
 CACHE_TIMEOUTS = {
@@ -265,13 +280,37 @@ CACHE_TIMEOUTS = {
     'stores': 60 * 30,        # 30 minutes
     'orders': 60 * 5,         # 5 minutes
     'marketplace': 60 * 10,   # 10 minutes
+    'taxonomy_tree': 60 * 60 * 24,  # 24 hours, rebuilt on taxonomy changes
+    'admin_stats': 60,        # 1 minute fresh, then refreshed in the background
+    'admin_stats_stale': 60 * 30,  # Stale stats are served for up to 30 minutes
 }
 
+# Sales rollups: a changed order's day is rebuilt this many seconds after the
+# change, and the nightly run re-rolls this many days
+SALES_ROLLUP_DELAY = 60
+SALES_ROLLUP_REBUILD_DAYS = 60
+
 # File upload limits (5MB)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# Upload staging: the web process saves uploads to the "upload_staging" storage
+# and only a reference is queued; the media worker streams the file on to
+# Cloudinary. The Procfile runs web and workers in separate containers, so the
+# storage is private Cloudinary unless UPLOAD_STAGING_SHARED says they share
+# UPLOAD_STAGING_DIR (same host or a mounted volume)
+UPLOAD_STAGING_SHARED = env.bool('UPLOAD_STAGING_SHARED', default=False)
+UPLOAD_STAGING_DIR = env('UPLOAD_STAGING_DIR', default=os.path.join(BASE_DIR, 'upload_staging'))
+UPLOAD_STAGING_TTL = 60 * 60 * 6  # Staged files older than 6 hours are purged
+
+# Admin exports: up to this many rows stream from the web worker, bigger
+# exports are written to a gzipped file by a Celery job
+EXPORT_STREAM_MAX_ROWS = 50000
+EXPORT_CHUNK_SIZE = 2000
+# Lifetime in seconds of the signed download URL for a finished export
+EXPORT_URL_TTL = env.int('EXPORT_URL_TTL', default=15 * 60)
+
 # Session optimization using Redis
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -381,7 +420,19 @@ STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage" if CI_ENVIRONMENT 
                   else "cloudinary_storage.storage.MediaCloudinaryStorage"
-    }
+    },
+    # Gzipped admin exports are raw files, not images, and private
+    "exports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage" if CI_ENVIRONMENT 
+                  else "admin_orders.storage.PrivateRawCloudinaryStorage"
+    },
+    "upload_staging": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": UPLOAD_STAGING_DIR},
+    } if CI_ENVIRONMENT or UPLOAD_STAGING_SHARED else {
+        "BACKEND": "admin_orders.storage.PrivateRawCloudinaryStorage",
+        "OPTIONS": {"url_ttl": 10 * 60},
+    },
 }
 
 # WhiteNoise configuration for static files
@@ -488,17 +539,76 @@ CELERY_ENABLE_UTC = True
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60  # 25 minutes
-CELERY_WORKER_PREFETCH_MULTIPLIER = 4
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # Same as app.conf; long tasks shouldn't sit behind each other
 CELERY_TASK_ACKS_LATE = True
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
-CELERY_WORKER_CONCURRENCY = 4
-CELERY_TASK_ROUTES = {
-    'setup.tasks.send_email_task': {'queue': 'emails'},
-}
 CELERY_TASK_DEFAULT_QUEUE = 'default'
+# Task routes live in setup/celery.py (app.conf overrides CELERY_TASK_ROUTES)
+
+# Celery worker pools, one per group of queues, started by `manage.py run_workers`.
+# I/O-bound queues (Brevo and Cloudinary calls) run on
+# gevent with high concurrency; CPU and DB heavy periodic work stays on prefork.
+# `default` is prefork too: it runs the outbox relay and any task without a
+# route, which can't be assumed to be I/O-bound or gevent-safe. psycopg2 is not
+# gevent-patched, so queues whose tasks query the database between API calls
+# (tracking) run on prefork as well; `uses_db: False` marks groups that never
+# open a connection, and the rest must fit in WORKER_DB_CONNECTION_BUDGET.
+WORKER_TOPOLOGY = {
+    'io': {
+        'queues': ['emails', 'webhooks'],
+        'pool': 'gevent',
+        'concurrency': env.int('IO_WORKER_CONCURRENCY', default=200),
+        'uses_db': False,
+    },
+    'tracking': {
+        'queues': ['tracking'],
+        'pool': 'prefork',
+        'concurrency': env.int('TRACKING_WORKER_CONCURRENCY', default=4),
+    },
+    'default': {
+        'queues': ['default'],
+        'pool': 'prefork',
+        'concurrency': env.int('DEFAULT_WORKER_CONCURRENCY', default=4),
+    },
+    'media': {
+        'queues': ['media'],
+        'pool': 'gevent',
+        'concurrency': env.int('MEDIA_WORKER_CONCURRENCY', default=20),
+    },
+    'cpu': {
+        'queues': ['periodic'],
+        'pool': 'prefork',
+        'concurrency': env.int('CPU_WORKER_CONCURRENCY', default=2),
+        'max_tasks_per_child': 100,
+    },
+}
+# Postgres connections the workers may hold at once (one per process or greenlet)
+WORKER_DB_CONNECTION_BUDGET = env.int('WORKER_DB_CONNECTION_BUDGET', default=40)
 
 CELERY_FLOWER_BROKER_URL = REDIS_URL
 
+# Celery task/queue and request metrics, scraped from /api/admin/metrics/
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=not CI_ENVIRONMENT)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+# Server-Timing header on every response; staff always get it
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', default=DEBUG)
+
+# Transactional email batching (see setup/emails.py)
+EMAIL_BATCHING = env.bool('EMAIL_BATCHING', default=not CI_ENVIRONMENT)
+EMAIL_BATCH_SIZE = 100  # Messages per Brevo request (max 1000)
+
+# Live store/buyer updates over long-poll and SSE (see mall/realtime.py)
+REALTIME_ENABLED = env.bool('REALTIME_ENABLED', default=not CI_ENVIRONMENT)
+REALTIME_POLL_SECONDS = 25  # Longest a long-poll or SSE request stays open
+REALTIME_STREAM_MAXLEN = 200  # Events kept per channel for reconnecting clients
+# Open long-polls/streams per web process; keep it below the gunicorn --threads in the Procfile
+REALTIME_MAX_STREAMS = env.int('REALTIME_MAX_STREAMS', default=8)
+REALTIME_TICKET_SECONDS = 300  # Lifetime of an EventSource ?ticket=
+
+# Transactional outbox for signal side effects (see mall/outbox.py)
+OUTBOX_RELAY_DELAY = 2  # Seconds events accumulate before the relay runs
+OUTBOX_BATCH_SIZE = 100  # Events claimed per relay batch
+
 # 24 hours expiration
 EMAIL_VERIFICATION_TIMEOUT = 86400
 
@@ -506,6 +616,15 @@ EMAIL_VERIFICATION_TIMEOUT = 86400
 # IMPORTANT: Replace with the actual Hosted Zone IDs you copied from Route 53
 ROUTE53_PRODUCTION_HOSTED_ZONE_ID = env('ROUTE53_PRODUCTION_HOSTED_ZONE_ID', default='')
 
+# Store DNS reconciliation (mall/dns_reconcile.py). The nightly run only
+# reports orphaned store records unless deleting them is switched on, and
+# these subdomains are never treated as store records.
+DNS_RECONCILE_DELETE_ORPHANS = env.bool('DNS_RECONCILE_DELETE_ORPHANS', default=False)
+DNS_RESERVED_LABELS = [
+    'www', 'api', 'api-dev', 'admin', 'admin-dev', 'dropshippers', 'dropshippers-dev',
+    'user-dev', 'users', 'mall', 'mail', 'smtp', 'staging', 'test',
+]
+
 # AWS Region for Route 53 API calls (e.g., 'us-east-1', 'eu-west-2')
 AWS_REGION_NAME = env('AWS_REGION_NAME', default='us-east-1')
 AWS_ACCESS_KEY_ID = env('AWS_ACCESS_KEY_ID', default='')
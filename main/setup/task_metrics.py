@@ -0,0 +1,150 @@
+"""
+Celery task and broker metrics.
+
+Signal handlers record queue wait and runtime histograms and retry/failure
+counters in the shared registry (setup.metrics), and workers write a
+heartbeat timestamp. Queue depth and oldest-message age are read at scrape
+time with LLEN and LINDEX on the routed queues only.
+"""
+import json
+import logging
+import time
+
+import redis
+from celery.signals import (
+   before_task_publish, task_prerun, task_postrun, task_retry, task_failure,
+   worker_ready, heartbeat_sent, worker_shutdown
+)
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HEARTBEATS_KEY = "rocktea:metrics:heartbeats"
+PUBLISHED_AT_HEADER = 'published_at'
+
+_started = {}
+_hostname = None
+
+
+def _task_name(sender=None, task=None, headers=None):
+   if task is not None:
+      return task.name
+   if headers and headers.get('task'):
+      return headers['task']
+   return getattr(sender, 'name', sender) or 'unknown'
+
+
+@before_task_publish.connect
+def stamp_published_at(sender=None, headers=None, **kwargs):
+   # Custom headers become attributes of task.request on the worker
+   if headers is not None:
+      headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task_id=None, task=None, **kwargs):
+   now = time.time()
+   _started[task_id] = time.perf_counter()
+   published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+   if published_at is None:
+      published_at = (getattr(task.request, 'headers', None) or {}).get(PUBLISHED_AT_HEADER)
+   # Retries and ETA tasks wait on purpose; only first deliveries are queue wait
+   if published_at and not task.request.retries and not task.request.eta:
+      delivery_info = task.request.delivery_info or {}
+      metrics.observe('celery_task_queue_wait_seconds', max(now - float(published_at), 0), {
+         'task': task.name, 'queue': delivery_info.get('routing_key') or 'unknown',
+      })
+
+
+@task_postrun.connect
+def record_runtime(task_id=None, task=None, state=None, **kwargs):
+   started = _started.pop(task_id, None)
+   if started is not None:
+      metrics.observe('celery_task_runtime_seconds', time.perf_counter() - started, {'task': task.name})
+   metrics.increment('celery_tasks_total', {'task': task.name, 'state': state or 'unknown'})
+
+
+@task_retry.connect
+def count_retry(sender=None, **kwargs):
+   metrics.increment('celery_task_retries_total', {'task': _task_name(sender)})
+
+
+@task_failure.connect
+def count_failure(sender=None, exception=None, **kwargs):
+   metrics.increment('celery_task_failures_total', {
+      'task': _task_name(sender), 'exception': type(exception).__name__ if exception else 'unknown',
+   })
+
+
+def _beat():
+   if _hostname and metrics.metrics_enabled():
+      try:
+         metrics.get_redis().hset(HEARTBEATS_KEY, _hostname, time.time())
+      except redis.RedisError as e:
+         logger.debug(f"Failed to write worker heartbeat: {e}")
+
+
+@worker_ready.connect
+def register_worker(sender=None, **kwargs):
+   global _hostname
+   _hostname = getattr(sender, 'hostname', None)
+   _beat()
+
+
+@heartbeat_sent.connect
+def worker_heartbeat(sender=None, **kwargs):
+   _beat()
+
+
+@worker_shutdown.connect
+def unregister_worker(sender=None, **kwargs):
+   if _hostname and metrics.metrics_enabled():
+      try:
+         metrics.get_redis().hdel(HEARTBEATS_KEY, _hostname)
+      except redis.RedisError:
+         pass
+
+
+def oldest_message_age(client, queue, now):
+   """Age of the next message to be consumed (kombu pushes left, pops right)"""
+   raw = client.lindex(queue, -1)
+   if not raw:
+      return 0.0
+   try:
+      published_at = json.loads(raw).get('headers', {}).get(PUBLISHED_AT_HEADER)
+   except (ValueError, AttributeError):
+      return None
+   return max(now - float(published_at), 0.0) if published_at else None
+
+
+def queue_snapshot(queues):
+   """Depth and oldest-message age per queue, plus worker heartbeat ages"""
+   client = metrics.get_redis()
+   now = time.time()
+
+   pipe = client.pipeline(transaction=False)
+   for queue in queues:
+      pipe.llen(queue)
+   depths = dict(zip(queues, pipe.execute()))
+
+   snapshot = {'queues': {}, 'workers': {}}
+   for queue in queues:
+      snapshot['queues'][queue] = {
+         'depth': depths[queue],
+         'oldest_age_seconds': oldest_message_age(client, queue, now) if depths[queue] else 0.0,
+      }
+   for hostname, beat in client.hgetall(HEARTBEATS_KEY).items():
+      snapshot['workers'][hostname.decode()] = {'heartbeat_age_seconds': round(now - float(beat), 1)}
+   return snapshot
+
+
+def snapshot_gauges(snapshot):
+   gauges = []
+   for queue, info in snapshot['queues'].items():
+      gauges.append(('celery_queue_depth', {'queue': queue}, info['depth']))
+      if info['oldest_age_seconds'] is not None:
+         gauges.append(('celery_queue_oldest_message_age_seconds', {'queue': queue}, info['oldest_age_seconds']))
+   for hostname, info in snapshot['workers'].items():
+      gauges.append(('celery_worker_heartbeat_age_seconds', {'worker': hostname}, info['heartbeat_age_seconds']))
+   return gauges
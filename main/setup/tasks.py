@@ -2,9 +2,8 @@ from .celery import app
 import logging
 
 import requests
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from .emails import BREVO_SEND_URL, brevo_headers, brevo_sender
+from .email_rendering import render_email
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +14,10 @@ def send_email_task(self, recipient_email: str, template_name: str, context: dic
    This task will be run in the background.
    """
    try:
-      url = "https://api.brevo.com/v3/smtp/email"
-
-      html_content = render_to_string(template_name, context)
-      plain_text_content = strip_tags(html_content)
+      html_content, plain_text_content = render_email(template_name, context)
 
       payload = {
-         "sender": {
-               "name": settings.SENDER_NAME,
-               "email": settings.SENDER_EMAIL,
-         },
+         "sender": brevo_sender(),
          "to": [
                {
                   "email": recipient_email
@@ -36,13 +29,7 @@ def send_email_task(self, recipient_email: str, template_name: str, context: dic
       }
       if tags:                     
          payload["tags"] = tags
-      headers = {
-         "accept": "application/json",
-         'api-key': settings.BREVO_API_KEY,
-         "content-type": "application/json",
-      }
-
-      response = requests.post(url, json=payload, headers=headers)
+      response = requests.post(BREVO_SEND_URL, json=payload, headers=brevo_headers(), timeout=30)
       response.raise_for_status()
 
       logger.info(f"Email sent successfully to {recipient_email} for subject '{subject}' (Status: {response.status_code})")
@@ -61,4 +48,4 @@ def send_email_task(self, recipient_email: str, template_name: str, context: dic
    except Exception as e:
       logger.error(f"An unexpected error occurred during email sending to {recipient_email}: {str(e)}")
       # Do not retry for unexpected errors unless specifically needed
-      return None
\ No newline at end of file
+      return None
@@ -1,6 +1,7 @@
 from django.conf import settings
 import logging
 from .tasks import send_email_task
+from .emails import queue_email
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +12,19 @@ def get_store_domain(request):
 def sendEmail(recipientEmail: str, template_name: str, context: dict, subject: str, tags: list = None):
     """
     Dispatches an email sending task to Celery for background processing.
+
+    With EMAIL_BATCHING on, the email joins the outbox and goes out in a
+    Brevo batch once the current transaction commits, instead of as its own task.
     """
+    if getattr(settings, 'EMAIL_BATCHING', False):
+        try:
+            message_id = queue_email(recipientEmail, template_name, context, subject, tags)
+            logger.info(f"Email {message_id} queued for {recipientEmail} with subject '{subject}'")
+            return message_id
+        except Exception as e:
+            # Fall back to a task of its own if the outbox can't be written
+            logger.error(f"Failed to queue email for {recipientEmail}, sending it directly: {str(e)}")
+
     try:
         # Call the Celery task asynchronously with correct parameter name
         task_result = send_email_task.delay(
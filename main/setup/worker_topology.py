@@ -0,0 +1,89 @@
+"""
+Declarative Celery worker topology.
+
+settings.WORKER_TOPOLOGY maps worker groups to the queues they consume and the
+pool they run (gevent for I/O-bound queues, prefork for CPU-bound ones). The
+`run_workers` management command starts one worker per group after checking
+that every queue tasks are routed to has a consumer and that the groups stay
+within WORKER_DB_CONNECTION_BUDGET.
+"""
+from django.conf import settings
+
+POOLS = ('prefork', 'gevent', 'eventlet', 'threads', 'solo')
+GREEN_POOLS = ('gevent', 'eventlet')
+
+
+def get_topology():
+   return getattr(settings, 'WORKER_TOPOLOGY', {})
+
+
+def routed_queues(app):
+   """Queues that tasks or beat entries can be sent to"""
+   queues = {app.conf.task_default_queue}
+   routes = app.conf.task_routes or {}
+   if isinstance(routes, dict):
+      queues.update(route['queue'] for route in routes.values() if 'queue' in route)
+   for entry in (app.conf.beat_schedule or {}).values():
+      queue = entry.get('options', {}).get('queue')
+      if queue:
+         queues.add(queue)
+   return queues
+
+
+def consumed_queues(topology):
+   return {queue for group in topology.values() for queue in group['queues']}
+
+
+def db_connections(group):
+   """Most database connections a group's worker can hold at once"""
+   if not group.get('uses_db', True):
+      return 0
+   return group.get('concurrency', 1)
+
+
+def validate_topology(app, topology):
+   """Return a list of problems: unknown pools and routed queues without a consumer"""
+   problems = []
+   for name, group in topology.items():
+      if group.get('pool', 'prefork') not in POOLS:
+         problems.append(f"Worker group '{name}' uses unknown pool '{group['pool']}'")
+      if not group.get('queues'):
+         problems.append(f"Worker group '{name}' consumes no queues")
+
+   missing = routed_queues(app) - consumed_queues(topology)
+   for queue in sorted(missing):
+      problems.append(f"Queue '{queue}' has tasks routed to it but no worker group consumes it")
+
+   budget = getattr(settings, 'WORKER_DB_CONNECTION_BUDGET', None)
+   connections = sum(db_connections(group) for group in topology.values())
+   if budget is not None and connections > budget:
+      problems.append(
+         f"Worker groups can hold {connections} database connections, over the budget of {budget}"
+      )
+   return problems
+
+
+def worker_argv(name, group, loglevel='info'):
+   """Command line for the worker of one topology group"""
+   argv = [
+      'celery', '-A', 'setup', 'worker',
+      '--hostname', f'{name}@%h',
+      '--queues', ','.join(group['queues']),
+      '--pool', group.get('pool', 'prefork'),
+      '--concurrency', str(group.get('concurrency', 1)),
+      '--prefetch-multiplier', str(group.get('prefetch_multiplier', 1)),
+      '--loglevel', loglevel,
+   ]
+   if group.get('max_tasks_per_child'):
+      argv += ['--max-tasks-per-child', str(group['max_tasks_per_child'])]
+   if group.get('events', True):
+      argv.append('--events')
+   return argv
+
+
+def worker_env(group):
+   """Environment overrides for the worker of one topology group"""
+   if group.get('pool', 'prefork') in GREEN_POOLS:
+      # Persistent connections would stay open per greenlet, not per process
+      return {'DB_CONN_MAX_AGE': '0'}
+   return {}
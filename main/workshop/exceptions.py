@@ -30,3 +30,8 @@ class NotFoundError(CustomException):
 class InternalServerError(CustomException):
    status_code = 500
    default_detail = 'Internal Server Error'
+
+
+class UpstreamServiceError(CustomException):
+   status_code = 502
+   default_detail = 'Upstream Service Error'
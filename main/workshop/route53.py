@@ -1,11 +1,16 @@
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from django.conf import settings
 import logging
+import time
+from dataclasses import dataclass, field
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Route53 accepts at most 1000 changes in one ChangeResourceRecordSets request
+MAX_CHANGES_PER_BATCH = 1000
+
 
 @lru_cache(maxsize=1)
 def get_route53_client():
@@ -101,32 +106,26 @@ def delete_cname_record(zone_id, subdomain, target):
         return None
 
 
-def get_existing_record(zone_id, subdomain):
+def list_cname_records(zone_id, suffixes=None, client=None):
     """
-    Check if a DNS record exists and get its details.
+    Every CNAME in the hosted zone as {name: target}, paging through
+    list_resource_record_sets. Names are lowercased without the trailing dot;
+    with `suffixes`, only names under one of those domains are kept.
     """
-    if not zone_id:
-        return None
-        
-    try:
-        client = get_route53_client()
-        
-        response = client.list_resource_record_sets(
-            HostedZoneId=zone_id,
-            StartRecordName=subdomain,
-            StartRecordType='CNAME',
-            MaxItems='1'
-        )
-        
-        for record in response.get('ResourceRecordSets', []):
-            if record['Name'].rstrip('.') == subdomain.rstrip('.'):
-                return record
-                
-        return None
-        
-    except ClientError as e:
-        logger.error(f"Error checking existing record: {e}")
-        return None
+    client = client or get_route53_client()
+    suffixes = tuple(f".{suffix.rstrip('.').lower()}" for suffix in suffixes or ())
+
+    records = {}
+    paginator = client.get_paginator('list_resource_record_sets')
+    for page in paginator.paginate(HostedZoneId=zone_id):
+        for record in page.get('ResourceRecordSets', []):
+            if record['Type'] != 'CNAME' or not record.get('ResourceRecords'):
+                continue
+            name = record['Name'].rstrip('.').lower()
+            if suffixes and not name.endswith(suffixes):
+                continue
+            records[name] = record['ResourceRecords'][0]['Value'].rstrip('.')
+    return records
 
 
 def delete_store_dns_record(store_slug, environment='dev'):
@@ -151,24 +150,14 @@ def delete_store_dns_record(store_slug, environment='dev'):
             logger.warning(f"No domain to delete for store slug: {store_slug}")
             return False
         
-        # Check if record exists first
-        existing_record = get_existing_record(env_config['hosted_zone_id'], full_domain)
-        
-        if not existing_record:
-            logger.info(f"DNS record {full_domain} does not exist or already deleted")
-            return True
-        
-        # Get the target from existing record
-        target = existing_record['ResourceRecords'][0]['Value']
-        
-        # Delete the DNS record
-        response = delete_cname_record(
-            zone_id=env_config['hosted_zone_id'],
-            subdomain=full_domain,
-            target=target
-        )
+        # Store records point at the environment's target domain; the queue reads
+        # the record back only if that no longer matches, and deleting a record
+        # that is already gone succeeds
+        queue = DNSChangeQueue(env_config['hosted_zone_id'], wait=False)
+        queue.delete(full_domain, env_config['target_domain'], key=store_slug)
+        result = queue.flush()
         
-        if response:
+        if not result.failed:
             logger.info(f"Successfully deleted DNS record for store: {store_slug}")
             return True
         else:
@@ -178,3 +167,170 @@ def delete_store_dns_record(store_slug, environment='dev'):
     except Exception as e:
         logger.error(f"Error deleting DNS record for store {store_slug}: {e}")
         return False
+
+
+@dataclass
+class DNSChangeResult:
+    """Outcome of DNSChangeQueue.flush(), reported by the keys passed to it"""
+    applied: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    change_ids: list = field(default_factory=list)
+    unsynced: list = field(default_factory=list)
+
+
+class DNSChangeQueue:
+    """
+    Collects CNAME upserts and deletes for one hosted zone and submits them
+    as ChangeBatches of up to MAX_CHANGES_PER_BATCH changes.
+
+    A later change to the same name replaces the earlier one. Each submitted
+    batch is polled with get_change until it is INSYNC (or poll_timeout
+    passes). Pass `client` to run against moto or a stub instead of AWS.
+    """
+
+    def __init__(self, zone_id, client=None, ttl=60, batch_size=MAX_CHANGES_PER_BATCH,
+                 wait=True, poll_interval=5, poll_timeout=60, sleep=time.sleep):
+        self.zone_id = zone_id
+        self.client = client
+        self.ttl = ttl
+        self.batch_size = min(batch_size, MAX_CHANGES_PER_BATCH)
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.sleep = sleep
+        self._changes = {}
+
+    def __len__(self):
+        return len(self._changes)
+
+    def upsert(self, name, target, key=None):
+        self._add('UPSERT', name, target, key)
+
+    def delete(self, name, target, key=None):
+        """
+        Route53 only deletes a record whose values match, so pass its expected
+        target; if the record has since changed, it is read back and deleted
+        with its current values.
+        """
+        self._add('DELETE', name, target, key)
+
+    def _add(self, action, name, target, key):
+        normalized = name.rstrip('.').lower()
+        previous = self._changes.pop(normalized, None)
+        keys = previous['keys'] if previous else []
+        if key is not None:
+            keys.append(key)
+        self._changes[normalized] = {'action': action, 'name': name, 'target': target, 'keys': keys}
+
+    def _change(self, change):
+        if change.get('record'):
+            return {"Action": change['action'], "ResourceRecordSet": change['record']}
+        return {
+            "Action": change['action'],
+            "ResourceRecordSet": {
+                "Name": change['name'],
+                "Type": "CNAME",
+                "TTL": self.ttl,
+                "ResourceRecords": [{"Value": change['target']}],
+            }
+        }
+
+    def flush(self):
+        """Submit every queued change; the queue is empty afterwards"""
+        changes = list(self._changes.values())
+        self._changes = {}
+        result = DNSChangeResult()
+        if not changes:
+            return result
+
+        if not self.zone_id:
+            logger.error("No hosted zone ID provided")
+            self._fail(result, changes, "No hosted zone ID provided")
+            return result
+
+        client = self.client or get_route53_client()
+        for start in range(0, len(changes), self.batch_size):
+            self._submit(client, changes[start:start + self.batch_size], result)
+        return result
+
+    def _fail(self, result, changes, error):
+        for change in changes:
+            for key in change['keys']:
+                result.failed[key] = error
+
+    def _succeed(self, result, changes):
+        for change in changes:
+            result.applied.extend(change['keys'])
+
+    def _submit(self, client, changes, result):
+        try:
+            response = client.change_resource_record_sets(
+                HostedZoneId=self.zone_id,
+                ChangeBatch={"Changes": [self._change(change) for change in changes]}
+            )
+        except ClientError as e:
+            error = e.response.get("Error", {})
+            error_code = error.get("Code", "Unknown")
+            message = error.get("Message", str(e))
+            if error_code != "InvalidChangeBatch":
+                logger.error(f"Route53 error ({error_code}) for a batch of {len(changes)} changes: {message}")
+                self._fail(result, changes, f"Route53 error ({error_code}): {message}")
+                return
+
+            if len(changes) == 1:
+                change = changes[0]
+                if change['action'] == 'DELETE' and 'not found' in message:
+                    logger.info(f"DNS record {change['name']} does not exist or already deleted")
+                    self._succeed(result, changes)
+                elif change['action'] == 'DELETE' and 'do not match' in message and not change.get('record'):
+                    self._delete_current(client, change, result)
+                else:
+                    logger.error(f"Route53 rejected {changes[0]['action']} {changes[0]['name']}: {message}")
+                    self._fail(result, changes, message)
+                return
+
+            # A batch is applied all-or-nothing, so split it to isolate the rejected changes
+            middle = len(changes) // 2
+            self._submit(client, changes[:middle], result)
+            self._submit(client, changes[middle:], result)
+            return
+        except BotoCoreError as e:
+            logger.error(f"Route53 request failed for a batch of {len(changes)} changes: {e}")
+            self._fail(result, changes, str(e))
+            return
+
+        change_id = response['ChangeInfo']['Id']
+        result.change_ids.append(change_id)
+        logger.info(f"Submitted {len(changes)} DNS changes as {change_id}")
+        if self.wait and self._wait_for_sync(client, change_id) != 'INSYNC':
+            # Route53 accepted the batch; it only has not propagated yet
+            result.unsynced.append(change_id)
+        self._succeed(result, changes)
+
+    def _delete_current(self, client, change, result):
+        """Retry a DELETE whose target or TTL was stale with the record's current values"""
+        try:
+            response = client.list_resource_record_sets(
+                HostedZoneId=self.zone_id, StartRecordName=change['name'], StartRecordType='CNAME', MaxItems='1'
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Could not read DNS record {change['name']} to delete it: {e}")
+            self._fail(result, [change], str(e))
+            return
+
+        name = change['name'].rstrip('.').lower()
+        for record in response.get('ResourceRecordSets', []):
+            if record['Type'] == 'CNAME' and record['Name'].rstrip('.').lower() == name:
+                logger.warning(f"DNS record {change['name']} changed since it was created, deleting its current value")
+                self._submit(client, [{**change, 'record': record}], result)
+                return
+        logger.info(f"DNS record {change['name']} does not exist or already deleted")
+        self._succeed(result, [change])
+
+    def _wait_for_sync(self, client, change_id):
+        deadline = time.monotonic() + self.poll_timeout
+        while True:
+            status = client.get_change(Id=change_id)['ChangeInfo']['Status']
+            if status == 'INSYNC' or time.monotonic() >= deadline:
+                return status
+            self.sleep(self.poll_interval)